@@ -0,0 +1,158 @@
+"""Load test for the HTTP API: p50/p99 latency and requests per second.
+
+Builds a throwaway database of ``--tasks`` tasks, starts ``task-manager api``
+on it in a separate process (so the server does not share this process's
+GIL), then runs ``--concurrency`` client threads, each on its own kept-alive
+connection, for ``--duration`` seconds. Each thread loops over a weighted
+mix of requests:
+
+    get       GET /tasks/{id}
+    get-304   GET /tasks/{id} with the ETag of an earlier read
+    list      GET /tasks?limit=100 (gzipped)
+    create    POST /tasks
+    batch     POST /tasks/batch creating 100 tasks
+
+Pass ``--url`` to load an API server that is already running instead.
+
+    python benchmarks/bench_api.py --concurrency 8 --duration 10
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from task_manager.crud import encode_cursor
+
+MIX = {"get": 50, "get-304": 20, "list": 15, "create": 14, "batch": 1}
+
+
+def build_database(path: str, count: int):
+    from sqlalchemy.orm import sessionmaker
+
+    from task_manager.database import Base, create_db_engine
+    from task_manager.crud import bulk_create_tasks
+
+    engine = create_db_engine(f"sqlite:///{path}", echo=False)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    bulk_create_tasks(db, ({"title": f"Task {i}", "description": "benchmark row", "category": f"c{i % 20}",
+                            "priority": ("low", "medium", "high")[i % 3]} for i in range(count)), batch_size=5000)
+    db.close()
+    engine.dispose()
+
+
+def start_server(db_path: str):
+    env = dict(os.environ, DB_NAME=db_path)
+    argv = [sys.executable, "-m", "task_manager.cli", "api", "--port", "0"]
+    server = subprocess.Popen(argv, cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    return server, line.rsplit(" ", 1)[-1].strip()
+
+
+def client(url: str, tasks: int, deadline: float, seed: int, latencies: dict, errors: list):
+    rng = random.Random(seed)
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    kinds, weights = list(MIX), list(MIX.values())
+    etags = {}
+    while time.perf_counter() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        body, headers = None, {}
+        if kind in ("get", "get-304"):
+            task_id = rng.choice(list(etags)) if kind == "get-304" and etags else rng.randint(1, tasks)
+            path = f"/tasks/{task_id}"
+            if kind == "get-304" and task_id in etags:
+                headers["If-None-Match"] = etags[task_id]
+        elif kind == "list":
+            path = f"/tasks?limit=100&after={encode_cursor('id', SimpleNamespace(id=rng.randint(0, tasks)))}"
+            headers["Accept-Encoding"] = "gzip"
+        elif kind == "create":
+            path, body = "/tasks", {"title": f"Load {seed}-{rng.random()}", "priority": "low"}
+        else:
+            path, body = "/tasks/batch", {"op": "create", "tasks": [{"title": f"Batch {seed}-{i}"} for i in range(100)]}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        started = time.perf_counter()
+        connection.request("POST" if body is not None else "GET", path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        latencies[kind].append(time.perf_counter() - started)
+        if response.status >= 400:
+            errors.append((kind, response.status))
+        elif kind == "get":
+            etags[task_id] = response.getheader("ETag")
+    connection.close()
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run(url: str, tasks: int, concurrency: int, duration: float):
+    latencies = {kind: [] for kind in MIX}
+    per_thread = [{kind: [] for kind in MIX} for _ in range(concurrency)]
+    errors = []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(url, tasks, deadline, seed, per_thread[seed], errors))
+               for seed in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    for results in per_thread:
+        for kind, values in results.items():
+            latencies[kind].extend(values)
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Load this running server instead of starting one")
+    parser.add_argument("--tasks", type=int, default=100_000, help="Tasks in the generated database")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads (connections)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        url = args.url
+        if url is None:
+            db_path = os.path.join(tmp, "bench.db")
+            code = f"import bench_api; bench_api.build_database({db_path!r}, {args.tasks})"
+            subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+            server, url = start_server(db_path)
+        try:
+            latencies, errors, elapsed = run(url, args.tasks, args.concurrency, args.duration)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total:,} requests from {args.concurrency} connections in {elapsed:.1f}s: "
+          f"{total / elapsed:,.0f} req/s, {len(errors)} errors\n")
+    print(f"{'request':>8}  {'count':>7}  {'p50 ms':>7}  {'p99 ms':>7}")
+    everything = [value for values in latencies.values() for value in values]
+    for kind, values in list(latencies.items()) + [("all", everything)]:
+        if values:
+            print(f"{kind:>8}  {len(values):>7,}  {percentile(values, 0.5) * 1000:>7.2f}  "
+                  f"{percentile(values, 0.99) * 1000:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""CRUD throughput: async_crud under N concurrent coroutines against sync crud.
+
+Every worker runs the same mix against one file database in WAL mode:
+``--reads`` get_task/get_tasks_page calls per create_task. Compared are
+one sync session doing all the work in turn, a pool of threads each with
+its own sync session, ``--concurrency`` coroutines each with its own
+AsyncSession, and the same coroutines calling sync crud directly. For the
+two asyncio modes a ticker coroutine records the longest the event loop
+went without running it, which is how long any other request would stall.
+
+    python benchmarks/bench_async.py --concurrency 100 --ops 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from task_manager import async_crud, crud
+from task_manager.database import Base, create_async_db_engine, create_db_engine
+from task_manager.models import Priority
+
+
+def plan(worker: int, ops: int, reads: int, tasks: int):
+    """The operations one worker performs: ("read", id) or ("write", title)."""
+    rng = random.Random(worker)
+    return [("write", f"w{worker}-{i}") if i % (reads + 1) == reads else ("read", rng.randint(1, tasks))
+            for i in range(ops)]
+
+
+def sync_worker(factory, operations):
+    db = factory()
+    try:
+        for kind, arg in operations:
+            if kind == "write":
+                crud.create_task(db, arg, None, None, Priority.LOW)
+            elif arg % 2:
+                crud.get_task(db, arg, load="joined")
+            else:
+                crud.get_tasks_page(db, 20, crud.encode_cursor("id", crud.Task(id=arg)))
+    finally:
+        db.close()
+
+
+async def async_worker(factory, operations):
+    async with factory() as db:
+        for kind, arg in operations:
+            if kind == "write":
+                await async_crud.create_task(db, arg, None, None, Priority.LOW)
+            elif arg % 2:
+                await async_crud.get_task(db, arg, load="joined")
+            else:
+                await async_crud.get_tasks_page(db, 20, crud.encode_cursor("id", crud.Task(id=arg)))
+
+
+def run_sync(url, plans, threads):
+    engine = create_db_engine(url, echo=False)
+    factory = sessionmaker(bind=engine)
+    started = time.perf_counter()
+    if threads == 1:
+        for operations in plans:
+            sync_worker(factory, operations)
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda operations: sync_worker(factory, operations), plans))
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed
+
+
+async def blocking_worker(factory, operations):
+    await asyncio.sleep(0)
+    sync_worker(factory, operations)
+
+
+async def ticker(stop: asyncio.Event, gaps: list):
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+async def run_async(url, plans, blocking=False):
+    if blocking:
+        engine = create_db_engine(url, echo=False)
+        factory, worker = sessionmaker(bind=engine), blocking_worker
+    else:
+        engine = create_async_db_engine(url, echo=False)
+        factory, worker = async_sessionmaker(engine, expire_on_commit=False, autoflush=False), async_worker
+    stop, gaps = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, gaps))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(factory, operations) for operations in plans))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+    if blocking:
+        engine.dispose()
+    else:
+        await engine.dispose()
+    return elapsed, max(gaps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--ops", type=int, default=20, help="Operations per worker")
+    parser.add_argument("--reads", type=int, default=9, help="Reads per write")
+    parser.add_argument("--tasks", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_db_engine(url, echo=False)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        crud.bulk_create_tasks(db, ({"title": f"Task {i}", "category": f"c{i % 10}"} for i in range(args.tasks)))
+        db.close()
+        engine.dispose()
+
+        plans = [plan(worker, args.ops, args.reads, args.tasks) for worker in range(args.concurrency)]
+        total = args.concurrency * args.ops
+        print(f"{total:,} operations, {args.reads} reads per write, {args.concurrency} workers\n")
+        print(f"{'mode':>34}  {'seconds':>8}  {'ops/sec':>8}  {'max loop stall ms':>17}")
+        for name, (elapsed, stall) in (
+            ("sync, one session", (run_sync(url, plans, 1), None)),
+            (f"sync, {args.concurrency} threads", (run_sync(url, plans, args.concurrency), None)),
+            (f"async_crud, {args.concurrency} coroutines", asyncio.run(run_async(url, plans))),
+            (f"sync crud in {args.concurrency} coroutines", asyncio.run(run_async(url, plans, blocking=True))),
+        ):
+            stall = f"{stall * 1000:>17.1f}" if stall is not None else f"{'-':>17}"
+            print(f"{name:>34}  {elapsed:>8.2f}  {total / elapsed:>8,.0f}  {stall}")
+
+
+if __name__ == "__main__":
+    main()
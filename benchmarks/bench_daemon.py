@@ -0,0 +1,91 @@
+"""`task add` latency: cold CLI processes versus the daemon.
+
+Runs ``--count`` sequential adds through the thin client (one process per
+add, as a script would) and through a single client connection, plus
+``--threads`` concurrent connections to show group commit. Cold CLI runs
+are slow, so only ``--cold-count`` of them are timed and the total is
+extrapolated to ``--count``.
+
+    python benchmarks/bench_daemon.py --count 1000 --cold-count 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def timed_processes(argv_prefix, count, env):
+    started = time.perf_counter()
+    for i in range(count):
+        subprocess.run([sys.executable, "-m", *argv_prefix, "task", "add", f"Bench {i}"],
+                       cwd=ROOT, env=env, capture_output=True, check=True)
+    return time.perf_counter() - started
+
+
+def report(label, count, seconds, extrapolated_to=None):
+    total = seconds * extrapolated_to / count if extrapolated_to else seconds
+    suffix = f" (extrapolated from {count})" if extrapolated_to else ""
+    per_call = seconds / count * 1000
+    print(f"{label:<34} {total:>9.2f}s  {per_call:>8.2f} ms/add{suffix}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--cold-count", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DB_NAME": os.path.join(tmp, "bench.db")}
+        socket_path = os.path.join(tmp, "daemon.sock")
+        subprocess.run([sys.executable, "-m", "task_manager.cli", "init"], cwd=ROOT, env=env,
+                       capture_output=True, check=True)
+
+        cold = timed_processes(["task_manager.cli"], args.cold_count, env)
+        report("cold CLI", args.cold_count, cold, extrapolated_to=args.count)
+
+        server = subprocess.Popen([sys.executable, "-m", "task_manager.cli", "serve", "--socket", socket_path],
+                                  cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(socket_path):
+                time.sleep(0.05)
+            client_argv = ["task_manager.client", "--socket", socket_path]
+            report("daemon, thin client process", args.count, timed_processes(client_argv, args.count, env))
+
+            from task_manager.client import DaemonClient
+
+            with DaemonClient(socket_path) as client:
+                started = time.perf_counter()
+                for i in range(args.count):
+                    client.run(["task", "add", f"Bench {i}"])
+                report("daemon, one connection", args.count, time.perf_counter() - started)
+
+            per_thread = args.count // args.threads
+
+            def worker():
+                with DaemonClient(socket_path) as client:
+                    for i in range(per_thread):
+                        client.run(["task", "add", f"Bench {i}"])
+
+            threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            report(f"daemon, {args.threads} concurrent connections", per_thread * args.threads,
+                   time.perf_counter() - started)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
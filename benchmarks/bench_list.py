@@ -0,0 +1,80 @@
+"""`task list --all` wall time, time to first row and peak RSS per output format.
+
+Builds a throwaway database of ``--count`` tasks, then runs the real CLI in
+a fresh process for each format with stdout on a pipe, reading and
+discarding what it writes. Peak RSS is the child's own, from wait4(). It
+includes whatever the parent held when it forked, so the database is built
+in a separate process and this one never imports task_manager.
+
+    python benchmarks/bench_list.py --count 100000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+FORMATS = ("table", "plain", "tsv", "ndjson")
+
+
+def build_database(path: str, count: int):
+    from sqlalchemy.orm import sessionmaker
+
+    from task_manager.database import Base, create_db_engine
+    from task_manager.crud import bulk_create_tasks
+
+    engine = create_db_engine(f"sqlite:///{path}", echo=False)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    bulk_create_tasks(db, ({"title": f"Task {i}", "description": "benchmark row", "category": f"c{i % 20}"}
+                           for i in range(count)), batch_size=5000)
+    db.close()
+    engine.dispose()
+
+
+def build_in_child(path: str, count: int):
+    code = f"import bench_list; bench_list.build_database({path!r}, {count})"
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+
+
+def run(db_path: str, output: str, page_size: int):
+    env = dict(os.environ, DB_NAME=db_path, COLUMNS="160")
+    argv = [sys.executable, "-m", "task_manager.cli", "task", "list", "--all",
+            "--format", output, "--page-size", str(page_size)]
+    started = time.perf_counter()
+    child = subprocess.Popen(argv, cwd=ROOT, env=env, stdout=subprocess.PIPE)
+    first = child.stdout.readline()
+    first_row = time.perf_counter() - started
+    size = len(first)
+    for chunk in iter(lambda: child.stdout.read(1 << 16), b""):
+        size += len(chunk)
+    _, status, usage = os.wait4(child.pid, 0)
+    elapsed = time.perf_counter() - started
+    assert os.waitstatus_to_exitcode(status) == 0
+    # ru_maxrss is in KiB on Linux.
+    return elapsed, first_row, usage.ru_maxrss / 1024, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=1000,
+                        help="Rows per rich table in the table format")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        build_in_child(db_path, args.count)
+
+        print(f"{'format':>8}  {'total s':>8}  {'first row ms':>12}  {'peak RSS MiB':>12}  {'output MiB':>10}")
+        for output in FORMATS:
+            elapsed, first_row, rss, size = run(db_path, output, args.page_size)
+            print(f"{output:>8}  {elapsed:>8.2f}  {first_row * 1000:>12.0f}  {rss:>12.1f}  {size / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
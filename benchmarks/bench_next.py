@@ -0,0 +1,128 @@
+"""`task next`: top-N pending tasks from the rank index versus a full sort.
+
+Builds a throwaway database of ``--count`` tasks (``--pending`` of them
+pending, over ``--users`` users, with mixed priorities, due dates and
+ages), then times, for each limit in ``--limits``:
+
+* index: crud.next_tasks, a range scan of ix_tasks_pending_rank (or
+  ix_tasks_user_pending_rank with a user);
+* full sort: the same score computed per row at query time and sorted,
+  which is what ranking without the stored column costs.
+
+Both return the same tasks; the script checks that. It also reports what the
+rank indexes add to an insert, and how long `db rerank` takes.
+
+    python benchmarks/bench_next.py --count 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def build_database(db, count: int, users: int, pending: float, seed: int = 7):
+    from task_manager.crud import bulk_create_tasks, create_user
+
+    rng = random.Random(seed)
+    user_ids = [create_user(db, f"bench-{i}", "x").id for i in range(users)]
+    now = datetime.utcnow()
+
+    def rows():
+        for i in range(count):
+            yield {
+                "title": f"Task {i}",
+                "priority": rng.choice(("low", "medium", "high")),
+                "status": "pending" if rng.random() < pending else "completed",
+                "due_date": None if rng.random() < 0.2 else now + timedelta(days=rng.uniform(-90, 90)),
+                "created_at": now - timedelta(days=rng.uniform(0, 365)),
+                "user_id": rng.choice(user_ids),
+            }
+    bulk_create_tasks(db, rows(), batch_size=10000)
+    return user_ids
+
+
+def full_sort_statement(limit: int, user_id: int = None):
+    """The score of crud.next_tasks, computed for every pending row."""
+    from sqlalchemy import func, literal_column, select
+
+    from task_manager import config
+    from task_manager.models import Task, task_rank_sql
+
+    score = literal_column(f"({task_rank_sql()})") + (
+        (config.RANK_URGENCY_PER_DAY + config.RANK_AGE_PER_DAY) * func.julianday("now"))
+    stmt = select(Task).where(Task.status == "PENDING")
+    if user_id:
+        stmt = stmt.where(Task.user_id == user_id)
+    return stmt.order_by(score.desc(), Task.id.desc()).limit(limit)
+
+
+def timed(call, repeat: int):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000, help="Tasks in the database")
+    parser.add_argument("--pending", type=float, default=0.3, help="Share of tasks still pending")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--limits", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the median is reported")
+    parser.add_argument("--dir", default=None, help="Where to create the database [default: a temporary directory]")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        # Read by task_manager.config, imported below.
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        from sqlalchemy import text
+
+        from task_manager.crud import bulk_create_tasks, next_tasks, rebuild_task_rank
+        from task_manager.database import SessionLocal, init_db
+        from task_manager.models import Task
+
+        init_db()
+        db = SessionLocal()
+        started = time.perf_counter()
+        user_ids = build_database(db, args.count, args.users, args.pending)
+        print(f"built {args.count:,} tasks in {time.perf_counter() - started:.0f}s\n")
+        db.execute(text("ANALYZE"))
+        db.commit()
+
+        print(f"{'query':<22} {'limit':>6}  {'index ms':>9}  {'full sort ms':>12}  {'speedup':>8}")
+        for user_id in (None, user_ids[0]):
+            for limit in args.limits:
+                index_seconds, ranked = timed(lambda: next_tasks(db, limit, user_id=user_id), args.repeat)
+                db.expunge_all()
+                sort_seconds, tasks = timed(lambda: db.execute(full_sort_statement(limit, user_id)).scalars().all(),
+                                            args.repeat)
+                assert [task.id for task, _ in ranked] == [task.id for task in tasks]
+                db.expunge_all()
+                label = "one user" if user_id else "all users"
+                print(f"{label:<22} {limit:>6}  {index_seconds * 1000:>9.2f}  {sort_seconds * 1000:>12.1f}  "
+                      f"{sort_seconds / index_seconds:>7.0f}x")
+
+        rows = [{"title": f"Extra {i}", "priority": "high", "user_id": user_ids[0]} for i in range(10000)]
+        with_index, _ = timed(lambda: bulk_create_tasks(db, rows, batch_size=1000), 1)
+        for name in ("ix_tasks_pending_rank", "ix_tasks_user_pending_rank"):
+            db.execute(text(f"DROP INDEX {name}"))
+        db.commit()
+        without_index, _ = timed(lambda: bulk_create_tasks(db, rows, batch_size=1000), 1)
+        print(f"\ninsert 10,000 tasks: {with_index:.2f}s with the rank indexes, {without_index:.2f}s without")
+
+        rerank_seconds, _ = timed(lambda: rebuild_task_rank(db), 1)
+        print(f"db rerank over {db.query(Task).count():,} tasks: {rerank_seconds:.1f}s")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
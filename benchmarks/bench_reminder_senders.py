@@ -0,0 +1,39 @@
+"""Reminders/sec against a local SMTP sink at increasing sender concurrency.
+
+The sink waits ``--delay`` seconds before every reply to stand in for the
+round trip to a real relay.
+
+    python benchmarks/bench_reminder_senders.py --count 500 --delay 0.005
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from task_manager.senders import AsyncSMTPSender, Reminder
+from task_manager.smtp_sink import SMTPSink
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.005)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    reminders = [Reminder(i, f"user{i}@example.com", f"Task {i}") for i in range(args.count)]
+    print(f"{'concurrency':>11}  {'seconds':>8}  {'reminders/sec':>13}")
+    with SMTPSink(delay=args.delay) as sink:
+        for concurrency in args.concurrency:
+            sender = AsyncSMTPSender(sink.host, sink.port, "bench@example.com", concurrency=concurrency)
+            started = time.perf_counter()
+            delivered = sender.deliver(reminders)
+            elapsed = time.perf_counter() - started
+            assert len(delivered) == args.count
+            print(f"{concurrency:>11}  {elapsed:>8.3f}  {args.count / elapsed:>13,.0f}")
+
+
+if __name__ == "__main__":
+    main()
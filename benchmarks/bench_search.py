@@ -0,0 +1,90 @@
+"""Task search latency: the FTS5 index against a LIKE '%word%' scan.
+
+Loads ``--count`` synthetic tasks with bulk_create_tasks into a throwaway
+file database, then times each query three ways: the ranked FTS5 top-N,
+the first N rows a LIKE scan happens to meet (unranked, so it stops early on
+common words), and a LIKE scan over every match, which is what ranking or
+filtering by relevance would need.
+
+    python benchmarks/bench_search.py --count 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import or_
+from sqlalchemy.orm import sessionmaker
+
+from task_manager.database import Base, create_db_engine
+from task_manager.crud import bulk_create_tasks, search_tasks
+from task_manager.models import Task
+
+WORDS = (
+    "invoice report meeting review deploy release budget client call email "
+    "draft design backlog sprint roadmap audit backup server migrate patch "
+    "renew contract payroll hiring onboard train plan launch survey refund"
+).split()
+QUERIES = ("invoice", "quarterly", "deploy server", "renew contract", "onb")
+
+
+def synthetic_tasks(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    for i in range(count):
+        # A rare word, so some queries are selective and some are not.
+        rare = " quarterly" if i % 1000 == 0 else ""
+        yield {
+            "title": " ".join(rng.sample(WORDS, 3)) + rare,
+            "description": " ".join(rng.choices(WORDS, k=12)),
+        }
+
+
+def timed(call, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def like_search(db, query: str, limit: int = None):
+    conditions = [or_(Task.title.like(f"%{word}%"), Task.description.like(f"%{word}%"))
+                  for word in query.split()]
+    return db.query(Task.id).filter(*conditions).limit(limit).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+
+        started = time.perf_counter()
+        bulk_create_tasks(db, synthetic_tasks(args.count), batch_size=5000)
+        print(f"loaded {args.count:,} tasks (with FTS triggers) in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'query':>16}  {'matches':>8}  {'fts top-N ms':>12}  {'like first-N ms':>15}  {'like all ms':>11}")
+        for query in QUERIES:
+            fts_seconds, _ = timed(lambda: search_tasks(db, query, limit=args.limit), args.repeat)
+            first_seconds, _ = timed(lambda: like_search(db, query, args.limit), args.repeat)
+            all_seconds, matches = timed(lambda: like_search(db, query), args.repeat)
+            print(f"{query:>16}  {len(matches):>8,}  {fts_seconds * 1000:>12.1f}  "
+                  f"{first_seconds * 1000:>15.1f}  {all_seconds * 1000:>11.1f}")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Cost of authenticating a command: session token against password check.
+
+Creates ``--sessions`` live session tokens in a throwaway file database and
+times validate_session() served from the in-process cache and with the
+cache cleared before every call (one primary-key lookup), against one
+verify_password() at the configured hashing cost. Then expires every
+session and times the batched purge.
+
+    python benchmarks/bench_sessions.py --sessions 100000
+"""
+import argparse
+import hashlib
+import os
+import random
+import secrets
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from task_manager.crud import create_user, create_session, purge_expired_sessions, session_cache, validate_session
+from task_manager.database import Base, create_db_engine
+from task_manager.models import SessionToken
+from task_manager.passwords import hash_password, verify_password
+
+
+def per_call(call, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        call()
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Sessions deleted per purge transaction")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        user = create_user(db, "bench", hash_password("password"))
+
+        # Rows as create_session would write them, in one transaction.
+        now = datetime.utcnow()
+        tokens = [secrets.token_urlsafe(32) for _ in range(args.sessions)]
+        db.execute(insert(SessionToken), [
+            {"token_hash": hashlib.sha256(token.encode()).hexdigest(), "user_id": user.id,
+             "created_at": now, "expires_at": now + timedelta(days=7)} for token in tokens])
+        db.commit()
+        tokens.append(create_session(db, user.id)[0])
+
+        rng = random.Random(1)
+        hot = tokens[:100]
+        for token in hot:
+            validate_session(db, token)
+        cached = per_call(lambda: validate_session(db, rng.choice(hot)), args.lookups)
+
+        def uncached():
+            session_cache.clear()
+            validate_session(db, rng.choice(tokens))
+        lookup = per_call(uncached, args.lookups)
+        password = per_call(lambda: verify_password("password", user.password_hash), 5)
+
+        print(f"{args.sessions:,} live sessions\n")
+        print(f"{'check':>24}  {'us/call':>10}  {'calls/sec':>10}")
+        for name, seconds in (("token, cached", cached), ("token, database lookup", lookup),
+                              ("password hash", password)):
+            print(f"{name:>24}  {seconds * 1e6:>10,.1f}  {1 / seconds:>10,.0f}")
+
+        started = time.perf_counter()
+        purged = purge_expired_sessions(db, now=datetime.utcnow() + timedelta(days=365), batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"\npurged {purged:,} expired sessions in {elapsed:.2f}s ({purged / elapsed:,.0f}/sec)")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
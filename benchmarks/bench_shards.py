@@ -0,0 +1,99 @@
+"""Write throughput of concurrent writers against the number of shards.
+
+For each shard count in ``--shards``, builds a throwaway sharded database
+with ``--writers`` users spread over the shards, then starts one process per
+user that adds tasks for that user with crud.create_task (one transaction
+per task, as `task add` does) for ``--duration`` seconds. Reports tasks
+written per second and the p50/p99 latency of one add. With a single shard
+every writer queues for the same SQLite write lock; with more, writers on
+different shards commit independently.
+
+Shards raise throughput when the lock is the bottleneck: durable commits
+(``--synchronous FULL``) on a disk with slow fsyncs, and cores to spare.
+Where commits are cheap and cores few, CPU is the limit, and more shards
+mostly shorten the queue (the p99) rather than add tasks per second.
+
+    python benchmarks/bench_shards.py --writers 8 --shards 1 2 4 8 --synchronous FULL
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def writer(path: str, shards: int, user_id: int, duration: float, start, results):
+    from task_manager.crud import create_task
+    from task_manager.database import ShardRouter
+
+    router = ShardRouter(f"sqlite:///{path}", count=shards)
+    db = router.session()
+    router.shard_for_user(user_id)  # warm the directory cache
+    latencies = []
+    start.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        create_task(db, f"Task from writer {user_id}", None, None, "low", user_id=user_id)
+        latencies.append(time.perf_counter() - started)
+    db.close()
+    router.dispose()
+    results.put(latencies)
+
+
+def run(tmp: str, shards: int, writers: int, duration: float):
+    from task_manager.crud import create_user
+    from task_manager.database import ShardRouter
+
+    path = os.path.join(tmp, f"bench-{shards}.db")
+    router = ShardRouter(f"sqlite:///{path}", count=shards)
+    router.create_all()
+    db = router.session()
+    user_ids = [create_user(db, f"writer-{i}", "x").id for i in range(writers)]
+    db.close()
+    router.dispose()
+
+    start = multiprocessing.Barrier(writers + 1)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=writer, args=(path, shards, user_id, duration, start, results))
+                 for user_id in user_ids]
+    for process in processes:
+        process.start()
+    start.wait()
+    latencies = [latency for _ in processes for latency in results.get()]
+    for process in processes:
+        process.join()
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent writer processes, one user each")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="Shard counts to compare")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds each run writes for")
+    parser.add_argument("--synchronous", default=None, help="SQLITE_SYNCHRONOUS for every shard (NORMAL, FULL...)")
+    parser.add_argument("--dir", default=None, help="Where to create the databases [default: a temporary directory]")
+    args = parser.parse_args()
+    if args.synchronous:
+        # Read by task_manager.config, which the writers import after this.
+        os.environ["SQLITE_SYNCHRONOUS"] = args.synchronous
+
+    print(f"{args.writers} writers, {args.duration:.0f}s per run, "
+          f"synchronous={os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')}\n")
+    print(f"{'shards':>6}  {'tasks':>7}  {'tasks/s':>8}  {'speedup':>7}  {'p50 ms':>7}  {'p99 ms':>7}")
+    baseline = None
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for shards in args.shards:
+            latencies = run(tmp, shards, args.writers, args.duration)
+            rate = len(latencies) / args.duration
+            baseline = baseline or rate
+            print(f"{shards:>6}  {len(latencies):>7,}  {rate:>8,.0f}  {rate / baseline:>6.2f}x  "
+                  f"{latencies[len(latencies) // 2] * 1000:>7.2f}  "
+                  f"{latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
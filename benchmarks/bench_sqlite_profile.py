@@ -0,0 +1,56 @@
+"""Task create/list throughput with and without the SQLite performance profile.
+
+Each create commits on its own, as `task add` does, so this mostly measures
+the cost of a durable commit under each profile.
+
+    python benchmarks/bench_sqlite_profile.py --count 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.orm import sessionmaker
+
+from task_manager.database import Base, create_db_engine
+from task_manager.crud import create_task, iter_task_pages, TASK_LIST_COLUMNS
+from task_manager.models import Priority
+
+
+def run(profile: bool, count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile=profile, echo=False)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+
+        started = time.perf_counter()
+        for i in range(count):
+            create_task(db, f"Task {i}", "benchmark", None, Priority.MEDIUM)
+        create_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        listed = sum(len(page) for page in iter_task_pages(db, 100, load="joined", columns=TASK_LIST_COLUMNS))
+        list_seconds = time.perf_counter() - started
+        assert listed == count
+
+        db.close()
+        engine.dispose()
+    return count / create_seconds, count / list_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'profile':>8}  {'creates/sec':>11}  {'rows listed/sec':>15}")
+    for profile in (False, True):
+        creates, listed = run(profile, args.count)
+        print(f"{'on' if profile else 'off':>8}  {creates:>11,.0f}  {listed:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
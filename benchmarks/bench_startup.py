@@ -0,0 +1,83 @@
+"""CLI startup cost, measured with ``python -X importtime``.
+
+Reports the median wall time of a few common invocations, the cumulative
+import time of task_manager.cli and the modules with the highest self time.
+Exits non-zero when the import time exceeds ``--threshold-ms``.
+
+    python benchmarks/bench_startup.py --runs 10 --threshold-ms 250
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+INVOCATIONS = [
+    ["--help"],
+    ["task", "--help"],
+    ["task", "list", "--page-size", "10"],
+]
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Map module name -> (self_us, cumulative_us) from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def import_profile(module: str = "task_manager.cli") -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def wall_time(argv, env) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "task_manager.cli", *argv], cwd=ROOT, env=env,
+                   capture_output=True, check=False)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--threshold-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    cli_ms = statistics.median(p["task_manager.cli"][1] for p in profiles) / 1000
+    print(f"import task_manager.cli: {cli_ms:.1f} ms (median of {args.runs})")
+
+    last = profiles[-1]
+    print(f"\ntop {args.top} modules by self time:")
+    for name, (self_us, _) in sorted(last.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {self_us / 1000:8.2f} ms  {name}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DB_NAME": os.path.join(tmp, "startup.db")}
+        subprocess.run([sys.executable, "-m", "task_manager.cli", "init"], cwd=ROOT, env=env,
+                       capture_output=True, check=True)
+        print("\nwall time per invocation:")
+        for argv in INVOCATIONS:
+            median = statistics.median(wall_time(argv, env) for _ in range(args.runs))
+            print(f"  {median * 1000:8.1f} ms  task-manager {' '.join(argv)}")
+
+    if args.threshold_ms is not None and cli_ms > args.threshold_ms:
+        print(f"\nFAIL: import time {cli_ms:.1f} ms exceeds {args.threshold_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""task_stats() latency on a large table, one grouping at a time.
+
+Loads ``--count`` synthetic tasks spread over users, categories, statuses,
+priorities and due dates into a throwaway file database, then times each
+grouping read from the task_counts summary table and counted from tasks,
+with and without a user filter, and over a date window (which always counts
+from tasks).
+
+    python benchmarks/bench_stats.py --count 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+from task_manager.database import Base, create_db_engine
+from task_manager.crud import bulk_create_tasks, task_stats
+from task_manager.models import User
+
+GROUPINGS = (("status",), ("priority",), ("category",), ("user",), ("overdue",), ("user", "status"))
+
+
+def synthetic_tasks(count: int, users: int, categories: int, seed: int = 1):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    for i in range(count):
+        yield {
+            "title": f"Task {i}",
+            "priority": rng.choice(("low", "medium", "high")),
+            "status": "completed" if rng.random() < 0.6 else "pending",
+            "due_date": now + timedelta(days=rng.randint(-60, 60)) if rng.random() < 0.8 else None,
+            "created_at": now - timedelta(days=rng.randint(0, 365)),
+            "category": f"category-{rng.randrange(categories)}",
+            "user_id": rng.randint(1, users),
+        }
+
+
+def timed(call, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+
+        started = time.perf_counter()
+        db.execute(insert(User), [{"username": f"user{i}", "password_hash": "x"}
+                                  for i in range(1, args.users + 1)])
+        db.commit()
+        bulk_create_tasks(db, synthetic_tasks(args.count, args.users, args.categories), batch_size=5000)
+        db.execute(text("ANALYZE"))
+        print(f"loaded {args.count:,} tasks in {time.perf_counter() - started:.1f}s\n")
+
+        window = dict(since=datetime.utcnow() - timedelta(days=30))
+        print(f"{'group by':>16}  {'groups':>7}  {'summary ms':>10}  {'scan ms':>8}  "
+              f"{'one user summary ms':>19}  {'one user scan ms':>16}  {'last 30 days ms':>15}")
+        for group_by in GROUPINGS:
+            summary_seconds, rows = timed(lambda: task_stats(db, group_by), args.repeat)
+            scan_seconds, scanned = timed(lambda: task_stats(db, group_by, use_summary=False), args.repeat)
+            user_summary_seconds, _ = timed(lambda: task_stats(db, group_by, user_id=1), args.repeat)
+            user_scan_seconds, _ = timed(lambda: task_stats(db, group_by, user_id=1, use_summary=False),
+                                         args.repeat)
+            window_seconds, _ = timed(lambda: task_stats(db, group_by, **window), args.repeat)
+            assert rows == scanned and sum(row["count"] for row in rows) == args.count
+            print(f"{'+'.join(group_by):>16}  {len(rows):>7,}  {summary_seconds * 1000:>10.1f}  "
+                  f"{scan_seconds * 1000:>8.1f}  {user_summary_seconds * 1000:>19.1f}  "
+                  f"{user_scan_seconds * 1000:>16.1f}  {window_seconds * 1000:>15.1f}")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Timing suite for the CRUD and worker hot paths, with a regression check.
+
+For each of ``--sizes`` it builds (once, then reuses from ``--data-dir``) a
+synthetic database whose users and categories follow a Zipf distribution,
+so a few users own most tasks. Every run works on a fresh copy of it and
+times create_task, get_task, get_tasks with each filter, update_task,
+delete_task, a check_due_tasks sweep and `task list` in a new process.
+
+Each benchmark runs ``--rounds`` times and reports its best round.
+Results are printed and, with ``--output``, written as JSON keyed
+"<size>/<benchmark>". ``--baseline`` compares the medians against an
+earlier results file and exits 1 when any is more than ``--threshold``
+slower (and by more than ``--min-delta-ms``); ``--save-baseline`` writes
+this run as the new baseline. Baselines are only comparable on the
+machine that recorded them, and a threshold tighter than the default
+needs a quiet one: on a shared VM, medians move by a third between
+identical runs.
+
+    python benchmarks/bench_suite.py --sizes 10000,100000 --output results.json
+    python benchmarks/bench_suite.py --sizes 10000 --baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --sizes 1000000 --only get_tasks
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+from task_manager import crud
+from task_manager.database import Base, create_db_engine
+from task_manager.models import Priority, Status, User
+from task_manager.worker import check_due_tasks
+
+# Bump when synthetic_tasks changes, so cached datasets are rebuilt.
+DATASET_VERSION = 1
+CATEGORIES = 50
+
+
+def zipf_cum_weights(n: int, s: float = 1.1) -> list:
+    return list(accumulate(1 / rank ** s for rank in range(1, n + 1)))
+
+
+def user_count(size: int) -> int:
+    return max(10, size // 100)
+
+
+def synthetic_tasks(size: int, seed: int):
+    """Tasks over Zipf-skewed users and categories: 60% completed, 20% with
+    no due date, and 10% overdue with their reminder still unsent."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    users = rng.choices(range(1, user_count(size) + 1), cum_weights=zipf_cum_weights(user_count(size)), k=size)
+    categories = rng.choices(range(CATEGORIES), cum_weights=zipf_cum_weights(CATEGORIES), k=size)
+    for i in range(size):
+        roll = rng.random()
+        if roll < 0.1:
+            due_date = now - timedelta(days=rng.randint(1, 30))
+        elif roll < 0.3:
+            due_date = None
+        else:
+            due_date = now + timedelta(days=rng.randint(30, 365))
+        yield {
+            "title": f"Task {i}",
+            "description": "synthetic benchmark task",
+            "due_date": due_date,
+            "priority": rng.choice(("low", "medium", "high")),
+            "status": "completed" if rng.random() < 0.6 and roll >= 0.1 else "pending",
+            "category": f"category-{categories[i]}",
+            "user_id": users[i] if rng.random() > 0.05 else None,
+            "created_at": now - timedelta(days=rng.randint(0, 365)),
+        }
+
+
+def dataset(data_dir: str, size: int, seed: int) -> str:
+    """Path of the cached database for ``size``, building it if needed."""
+    path = os.path.join(data_dir, f"tasks-{size}-seed{seed}-v{DATASET_VERSION}.db")
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    started = time.perf_counter()
+    engine = create_db_engine(f"sqlite:///{partial}", echo=False)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.execute(insert(User), [{"username": f"user{i}", "password_hash": "x"}
+                              for i in range(1, user_count(size) + 1)])
+    db.commit()
+    crud.bulk_create_tasks(db, synthetic_tasks(size, seed), batch_size=5000)
+    db.execute(text("ANALYZE"))
+    db.commit()
+    db.close()
+    engine.dispose()
+    os.rename(partial, path)
+    print(f"built {size:,}-task dataset in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return path
+
+
+class Context:
+    def __init__(self, db_path: str, size: int, seed: int):
+        self.db_path = db_path
+        self.size = size
+        self.rng = random.Random(seed)
+        self.engine = create_db_engine(f"sqlite:///{db_path}", echo=False)
+        self.db = sessionmaker(bind=self.engine, autoflush=False)()
+        # User 1 owns the most tasks; the last user owns the fewest.
+        self.hot_user, self.cold_user = 1, user_count(size)
+        self.undeleted_ids = list(range(1, size + 1))
+        self.rng.shuffle(self.undeleted_ids)
+
+    def random_id(self) -> int:
+        return self.rng.randint(1, self.size)
+
+    def close(self):
+        self.db.close()
+        self.engine.dispose()
+
+
+BENCHMARKS = []
+
+
+def benchmark(name: str, ops: int, warmup: int = 5):
+    """Register ``setup(ctx) -> operation``; each call of ``operation`` is timed."""
+    def register(setup):
+        BENCHMARKS.append((name, ops, warmup, setup))
+        return setup
+    return register
+
+
+@benchmark("get_task", 500)
+def _get_task(ctx):
+    return lambda: crud.get_task(ctx.db, ctx.random_id())
+
+
+for label, filters in (
+    ("none", {}),
+    ("status", {"status": Status.PENDING}),
+    ("user_hot", {"user_id": "hot"}),
+    ("user_cold", {"user_id": "cold"}),
+    ("status_user", {"status": Status.PENDING, "user_id": "hot"}),
+):
+    def _get_tasks(ctx, filters=filters):
+        filters = dict(filters)
+        if "user_id" in filters:
+            filters["user_id"] = ctx.hot_user if filters["user_id"] == "hot" else ctx.cold_user
+        return lambda: crud.get_tasks(ctx.db, limit=100, **filters)
+    benchmark(f"get_tasks[{label}]", 200)(_get_tasks)
+
+
+@benchmark("get_tasks_page[due_date]", 200)
+def _get_tasks_page(ctx):
+    cursors = [crud.get_tasks_page(ctx.db, 100, sort="due_date")[1]]
+
+    def page():
+        tasks, cursor = crud.get_tasks_page(ctx.db, 100, cursors[-1], sort="due_date")
+        cursors.append(cursor or cursors[0])
+    return page
+
+
+@benchmark("check_due_tasks", 5, warmup=1)
+def _check_due_tasks(ctx):
+    # No synthetic user has an email address, so a sweep reads every due
+    # task and sends nothing, and every sweep does the same work.
+    return lambda: check_due_tasks(ctx.db)
+
+
+@benchmark("cli_list_page", 5, warmup=1)
+def _cli_list_page(ctx):
+    return _cli(ctx, ["task", "list", "--format", "tsv", "--page-size", "100"])
+
+
+@benchmark("cli_list_all", 1, warmup=0)
+def _cli_list_all(ctx):
+    return _cli(ctx, ["task", "list", "--format", "tsv", "--all"])
+
+
+def _cli(ctx, args):
+    env = dict(os.environ, DB_NAME=ctx.db_path)
+    argv = [sys.executable, "-m", "task_manager.cli", *args]
+    return lambda: subprocess.run(argv, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                  check=True)
+
+
+# Writes come last: they change the data the reads above measure.
+@benchmark("create_task", 200)
+def _create_task(ctx):
+    return lambda: crud.create_task(ctx.db, "Benchmark task", None, datetime.utcnow() + timedelta(days=7),
+                                    Priority.MEDIUM, user_id=ctx.hot_user)
+
+
+@benchmark("update_task", 200)
+def _update_task(ctx):
+    return lambda: crud.update_task(ctx.db, ctx.random_id(), status=ctx.rng.choice(list(Status)))
+
+
+@benchmark("delete_task", 200)
+def _delete_task(ctx):
+    return lambda: crud.delete_task(ctx.db, ctx.undeleted_ids.pop())
+
+
+def run_benchmark(ctx, ops: int, warmup: int, setup, rounds: int) -> dict:
+    """Time ``ops`` calls per round and keep the round with the lowest median.
+
+    Anything else running on the machine only ever makes a round slower, so
+    the best round is the most repeatable figure to compare across runs.
+    """
+    best = None
+    for _ in range(rounds):
+        operation = setup(ctx)
+        for _ in range(warmup):
+            operation()
+        timings = []
+        for _ in range(ops):
+            started = time.perf_counter()
+            operation()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        if best is None or statistics.median(timings) < statistics.median(best):
+            best = timings
+    return {
+        "ops": ops,
+        "rounds": rounds,
+        "median_ms": statistics.median(best),
+        "p95_ms": best[min(int(len(best) * 0.95), len(best) - 1)],
+        "mean_ms": statistics.fmean(best),
+    }
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """Benchmarks whose median got more than ``threshold`` (a fraction) and
+    ``min_delta_ms`` slower than in ``baseline``."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        delta = current["median_ms"] - previous["median_ms"]
+        if delta > min_delta_ms and current["median_ms"] > previous["median_ms"] * (1 + threshold):
+            regressions.append((key, previous["median_ms"], current["median_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated dataset sizes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds per benchmark; the best one counts")
+    parser.add_argument("--only", action="append", help="Run benchmarks whose name contains this; repeatable")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "task-manager-bench"),
+                        help="Where generated datasets are cached")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--save-baseline", help="Write this run's results here as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Allowed slowdown, as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this, however large in relative terms")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)["results"]
+
+    results = {}
+    print(f"{'benchmark':>36}  {'ops':>5}  {'median ms':>10}  {'p95 ms':>10}  {'vs baseline':>11}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        source = dataset(args.data_dir, size, args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            shutil.copyfile(source, db_path)
+            ctx = Context(db_path, size, args.seed)
+            try:
+                for name, ops, warmup, setup in BENCHMARKS:
+                    if args.only and not any(part in name for part in args.only):
+                        continue
+                    key = f"{size}/{name}"
+                    results[key] = result = run_benchmark(ctx, ops, warmup, setup, args.rounds)
+                    change = ""
+                    if key in baseline:
+                        change = f"{result['median_ms'] / baseline[key]['median_ms'] - 1:>+10.0%}"
+                    print(f"{key:>36}  {ops:>5}  {result['median_ms']:>10.3f}  {result['p95_ms']:>10.3f}  {change:>11}")
+            finally:
+                ctx.close()
+
+    report = {"meta": metadata(), "results": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+                handle.write("\n")
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regressions beyond {args.threshold:.0%}:", file=sys.stderr)
+        for key, before, after in regressions:
+            print(f"  {key}: {before:.3f} ms -> {after:.3f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
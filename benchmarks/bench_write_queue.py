@@ -0,0 +1,146 @@
+"""Write throughput of concurrent producers with and without the write queue.
+
+``--producers`` producers add tasks for ``--duration`` seconds, as threads of
+one process and as separate processes, each way in turn:
+
+* direct: crud.create_task, one commit per task, as `task add` does;
+* queue: through a WriteQueue (for processes, one per process, so only the
+  advisory lock between them is shared);
+* daemon: processes only, through RemoteWriteQueue to one `task-manager
+  serve`, whose queue batches every process's writes together.
+
+Reports tasks written per second, p50/p99 latency of one add and the adds
+that failed (``database is locked`` once ``busy_timeout`` runs out).
+
+Queues in separate processes have nothing to batch but their own writes;
+they only take turns through the lock, so across processes the daemon is
+the one that group-commits. Where commits are cheap and cores few, CPU is
+the limit and the queue mostly shortens the tail (p99) rather than adding
+tasks per second.
+
+    python benchmarks/bench_write_queue.py --producers 8 --duration 5 --synchronous FULL
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def produce(submit, name: str, deadline: float, latencies: list, errors: list):
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            submit(f"{name} {i}")
+        except Exception:
+            errors.append(1)
+        else:
+            latencies.append(time.perf_counter() - started)
+        i += 1
+
+
+def host(mode: str, threads: int, duration: float, socket_path: str, start, results):
+    """One producer process running ``threads`` producers."""
+    from task_manager.crud import create_task
+    from task_manager.database import SessionLocal
+    from task_manager.write_queue import RemoteWriteQueue, WriteQueue
+
+    queue = WriteQueue(SessionLocal) if mode == "queue" else None
+    remotes = []
+
+    def submitter():
+        if mode == "direct":
+            db = SessionLocal()
+            return lambda title: create_task(db, title, None, None, "low")
+        if mode == "queue":
+            return lambda title: queue.submit("create_task", title=title)
+        remote = RemoteWriteQueue(socket_path)
+        remotes.append(remote)
+        return lambda title: remote.submit("create_task", title=title)
+
+    submits = [submitter() for _ in range(threads)]
+    latencies, errors = [], []
+    start.wait()
+    deadline = time.perf_counter() + duration
+    workers = [threading.Thread(target=produce, args=(submit, f"producer {n}", deadline, latencies, errors))
+               for n, submit in enumerate(submits)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    for remote in remotes:
+        remote.close()
+    if queue:
+        queue.close()
+    results.put((latencies, len(errors)))
+
+
+def run(tmp: str, mode: str, producers: int, as_processes: bool, duration: float):
+    context = multiprocessing.get_context("spawn")
+    path = os.path.join(tmp, f"{mode}-{'processes' if as_processes else 'threads'}.db")
+    # Read by task_manager.config in every process started from here on.
+    os.environ["DB_NAME"] = path
+    subprocess.run([sys.executable, "-m", "task_manager.cli", "init"], cwd=ROOT, capture_output=True, check=True)
+
+    server, socket_path = None, os.path.join(tmp, "daemon.sock")
+    if mode == "daemon":
+        server = subprocess.Popen([sys.executable, "-m", "task_manager.cli", "serve", "--socket", socket_path],
+                                  cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while not os.path.exists(socket_path):
+            time.sleep(0.05)
+    try:
+        hosts = producers if as_processes else 1
+        threads = 1 if as_processes else producers
+        start = context.Barrier(hosts + 1)
+        results = context.Queue()
+        processes = [context.Process(target=host, args=(mode, threads, duration, socket_path, start, results))
+                     for _ in range(hosts)]
+        for process in processes:
+            process.start()
+        start.wait()
+        latencies, errors = [], 0
+        for _ in processes:
+            host_latencies, host_errors = results.get()
+            latencies += host_latencies
+            errors += host_errors
+        for process in processes:
+            process.join()
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    return sorted(latencies), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--producers", type=int, default=8, help="Concurrent producers")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds each run writes for")
+    parser.add_argument("--synchronous", default=None, help="SQLITE_SYNCHRONOUS (NORMAL, FULL...)")
+    parser.add_argument("--dir", default=None, help="Where to create the databases [default: a temporary directory]")
+    args = parser.parse_args()
+    if args.synchronous:
+        os.environ["SQLITE_SYNCHRONOUS"] = args.synchronous
+
+    print(f"{args.producers} producers, {args.duration:.0f}s per run, "
+          f"synchronous={os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')}\n")
+    print(f"{'producers':<10} {'mode':<7} {'tasks':>7}  {'tasks/s':>8}  {'p50 ms':>7}  {'p99 ms':>7}  {'failed':>6}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for as_processes, modes in ((False, ("direct", "queue")), (True, ("direct", "queue", "daemon"))):
+            for mode in modes:
+                latencies, errors = run(tmp, mode, args.producers, as_processes, args.duration)
+                p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+                p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000 if latencies else 0.0
+                print(f"{'processes' if as_processes else 'threads':<10} {mode:<7} {len(latencies):>7,}  "
+                      f"{len(latencies) / args.duration:>8,.0f}  {p50:>7.2f}  {p99:>7.2f}  {errors:>6}")
+
+
+if __name__ == "__main__":
+    main()
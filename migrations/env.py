@@ -2,9 +2,39 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from alembic import context
+from sqlalchemy import create_engine
+
 from task_manager.models import Base
 from task_manager.config import SQLALCHEMY_DATABASE_URI
 
-# ...
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=SQLALCHEMY_DATABASE_URI,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(SQLALCHEMY_DATABASE_URI)
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
 
-target_metadata = Base.metadata
\ No newline at end of file
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
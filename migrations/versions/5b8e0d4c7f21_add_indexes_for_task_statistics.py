@@ -0,0 +1,33 @@
+"""Add indexes for task statistics
+
+Revision ID: 5b8e0d4c7f21
+Revises: a3f1c9d2e4b7
+Create Date: 2026-10-18 13:40:07.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e0d4c7f21'
+down_revision: Union[str, None] = 'a3f1c9d2e4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ix_tasks_status_due_date has ix_tasks_status as a prefix, so it replaces it.
+    op.drop_index('ix_tasks_status', table_name='tasks', if_exists=True)
+    op.create_index('ix_tasks_status_due_date', 'tasks', ['status', 'due_date'], if_not_exists=True)
+    op.create_index('ix_tasks_priority', 'tasks', ['priority'], if_not_exists=True)
+    op.create_index('ix_tasks_category_id', 'tasks', ['category_id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_category_id', table_name='tasks', if_exists=True)
+    op.drop_index('ix_tasks_priority', table_name='tasks', if_exists=True)
+    op.drop_index('ix_tasks_status_due_date', table_name='tasks', if_exists=True)
+    op.create_index('ix_tasks_status', 'tasks', ['status'], if_not_exists=True)
@@ -0,0 +1,36 @@
+"""Add indexes for hot task queries
+
+Revision ID: 8c2d5e7a9b14
+Revises: 1fa6cc602c50
+Create Date: 2026-10-18 09:12:41.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2d5e7a9b14'
+down_revision: Union[str, None] = '1fa6cc602c50'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases created by init_db() may already have these, hence if_not_exists.
+    op.drop_index('ix_tasks_title', table_name='tasks', if_exists=True)
+    op.create_index('ix_tasks_reminder_due', 'tasks', ['due_date', 'status'],
+                    sqlite_where=sa.text('reminder_sent = 0'), if_not_exists=True)
+    op.create_index('ix_tasks_user_status', 'tasks', ['user_id', 'status'], if_not_exists=True)
+    op.create_index('ix_tasks_status', 'tasks', ['status'], if_not_exists=True)
+    op.create_index('ix_tasks_due_date_id', 'tasks', ['due_date', 'id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_due_date_id', table_name='tasks', if_exists=True)
+    op.drop_index('ix_tasks_status', table_name='tasks', if_exists=True)
+    op.drop_index('ix_tasks_user_status', table_name='tasks', if_exists=True)
+    op.drop_index('ix_tasks_reminder_due', table_name='tasks', if_exists=True)
+    op.create_index('ix_tasks_title', 'tasks', ['title'], if_not_exists=True)
@@ -0,0 +1,42 @@
+"""Add user_shards and shard_sequence tables
+
+Revision ID: b6d3f8e1a042
+Revises: e4b9c1a7d352
+Create Date: 2026-10-18 23:41:07.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d3f8e1a042'
+down_revision: Union[str, None] = 'e4b9c1a7d352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_shards',
+        sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('moving_from', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'shard_sequence',
+        sa.Column('shard', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('next_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('shard'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('shard_sequence')
+    op.drop_table('user_shards')
@@ -0,0 +1,56 @@
+"""Add task_series and tasks.series_id for recurring tasks
+
+Revision ID: c5a2e9f4d187
+Revises: b6d3f8e1a042
+Create Date: 2026-10-18 23:58:12.204613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a2e9f4d187'
+down_revision: Union[str, None] = 'b6d3f8e1a042'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_series',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('priority', sa.Enum('LOW', 'MEDIUM', 'HIGH', name='priority', native_enum=False), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('frequency', sa.Enum('DAILY', 'WEEKLY', 'MONTHLY', name='frequency', native_enum=False),
+                  nullable=False),
+        sa.Column('interval', sa.Integer(), nullable=False),
+        sa.Column('starts_at', sa.DateTime(), nullable=False),
+        sa.Column('until', sa.DateTime(), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=True),
+        sa.Column('next_index', sa.Integer(), nullable=False),
+        sa.Column('next_due', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_task_series_next_due', 'task_series', ['next_due'], unique=False, if_not_exists=True)
+    # Plain ALTER TABLE: alembic can only add a foreign key on SQLite in
+    # batch mode, and rebuilding tasks would drop its triggers.
+    op.execute("ALTER TABLE tasks ADD COLUMN series_id INTEGER REFERENCES task_series (id) ON DELETE SET NULL")
+    op.create_index('ix_tasks_series_status', 'tasks', ['series_id', 'status'], unique=False,
+                    sqlite_where=sa.text('series_id IS NOT NULL'), if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_series_status', table_name='tasks')
+    op.execute("ALTER TABLE tasks DROP COLUMN series_id")
+    op.drop_index('ix_task_series_next_due', table_name='task_series')
+    op.drop_table('task_series')
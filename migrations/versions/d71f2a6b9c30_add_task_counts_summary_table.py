@@ -0,0 +1,82 @@
+"""Add task_counts summary table
+
+Revision ID: d71f2a6b9c30
+Revises: 5b8e0d4c7f21
+Create Date: 2026-10-18 15:02:33.640195
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd71f2a6b9c30'
+down_revision: Union[str, None] = '5b8e0d4c7f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every task is counted under its own user (0 for none) and under -1, "all users".
+USERS = ("coalesce({row}.user_id, 0)", "-1")
+
+
+def increment(row):
+    return "".join(
+        "INSERT INTO task_counts(user_id, category_id, status, priority, count) VALUES ("
+        f"{user.format(row=row)}, coalesce({row}.category_id, 0), {row}.status, coalesce({row}.priority, ''), 1) "
+        "ON CONFLICT(user_id, category_id, status, priority) DO UPDATE SET count = count + 1; "
+        for user in USERS
+    )
+
+
+def decrement(row):
+    keys = [
+        f"user_id = {user.format(row=row)} AND category_id = coalesce({row}.category_id, 0) "
+        f"AND status = {row}.status AND priority = coalesce({row}.priority, '')"
+        for user in USERS
+    ]
+    return "".join(
+        f"UPDATE task_counts SET count = count - 1 WHERE {key}; "
+        f"DELETE FROM task_counts WHERE {key} AND count <= 0; "
+        for key in keys
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_counts',
+        sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('priority', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'category_id', 'status', 'priority'),
+        sqlite_with_rowid=False,
+        if_not_exists=True,
+    )
+    op.execute("CREATE TRIGGER IF NOT EXISTS task_counts_insert AFTER INSERT ON tasks BEGIN "
+               + increment("new") + "END")
+    op.execute("CREATE TRIGGER IF NOT EXISTS task_counts_delete AFTER DELETE ON tasks BEGIN "
+               + decrement("old") + "END")
+    op.execute("CREATE TRIGGER IF NOT EXISTS task_counts_update AFTER UPDATE OF user_id, category_id, status, priority "
+               "ON tasks WHEN old.user_id IS NOT new.user_id OR old.category_id IS NOT new.category_id "
+               "OR old.status IS NOT new.status OR old.priority IS NOT new.priority BEGIN "
+               + decrement("old") + increment("new") + "END")
+    # Count the rows that existed before the triggers did.
+    op.execute("DELETE FROM task_counts")
+    op.execute(
+        "INSERT INTO task_counts(user_id, category_id, status, priority, count) "
+        "SELECT coalesce(user_id, 0), coalesce(category_id, 0), status, coalesce(priority, ''), count(*) "
+        "FROM tasks GROUP BY 1, 2, 3, 4 "
+        "UNION ALL "
+        "SELECT -1, coalesce(category_id, 0), status, coalesce(priority, ''), count(*) "
+        "FROM tasks GROUP BY 2, 3, 4"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS task_counts_update")
+    op.execute("DROP TRIGGER IF EXISTS task_counts_delete")
+    op.execute("DROP TRIGGER IF EXISTS task_counts_insert")
+    op.drop_table('task_counts', if_exists=True)
@@ -0,0 +1,39 @@
+"""Add session_tokens table
+
+Revision ID: e4b9c1a7d352
+Revises: d71f2a6b9c30
+Create Date: 2026-10-18 22:14:51.402318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9c1a7d352'
+down_revision: Union[str, None] = 'd71f2a6b9c30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'session_tokens',
+        sa.Column('token_hash', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('token_hash'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_session_tokens_user_id', 'session_tokens', ['user_id'], if_not_exists=True)
+    op.create_index('ix_session_tokens_expires_at', 'session_tokens', ['expires_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_session_tokens_expires_at', table_name='session_tokens')
+    op.drop_index('ix_session_tokens_user_id', table_name='session_tokens')
+    op.drop_table('session_tokens')
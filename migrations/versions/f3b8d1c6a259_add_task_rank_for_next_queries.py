@@ -0,0 +1,35 @@
+"""Add the generated tasks.rank column and its indexes for `task next`
+
+Revision ID: f3b8d1c6a259
+Revises: c5a2e9f4d187
+Create Date: 2026-10-19 00:31:44.918305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from task_manager.models import task_rank_sql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d1c6a259'
+down_revision: Union[str, None] = 'c5a2e9f4d187'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Uses the RANK_* settings in effect now; `db rerank` applies later changes.
+    op.execute(f"ALTER TABLE tasks ADD COLUMN rank FLOAT GENERATED ALWAYS AS ({task_rank_sql()}) VIRTUAL")
+    op.create_index('ix_tasks_pending_rank', 'tasks', ['status', 'rank', 'id'], unique=False,
+                    sqlite_where=sa.text("status = 'PENDING'"), if_not_exists=True)
+    op.create_index('ix_tasks_user_pending_rank', 'tasks', ['user_id', 'rank', 'id'], unique=False,
+                    sqlite_where=sa.text("status = 'PENDING'"), if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_user_pending_rank', table_name='tasks')
+    op.drop_index('ix_tasks_pending_rank', table_name='tasks')
+    op.execute("ALTER TABLE tasks DROP COLUMN rank")
@@ -0,0 +1,530 @@
+"""Local HTTP/JSON API over the CRUD layer (``task-manager api``).
+
+Every request borrows a session from the engine's connection pool for just
+as long as it runs, so a slow client on a kept-alive connection never holds
+a database connection. Routes:
+
+    GET    /tasks                ?limit, after, sort, status, user_id
+    POST   /tasks
+    POST   /tasks/batch          {"op": "create"|"update"|"complete"|"delete", ...}
+    GET    /tasks/search         ?q, status, user_id, limit, exact, raw
+    GET    /tasks/stats          ?by (repeatable), user_id, since, until, date_field
+    GET    /tasks/{id}           ETag; If-None-Match answers 304
+    PATCH  /tasks/{id}           If-Match answers 412 when the task has changed
+    DELETE /tasks/{id}
+    GET    /categories           POST /categories
+    GET    /categories/{id}      PATCH, DELETE
+    GET    /users?username=      POST /users
+    GET    /users/{id}           DELETE
+
+Listings are paged with the same opaque cursors as ``task list``: pass the
+``next`` of one page as ``after`` to get the following one. Response bodies
+of ``GZIP_MIN_BYTES`` or more are gzipped for clients that accept it.
+"""
+import gzip
+import hashlib
+import json
+import re
+import sys
+import traceback
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy.exc import IntegrityError
+
+from . import crud
+from .enums import Priority, Status
+
+API_MAX_PAGE_SIZE = 1000
+# Below this a gzip header and a round through zlib cost more than they save.
+GZIP_MIN_BYTES = 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+TASK_FIELDS = ("title", "description", "due_date", "priority", "status", "category_id", "user_id",
+               "reminder_sent")
+BATCH_SELECTION = {"ids": "ids", "ranges": "id_ranges", "status": "status", "category": "category",
+                   "user_id": "user_id", "due_before": "due_before"}
+
+
+class APIError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, headers: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers, body: bytes = b""):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path.rstrip("/") or "/"
+        self.query = parse_qs(url.query)
+        self.headers = headers
+        self.body = body
+
+    def param(self, name: str, convert=str, default=None):
+        values = self.query.get(name)
+        if not values:
+            return default
+        try:
+            return convert(values[-1])
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Invalid value for '{name}': {values[-1]!r}")
+
+    def json(self) -> dict:
+        try:
+            payload = json.loads(self.body or b"null")
+        except ValueError as exc:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {exc}")
+        if not isinstance(payload, dict):
+            raise APIError(HTTPStatus.BAD_REQUEST, "Expected a JSON object")
+        return payload
+
+
+class Response:
+    def __init__(self, status: HTTPStatus = HTTPStatus.OK, payload=None, headers: dict = None):
+        self.status = status
+        self.payload = payload
+        self.headers = headers or {}
+
+
+def _flag(value: str) -> bool:
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no"):
+        return False
+    raise ValueError(value)
+
+
+def _datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise APIError(HTTPStatus.BAD_REQUEST, f"Invalid ISO date: {value!r}")
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_selection(selection: dict):
+    """Reject a batch ``where`` whose values crud can't take, before they
+    reach it as a TypeError."""
+    ids = selection.get("ids", [])
+    if not isinstance(ids, list) or not all(_is_int(task_id) for task_id in ids):
+        raise APIError(HTTPStatus.BAD_REQUEST, "'ids' must be a list of task ids")
+    ranges = selection.get("id_ranges", [])
+    if not isinstance(ranges, list) or not all(
+            isinstance(pair, list) and len(pair) == 2 and all(_is_int(bound) for bound in pair) for pair in ranges):
+        raise APIError(HTTPStatus.BAD_REQUEST, "'ranges' must be a list of [low, high] id pairs")
+    if "user_id" in selection and not _is_int(selection["user_id"]):
+        raise APIError(HTTPStatus.BAD_REQUEST, "'user_id' must be an integer")
+    for key in ("status", "category", "due_before"):
+        if selection.get(key) is not None and not isinstance(selection[key], str):
+            raise APIError(HTTPStatus.BAD_REQUEST, f"'{key}' must be a string")
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _enum_value(value):
+    return value.value if value is not None else None
+
+
+def task_json(task, category_names: dict) -> dict:
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "due_date": _isoformat(task.due_date),
+        "priority": _enum_value(task.priority),
+        "status": _enum_value(task.status),
+        "category_id": task.category_id,
+        "category": category_names.get(task.category_id),
+        "user_id": task.user_id,
+        "created_at": _isoformat(task.created_at),
+        "reminder_sent": bool(task.reminder_sent),
+    }
+
+
+# Fields _task_values passes through as they are: null or one of these.
+FIELD_TYPES = {
+    "description": (lambda value: isinstance(value, str), "a string"),
+    "category": (lambda value: isinstance(value, str), "a string"),
+    "category_id": (_is_int, "an integer"),
+    "user_id": (_is_int, "an integer"),
+}
+
+
+def _task_values(payload: dict, fields=TASK_FIELDS) -> dict:
+    """Validate a JSON task body into Task column values."""
+    unknown = sorted(set(payload) - set(fields))
+    if unknown:
+        raise APIError(HTTPStatus.BAD_REQUEST, f"Unknown task fields: {', '.join(unknown)}")
+    values = dict(payload)
+    for field, (check, expected) in FIELD_TYPES.items():
+        if values.get(field) is not None and not check(values[field]):
+            raise APIError(HTTPStatus.BAD_REQUEST, f"'{field}' must be {expected}")
+    if "reminder_sent" in values and not isinstance(values["reminder_sent"], bool):
+        raise APIError(HTTPStatus.BAD_REQUEST, "'reminder_sent' must be true or false")
+    try:
+        for field in ("due_date", "created_at"):
+            if field in values:
+                values[field] = _datetime(values[field])
+        if values.get("priority") is not None:
+            values["priority"] = Priority(values["priority"])
+        if "status" in values:
+            values["status"] = Status(values["status"])
+    except ValueError as exc:
+        raise APIError(HTTPStatus.BAD_REQUEST, str(exc))
+    if "title" in values and not (isinstance(values["title"], str) and values["title"]):
+        raise APIError(HTTPStatus.BAD_REQUEST, "A task needs a non-empty title")
+    return values
+
+
+def etag(payload) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _etag_matches(header: str, tag: str) -> bool:
+    """Whether an If-Match / If-None-Match header lists ``tag`` (or is ``*``)."""
+    if header is None:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or tag in [candidate[2:] if candidate.startswith("W/") else candidate
+                                        for candidate in candidates]
+
+
+def _accepts_gzip(header: str) -> bool:
+    for coding in (header or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class TaskAPI:
+    """Routes requests to crud calls; independent of the HTTP server."""
+
+    ROUTES = (
+        ("GET", r"/tasks", "list_tasks"),
+        ("POST", r"/tasks", "create_task"),
+        ("POST", r"/tasks/batch", "batch_tasks"),
+        ("GET", r"/tasks/search", "search_tasks"),
+        ("GET", r"/tasks/stats", "task_stats"),
+        ("GET", r"/tasks/(\d+)", "get_task"),
+        ("PATCH", r"/tasks/(\d+)", "update_task"),
+        ("DELETE", r"/tasks/(\d+)", "delete_task"),
+        ("GET", r"/categories", "list_categories"),
+        ("POST", r"/categories", "create_category"),
+        ("GET", r"/categories/(\d+)", "get_category"),
+        ("PATCH", r"/categories/(\d+)", "update_category"),
+        ("DELETE", r"/categories/(\d+)", "delete_category"),
+        ("GET", r"/users", "find_users"),
+        ("POST", r"/users", "create_user"),
+        ("GET", r"/users/(\d+)", "get_user"),
+        ("DELETE", r"/users/(\d+)", "delete_user"),
+    )
+
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            from .database import SessionLocal as session_factory
+        self.session_factory = session_factory
+        self._routes = [(method, re.compile(pattern + "$"), name) for method, pattern, name in self.ROUTES]
+
+    def handle(self, request: Request) -> Response:
+        allowed = []
+        for method, pattern, name in self._routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            db = self.session_factory()
+            try:
+                return getattr(self, name)(db, request, *(int(group) for group in match.groups()))
+            except IntegrityError as exc:
+                db.rollback()
+                raise APIError(HTTPStatus.CONFLICT, f"Conflicts with existing data: {exc.orig}")
+            except ValueError as exc:
+                db.rollback()
+                raise APIError(HTTPStatus.BAD_REQUEST, str(exc))
+            finally:
+                db.close()
+        if allowed:
+            raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, f"{request.method} not allowed on {request.path}",
+                           {"Allow": ", ".join(allowed)})
+        raise APIError(HTTPStatus.NOT_FOUND, f"No route for {request.path}")
+
+    # Tasks
+    def _task_or_404(self, db, task_id: int):
+        task = crud.get_task(db, task_id)
+        if task is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Task {task_id} not found")
+        payload = task_json(task, crud.get_category_names(db))
+        return task, payload, etag(payload)
+
+    def list_tasks(self, db, request: Request) -> Response:
+        limit = request.param("limit", int, 100)
+        if not 1 <= limit <= API_MAX_PAGE_SIZE:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"limit must be between 1 and {API_MAX_PAGE_SIZE}")
+        status = request.param("status", Status)
+        tasks, cursor = crud.get_tasks_page(db, limit, request.param("after"), request.param("sort", default="id"),
+                                            status=status, user_id=request.param("user_id", int))
+        names = crud.get_category_names(db)
+        return Response(payload={"tasks": [task_json(task, names) for task in tasks], "next": cursor})
+
+    def create_task(self, db, request: Request) -> Response:
+        values = _task_values(request.json())
+        if "title" not in values:
+            raise APIError(HTTPStatus.BAD_REQUEST, "A task needs a non-empty title")
+        task = crud.create_task(db, values.pop("title"), values.pop("description", None),
+                                values.pop("due_date", None), values.pop("priority", None), **values)
+        payload = task_json(task, crud.get_category_names(db))
+        return Response(HTTPStatus.CREATED, payload, {"ETag": etag(payload), "Location": f"/tasks/{task.id}"})
+
+    def get_task(self, db, request: Request, task_id: int) -> Response:
+        _, payload, tag = self._task_or_404(db, task_id)
+        if _etag_matches(request.headers.get("If-None-Match"), tag):
+            return Response(HTTPStatus.NOT_MODIFIED, headers={"ETag": tag})
+        return Response(payload=payload, headers={"ETag": tag})
+
+    def _check_if_match(self, db, request: Request, task_id: int):
+        """Answer 412 unless the task still has the ETag in If-Match. The
+        check takes the write lock, which is held until the caller's write
+        commits, so nothing can change the task in between."""
+        if_match = request.headers.get("If-Match")
+        if if_match is None:
+            return
+        crud.begin_immediate(db)
+        _, _, tag = self._task_or_404(db, task_id)
+        if not _etag_matches(if_match, tag):
+            raise APIError(HTTPStatus.PRECONDITION_FAILED, f"Task {task_id} has changed", {"ETag": tag})
+
+    def update_task(self, db, request: Request, task_id: int) -> Response:
+        values = _task_values(request.json())
+        if not values:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Nothing to update")
+        self._check_if_match(db, request, task_id)
+        task = crud.update_task(db, task_id, **values)
+        if task is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Task {task_id} not found")
+        payload = task_json(task, crud.get_category_names(db))
+        return Response(payload=payload, headers={"ETag": etag(payload)})
+
+    def delete_task(self, db, request: Request, task_id: int) -> Response:
+        self._check_if_match(db, request, task_id)
+        if crud.delete_task(db, task_id) is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Task {task_id} not found")
+        return Response(HTTPStatus.NO_CONTENT)
+
+    def batch_tasks(self, db, request: Request) -> Response:
+        """One transaction per call (per 1000 rows for create), however many tasks."""
+        payload = request.json()
+        op = payload.get("op")
+        if op == "create":
+            rows = payload.get("tasks")
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise APIError(HTTPStatus.BAD_REQUEST, "'tasks' must be a list of objects")
+            rows = [_task_values(row, TASK_FIELDS + ("category", "created_at")) for row in rows]
+            return Response(HTTPStatus.CREATED, {"created": crud.bulk_create_tasks(db, rows)})
+
+        where = payload.get("where")
+        if op not in ("update", "complete", "delete"):
+            raise APIError(HTTPStatus.BAD_REQUEST, "'op' must be one of create, update, complete, delete")
+        if not isinstance(where, dict) or set(where) - set(BATCH_SELECTION):
+            raise APIError(HTTPStatus.BAD_REQUEST, f"'where' must be an object with keys from {tuple(BATCH_SELECTION)}")
+        selection = {BATCH_SELECTION[key]: value for key, value in where.items()}
+        _check_selection(selection)
+        if "status" in selection:
+            selection["status"] = Status(selection["status"])
+        if "due_before" in selection:
+            selection["due_before"] = _datetime(selection["due_before"])
+        if op == "update":
+            count = crud.bulk_update_tasks(db, _task_values(payload.get("values") or {}), **selection)
+            return Response(payload={"updated": count})
+        if op == "complete":
+            return Response(payload={"updated": crud.complete_tasks(db, **selection)})
+        return Response(payload={"deleted": crud.bulk_delete_tasks(db, **selection)})
+
+    def search_tasks(self, db, request: Request) -> Response:
+        query = request.param("q")
+        if not query:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Missing query parameter 'q'")
+        results = crud.search_tasks(db, query, status=request.param("status", Status),
+                                    user_id=request.param("user_id", int), limit=request.param("limit", int, 20),
+                                    prefix=not request.param("exact", _flag, False),
+                                    raw=request.param("raw", _flag, False))
+        names = crud.get_category_names(db)
+        return Response(payload={"tasks": [dict(task_json(task, names), score=score) for task, score in results]})
+
+    def task_stats(self, db, request: Request) -> Response:
+        group_by = request.query.get("by") or ["status"]
+        rows = crud.task_stats(db, group_by, user_id=request.param("user_id", int),
+                               since=request.param("since", datetime.fromisoformat),
+                               until=request.param("until", datetime.fromisoformat),
+                               date_field=request.param("date_field", default="created"))
+        return Response(payload={"group_by": group_by, "total": sum(row["count"] for row in rows), "groups": rows})
+
+    # Categories
+    @staticmethod
+    def _category_json(category) -> dict:
+        return {"id": category.id, "name": category.name}
+
+    @staticmethod
+    def _category_name(request: Request) -> str:
+        name = request.json().get("name")
+        if not isinstance(name, str) or not name:
+            raise APIError(HTTPStatus.BAD_REQUEST, "A category needs a non-empty name")
+        return name
+
+    def list_categories(self, db, request: Request) -> Response:
+        categories = crud.get_categories(db, request.param("skip", int, 0), request.param("limit", int, 100))
+        return Response(payload={"categories": [self._category_json(category) for category in categories]})
+
+    def create_category(self, db, request: Request) -> Response:
+        category = crud.create_category(db, self._category_name(request))
+        return Response(HTTPStatus.CREATED, self._category_json(category), {"Location": f"/categories/{category.id}"})
+
+    def get_category(self, db, request: Request, category_id: int) -> Response:
+        category = crud.get_category(db, category_id)
+        if category is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Category {category_id} not found")
+        return Response(payload=self._category_json(category))
+
+    def update_category(self, db, request: Request, category_id: int) -> Response:
+        category = crud.update_category(db, category_id, self._category_name(request))
+        if category is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Category {category_id} not found")
+        return Response(payload=self._category_json(category))
+
+    def delete_category(self, db, request: Request, category_id: int) -> Response:
+        if crud.delete_category(db, category_id) is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Category {category_id} not found")
+        return Response(HTTPStatus.NO_CONTENT)
+
+    # Users; password hashes never leave the server.
+    @staticmethod
+    def _user_json(user) -> dict:
+        return {"id": user.id, "username": user.username}
+
+    def find_users(self, db, request: Request) -> Response:
+        username = request.param("username")
+        if not username:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Missing query parameter 'username'")
+        user = crud.get_user_by_username(db, username)
+        return Response(payload={"users": [self._user_json(user)] if user else []})
+
+    def create_user(self, db, request: Request) -> Response:
+        from .passwords import hash_password
+
+        payload = request.json()
+        username, password = payload.get("username"), payload.get("password")
+        if not (isinstance(username, str) and username and isinstance(password, str) and password):
+            raise APIError(HTTPStatus.BAD_REQUEST, "A user needs a username and a password")
+        user = crud.create_user(db, username, hash_password(password))
+        return Response(HTTPStatus.CREATED, self._user_json(user), {"Location": f"/users/{user.id}"})
+
+    def get_user(self, db, request: Request, user_id: int) -> Response:
+        user = crud.get_user(db, user_id)
+        if user is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"User {user_id} not found")
+        return Response(payload=self._user_json(user))
+
+    def delete_user(self, db, request: Request, user_id: int) -> Response:
+        if crud.delete_user(db, user_id) is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"User {user_id} not found")
+        return Response(HTTPStatus.NO_CONTENT)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class APIServer:
+    """Serves a TaskAPI over HTTP/1.1 with keep-alive, a thread per connection.
+
+    The socket is bound on construction, so ``port=0`` picks a free port
+    that ``url`` reports before ``serve_forever`` is called.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, session_factory=None,
+                 access_log: bool = False):
+        self.api = TaskAPI(session_factory)
+        self.server = _HTTPServer((host, port), self._handler_class(self.api, access_log))
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    def shutdown(self):
+        self.server.shutdown()
+
+    @staticmethod
+    def _handler_class(api: TaskAPI, access_log: bool):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; with Nagle on, the
+            # body waits for the client's delayed ACK (40 ms on Linux).
+            disable_nagle_algorithm = True
+
+            def _dispatch(self):
+                try:
+                    length = self.headers.get("Content-Length") or "0"
+                    if not (length.isascii() and length.isdigit()):
+                        self.close_connection = True
+                        raise APIError(HTTPStatus.BAD_REQUEST, f"Invalid Content-Length: {length!r}")
+                    length = int(length)
+                    if length > MAX_BODY_BYTES:
+                        self.close_connection = True
+                        raise APIError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+                    body = self.rfile.read(length) if length else b""
+                    response = api.handle(Request(self.command, self.path, self.headers, body))
+                except APIError as exc:
+                    response = Response(exc.status, {"error": exc.message}, exc.headers)
+                except Exception:
+                    traceback.print_exc(file=sys.stderr)
+                    response = Response(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"})
+                self._send(response)
+
+            def _send(self, response: Response):
+                body = b""
+                headers = dict(response.headers)
+                if response.payload is not None:
+                    body = json.dumps(response.payload, separators=(",", ":")).encode()
+                    headers["Content-Type"] = "application/json"
+                    headers["Vary"] = "Accept-Encoding"
+                    if len(body) >= GZIP_MIN_BYTES and _accepts_gzip(self.headers.get("Accept-Encoding")):
+                        body = gzip.compress(body, compresslevel=5)
+                        headers["Content-Encoding"] = "gzip"
+                self.send_response(response.status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if response.status not in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED):
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+            def log_message(self, format, *args):
+                if access_log:
+                    super().log_message(format, *args)
+
+        return Handler
@@ -0,0 +1,90 @@
+"""Asyncio counterparts of the functions in ``crud``, over ``AsyncSession``.
+
+Each one runs its synchronous namesake through ``AsyncSession.run_sync``,
+so both APIs share their queries, the lookup cache and its invalidation,
+and the models. While a coroutine waits on SQLite (aiosqlite runs each
+connection in its own thread) the event loop is free to run others, and
+with WAL every pooled connection can read at once.
+
+Relationships cannot be lazy-loaded from async code, so pass ``load`` to
+``get_task``/``get_tasks`` when ``task.category`` or ``task.user`` is
+needed. Needs the aiosqlite and greenlet packages.
+
+    async with async_session() as db:
+        task = await create_task(db, "Buy milk", None, None, Priority.LOW)
+"""
+import functools
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from . import crud
+from .database import create_async_db_engine
+
+_engine = None
+_session_factory = None
+
+def get_async_engine():
+    """The application's async engine, created on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_async_db_engine()
+    return _engine
+
+def async_session() -> AsyncSession:
+    """A new session on the application's async engine.
+
+    Attributes stay loaded after commit, since reloading them lazily is not
+    possible outside ``run_sync``.
+    """
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(get_async_engine(), expire_on_commit=False,
+                                              autoflush=False)
+    return _session_factory()
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
+
+def _mirror(func):
+    @functools.wraps(func)
+    async def call(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(func, *args, **kwargs)
+    return call
+
+# Task CRUD operations
+create_task = _mirror(crud.create_task)
+get_task = _mirror(crud.get_task)
+get_tasks = _mirror(crud.get_tasks)
+get_tasks_page = _mirror(crud.get_tasks_page)
+update_task = _mirror(crud.update_task)
+delete_task = _mirror(crud.delete_task)
+bulk_create_tasks = _mirror(crud.bulk_create_tasks)
+bulk_update_tasks = _mirror(crud.bulk_update_tasks)
+bulk_delete_tasks = _mirror(crud.bulk_delete_tasks)
+complete_tasks = _mirror(crud.complete_tasks)
+search_tasks = _mirror(crud.search_tasks)
+task_stats = _mirror(crud.task_stats)
+
+# Category CRUD operations
+create_category = _mirror(crud.create_category)
+get_category = _mirror(crud.get_category)
+get_categories = _mirror(crud.get_categories)
+get_category_names = _mirror(crud.get_category_names)
+update_category = _mirror(crud.update_category)
+delete_category = _mirror(crud.delete_category)
+
+# User CRUD operations
+create_user = _mirror(crud.create_user)
+get_user = _mirror(crud.get_user)
+get_user_by_username = _mirror(crud.get_user_by_username)
+update_user = _mirror(crud.update_user)
+delete_user = _mirror(crud.delete_user)
+
+async def iter_task_rows(db: AsyncSession, sort: str = "id", after: str = None, status: str = None,
+                         user_id: int = None, limit: int = None, batch_size: int = 1000):
+    """Like ``crud.iter_task_rows``: rows arrive ``batch_size`` at a time."""
+    stmt = crud.task_rows_statement(sort, after, status, user_id, limit)
+    result = await db.stream(stmt.execution_options(yield_per=batch_size))
+    async for row in result:
+        yield row
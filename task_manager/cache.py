@@ -0,0 +1,125 @@
+"""In-process LRU/TTL cache for small, rarely-changing lookups.
+
+Entries are plain column values rather than ORM instances, so nothing cached
+is tied to the session that loaded it; crud turns a hit back into an instance
+of the caller's session without a query.
+"""
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+
+_deferred = threading.local()
+
+
+@contextlib.contextmanager
+def deferred_invalidations():
+    """Hold back ``invalidate()`` calls made on this thread until the block
+    exits, for writes that only become visible once it commits.
+
+    Meanwhile lookups on this thread in a namespace it has invalidated go
+    straight to ``load()``, so the writer still sees its own changes.
+    """
+    if getattr(_deferred, "pending", None) is not None:
+        yield
+        return
+    _deferred.pending = pending = []
+    try:
+        yield
+    finally:
+        _deferred.pending = None
+        for cache, namespace in pending:
+            cache.invalidate(namespace)
+
+
+def _deferring(cache, namespace) -> bool:
+    pending = getattr(_deferred, "pending", None)
+    return pending is not None and (cache, namespace) in pending
+
+
+class LookupCache:
+    """A thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Keys are tuples whose first item is a namespace ("category", "user"...),
+    so a write can drop every entry it may have made stale in one call. A
+    ``maxsize`` of 0 disables caching.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # Bumped by invalidate() (per namespace) and clear() (all of them),
+        # so a load that overlapped one doesn't store what it read.
+        self._generations = {}
+        self._clears = 0
+        self._lock = threading.Lock()
+
+    def _generation(self, namespace) -> tuple:
+        return self._clears, self._generations.get(namespace, 0)
+
+    def get(self, key, load):
+        """Return the cached value for ``key``, calling ``load()`` on a miss.
+
+        ``None`` results are not cached, so a lookup that finds nothing is
+        never served stale once the row is created. Neither is a result whose
+        namespace was invalidated while ``load()`` ran.
+        """
+        if self.maxsize <= 0 or _deferring(self, key[0]):
+            return load()
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation(key[0])
+        value = load()
+        if value is not None:
+            with self._lock:
+                if self._generation(key[0]) != generation:
+                    return value
+                self._entries[key] = (now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, namespace: str):
+        """Drop every entry whose key starts with ``namespace``."""
+        pending = getattr(_deferred, "pending", None)
+        if pending is not None:
+            if (self, namespace) not in pending:
+                pending.append((self, namespace))
+            return
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._clears += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self), "maxsize": self.maxsize, "ttl": self.ttl,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
@@ -1,236 +1,118 @@
-import typer
-from typing import Optional
-from datetime import datetime
-from enum import Enum
+import importlib
 from typing import Optional
-from rich.console import Console
-from rich.table import Table
-import typer
-import getpass
-import hashlib
 
-from .models import Priority
-from .database import get_db, init_db
-from .crud import (
-    create_task, get_task, get_tasks, update_task, delete_task,
-    create_category, get_category, get_categories, update_category, delete_category,
-    create_user, get_user_by_username
-)
+import typer
+from typer.core import TyperGroup
+
+from .commands import LazyConsole
+
+# Command groups, imported only when invoked (or listed by --help) so a
+# script calling `task add` never loads the worker, the SMTP sender, etc.
+SUB_APPS = {
+    "task": ("task_manager.commands.task_commands", "Manage tasks"),
+    "category": ("task_manager.commands.category_commands", "Manage categories"),
+    "user": ("task_manager.commands.user_commands", "Register and log in users"),
+    "db": ("task_manager.commands.db_commands", "Inspect and maintain the database"),
+    "worker": ("task_manager.commands.worker_commands", "Run the reminder worker"),
+}
+
+class LazySubAppGroup(TyperGroup):
+    def list_commands(self, ctx):
+        return list(SUB_APPS) + [name for name in super().list_commands(ctx) if name not in SUB_APPS]
+
+    def get_command(self, ctx, name):
+        if name in SUB_APPS and name not in self.commands:
+            module_name, help_text = SUB_APPS[name]
+            group = typer.main.get_group(importlib.import_module(module_name).app)
+            group.name = name
+            group.help = help_text
+            self.add_command(group, name)
+        return super().get_command(ctx, name)
+
+    def invoke(self, ctx):
+        # The callback runs before the subcommand is resolved; leave it the
+        # name of the command (`task list`) for --profile to report.
+        words = [*ctx._protected_args, *ctx.args][:2]
+        if words and words[0] not in SUB_APPS:
+            words = words[:1]
+        ctx.meta["command_name"] = " ".join(word for word in words if not word.startswith("-"))
+        return super().invoke(ctx)
+
+app = typer.Typer(cls=LazySubAppGroup)
+console = LazyConsole()
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    profile: bool = typer.Option(False, "--profile", help="Print the command's wall time and SQL statements to stderr"),
+    profile_cpu: bool = typer.Option(False, "--profile-cpu", help="Like --profile, adding the top functions from cProfile")
+):
+    """Manage tasks, categories and users from the command line"""
+    if profile or profile_cpu:
+        from .database import engine
+        from .instrumentation import CommandProfile
 
-app = typer.Typer()
-console = Console()
+        command_profile = CommandProfile(engine, cpu=profile_cpu)
 
-class Priority(str, Enum):
-    low = "low"
-    medium = "medium"
-    high = "high"
+        def report():
+            command_profile.stop()
+            typer.echo(command_profile.report(ctx.meta.get("command_name") or "task-manager"), err=True)
 
-class Status(str, Enum):
-    pending = "pending"
-    completed = "completed"
+        ctx.call_on_close(report)
 
 @app.command()
 def init():
     """Initialize the database"""
+    from .database import init_db
+
     init_db()
     console.print("[green]Database initialized successfully![/green]")
 
 @app.command()
-def add(
-    title: str,
-    description: Optional[str] = typer.Option(None, "--description", "-d"),
-    due_date: Optional[str] = typer.Option(None, "--due-date", "-dd"),
-    priority: Priority = typer.Option(Priority.medium, "--priority", "-p"),
-    category_id: Optional[int] = typer.Option(None, "--category-id", "-c"),
-    status: Status = typer.Option(Status.pending, "--status", "-s"),
-    user_id: Optional[int] = typer.Option(None, "--user-id", "-u")
+def serve(
+    socket_path: Optional[str] = typer.Option(None, "--socket", help="Unix socket to listen on [default: TASK_MANAGER_SOCKET]"),
+    max_batch: int = typer.Option(256, "--max-batch", min=1, help="Most adds written per transaction"),
+    max_wait_ms: float = typer.Option(2.0, "--max-wait-ms", min=0.0, help="How long an add waits for others to share its commit")
 ):
-    """Add a new task"""
-    db = next(get_db())
+    """Keep the database warm and serve commands from task_manager.client"""
+    import signal
+    from .client import DEFAULT_SOCKET
+    from .daemon import TaskManagerDaemon
 
-    due_date_obj = datetime.strptime(due_date, "%Y-%m-%d") if due_date else None
+    def stop(signum, frame):
+        raise KeyboardInterrupt
 
-    task = create_task(
-        db=db,
-        title=title,
-        description=description,
-        due_date=due_date_obj,
-        priority=priority,
-        category_id=category_id,
-        status=status,
-        user_id=user_id
-    )
+    signal.signal(signal.SIGTERM, stop)
 
-    console.print(f"[green]Task created with ID: {task.id}[/green]")
+    daemon = TaskManagerDaemon(socket_path or DEFAULT_SOCKET, max_batch=max_batch,
+                               max_wait=max_wait_ms / 1000)
+    console.print(f"[green]Serving on {daemon.socket_path}[/green]")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        console.print("[yellow]Daemon stopped[/yellow]")
 
 @app.command()
-def list(
-    status: Optional[Status] = typer.Option(None, "--status", "-s", help="Filter tasks by status")
+def api(
+    host: str = typer.Option("127.0.0.1", "--host", help="Address to listen on"),
+    port: int = typer.Option(8080, "--port", min=0, help="Port to listen on (0 picks a free one)"),
+    access_log: bool = typer.Option(False, "--access-log", help="Log every request to stderr")
 ):
-    """List all tasks"""
-    db = next(get_db())
-    tasks = get_tasks(db, status=status.value if status else None)
-
-    table = Table(title="Tasks")
-    table.add_column("ID", style="cyan")
-    table.add_column("Title")
-    table.add_column("Description")
-    table.add_column("Due Date")
-    table.add_column("Priority")
-    table.add_column("Status")
-    table.add_column("Category")
-
-    for task in tasks:
-        table.add_row(
-            str(task.id),
-            task.title,
-            task.description or "",
-            task.due_date.strftime("%Y-%m-%d") if task.due_date else "",
-            task.priority,
-            task.status,
-            task.category.name if task.category else ""
-        )
-
-    console.print(table)
-
-@app.command()
-def show(task_id: int):
-    """Show details of a specific task"""
-    db = next(get_db())
-    task = get_task(db, task_id)
-
-    if not task:
-        console.print(f"[red]Task with ID {task_id} not found[/red]")
-        raise typer.Exit(1)
+    """Serve the task, category and user CRUD over a local HTTP/JSON API"""
+    import signal
+    from .api import APIServer
 
-    table = Table(title=f"Task {task.id}")
-    table.add_column("Field", style="cyan")
-    table.add_column("Value")
+    def stop(signum, frame):
+        raise KeyboardInterrupt
 
-    table.add_row("Title", task.title)
-    table.add_row("Description", task.description or "")
-    table.add_row("Due Date", task.due_date.strftime("%Y-%m-%d") if task.due_date else "")
-    table.add_row("Priority", task.priority)
-    table.add_row("Category", task.category.name if task.category else "")
-    table.add_row("Created At", task.created_at.strftime("%Y-%m-%d %H:%M:%S"))
+    signal.signal(signal.SIGTERM, stop)
 
-    console.print(table)
-
-@app.command()
-def update(
-    task_id: int,
-    title: Optional[str] = typer.Option(None, "--title", "-t"),
-    description: Optional[str] = typer.Option(None, "--description", "-d"),
-    due_date: Optional[str] = typer.Option(None, "--due-date", "-dd"),
-    priority: Optional[Priority] = typer.Option(None, "--priority", "-p"),
-    category_id: Optional[int] = typer.Option(None, "--category-id", "-c"),
-    status: Optional[Status] = typer.Option(None, "--status", "-s")
-):
-    """Update a task"""
-    db = next(get_db())
-
-    update_data = {}
-    if title:
-        update_data["title"] = title
-    if description:
-        update_data["description"] = description
-    if due_date:
-        update_data["due_date"] = datetime.strptime(due_date, "%Y-%m-%d")
-    if priority:
-        update_data["priority"] = priority
-    if category_id:
-        update_data["category_id"] = category_id
-    if status:
-        update_data["status"] = status
-
-    task = update_task(db, task_id, **update_data)
-
-    if task:
-        console.print(f"[green]Task {task_id} updated successfully![/green]")
-    else:
-        console.print(f"[red]Task with ID {task_id} not found[/red]")
-        raise typer.Exit(1)
-
-@app.command()
-def delete(task_id: int):
-    """Delete a task"""
-    db = next(get_db())
-    task = delete_task(db, task_id)
-
-    if task:
-        console.print(f"[green]Task {task_id} deleted successfully![/green]")
-    else:
-        console.print(f"[red]Task with ID {task_id} not found[/red]")
-        raise typer.Exit(1)
-
-# Category commands
-@app.command()
-def category_add(name: str):
-    """Add a new category"""
-    db = next(get_db())
-    category = create_category(db, name)
-    console.print(f"[green]Category created with ID: {category.id}[/green]")
-
-@app.command()
-def category_list():
-    """List all categories"""
-    db = next(get_db())
-    categories = get_categories(db)
-
-    table = Table(title="Categories")
-    table.add_column("ID", style="cyan")
-    table.add_column("Name")
-
-    for category in categories:
-        table.add_row(str(category.id), category.name)
-
-    console.print(table)
-
-@app.command()
-def category_delete(category_id: int):
-    """Delete a category"""
-    db = next(get_db())
-    category = delete_category(db, category_id)
-
-    if category:
-        console.print(f"[green]Category {category_id} deleted successfully![/green]")
-    else:
-        console.print(f"[red]Category with ID {category_id} not found[/red]")
-        raise typer.Exit(1)
-
-@app.command()
-def register(username: str):
-    """Register a new user"""
-    db = next(get_db())
-    existing_user = get_user_by_username(db, username)
-    if existing_user:
-        console.print(f"[red]Username '{username}' is already taken.[/red]")
-        raise typer.Exit(1)
-    password = getpass.getpass("Password: ")
-    password_confirm = getpass.getpass("Confirm Password: ")
-    if password != password_confirm:
-        console.print("[red]Passwords do not match.[/red]")
-        raise typer.Exit(1)
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
-    user = create_user(db, username, password_hash)
-    console.print(f"[green]User '{username}' registered successfully with ID: {user.id}[/green]")
-
-@app.command()
-def login(username: str):
-    """Login a user and return a dummy token"""
-    db = next(get_db())
-    user = get_user_by_username(db, username)
-    if not user:
-        console.print(f"[red]User '{username}' not found.[/red]")
-        raise typer.Exit(1)
-    password = getpass.getpass("Password: ")
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
-    if password_hash != user.password_hash:
-        console.print("[red]Invalid password.[/red]")
-        raise typer.Exit(1)
-    # For simplicity, return a dummy token (in real app, generate JWT)
-    token = f"token-for-user-{user.id}"
-    console.print(f"[green]Login successful. Token: {token}[/green]")
+    server = APIServer(host, port, access_log=access_log)
+    console.print(f"[green]Serving on {server.url}[/green]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("[yellow]API server stopped[/yellow]")
 
 if __name__ == "__main__":
     app()
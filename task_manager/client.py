@@ -0,0 +1,119 @@
+"""Thin client for the task-manager daemon.
+
+Forwards its argv to ``task-manager serve`` over a Unix domain socket and
+prints the reply, so scripted calls skip importing the CLI, SQLAlchemy and
+opening the database. Falls back to running the CLI in-process when no
+daemon is listening.
+
+    python -m task_manager.client [--socket PATH] task add "Buy milk"
+
+Only the standard library is imported on the fast path.
+"""
+import json
+import os
+import socket
+import sys
+
+DEFAULT_SOCKET = os.getenv("TASK_MANAGER_SOCKET", os.path.expanduser("~/.task-manager.sock"))
+
+# Commands that prompt on stdin, or read and write files by path (relative
+# to the caller's directory, or - for its stdin), cannot be forwarded.
+LOCAL_ONLY = (("user", "register"), ("user", "login"), ("task", "import"), ("task", "export"))
+
+# Environment variables options are read from (``--token``). The daemon
+# applies the caller's values, never those of its own environment.
+FORWARDED_ENV = ("TASK_MANAGER_TOKEN",)
+
+
+def encode(message: dict) -> bytes:
+    return json.dumps(message).encode() + b"\n"
+
+
+def decode(line: bytes) -> dict:
+    return json.loads(line)
+
+
+class DaemonClient:
+    """A connection to the daemon that can carry any number of commands."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 30.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            # Connect in blocking mode: with a timeout set, a full listen
+            # backlog fails immediately with EAGAIN instead of waiting.
+            self.sock.connect(socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.settimeout(timeout)
+        self.reader = self.sock.makefile("rb")
+
+    def run(self, argv: list, env: dict = None, isatty: bool = False) -> tuple:
+        """Return ``(exit_code, output)`` for one command, run as if with
+        ``env`` (names from FORWARDED_ENV) set and nothing else, and with
+        output to a terminal if ``isatty``."""
+        reply = self._request({"argv": list(argv), "env": dict(env or {}), "isatty": isatty})
+        return reply["exit_code"], reply["output"]
+
+    def write(self, operation: str, kwargs: dict) -> dict:
+        """Run one operation on the daemon's write queue (see
+        task_manager.write_queue); the reply has a ``result`` or an ``error``."""
+        return self._request({"write": operation, "kwargs": kwargs})
+
+    def _request(self, message: dict) -> dict:
+        self.sock.sendall(encode(message))
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("daemon closed the connection")
+        return decode(line)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _socket_option(argv: list) -> tuple:
+    """Split a leading ``--socket PATH`` or ``--socket=PATH`` off ``argv``."""
+    if argv[:1] == ["--socket"]:
+        socket_path, argv = (argv[1] if len(argv) > 1 else ""), argv[2:]
+    elif argv[:1] and argv[0].startswith("--socket="):
+        socket_path, argv = argv[0].partition("=")[2], argv[1:]
+    else:
+        return DEFAULT_SOCKET, argv
+    if not socket_path:
+        sys.stderr.write("Usage: task-manager [--socket PATH] COMMAND [ARGS]...\n"
+                         "Error: Option '--socket' requires an argument.\n")
+        sys.exit(2)
+    return socket_path, argv
+
+
+def main(argv: list = None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    socket_path, argv = _socket_option(argv)
+
+    client = None
+    if tuple(argv[:2]) not in LOCAL_ONLY:
+        try:
+            client = DaemonClient(socket_path)
+        except OSError:
+            pass
+    if client:
+        # Once connected, never fall back: the command may already have run.
+        with client:
+            env = {name: os.environ[name] for name in FORWARDED_ENV if name in os.environ}
+            exit_code, output = client.run(argv, env, sys.stdout.isatty())
+        sys.stdout.write(output)
+        sys.exit(exit_code)
+
+    from task_manager.cli import app
+    app(argv, prog_name="task-manager")
+
+
+if __name__ == "__main__":
+    main()
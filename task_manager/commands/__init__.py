@@ -1 +1,17 @@
 # This file makes the commands directory a package
+
+class LazyConsole:
+    """Stands in for a ``rich.console.Console`` until it is first used.
+
+    Importing rich costs tens of milliseconds, which every CLI invocation
+    would otherwise pay before argv is even parsed.
+    """
+
+    def __init__(self):
+        self._console = None
+
+    def __getattr__(self, name):
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console()
+        return getattr(self._console, name)
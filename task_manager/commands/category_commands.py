@@ -1,6 +1,50 @@
 import typer
-from rich.console import Console
-from rich.table import Table
 
-from task_manager.database import get_db
-from task_manager.crud import create_category, get_categories, delete_category
+from task_manager.commands import LazyConsole
+
+app = typer.Typer()
+console = LazyConsole()
+
+@app.command()
+def category_add(name: str):
+    """Add a new category"""
+    from task_manager.database import get_db
+    from task_manager.crud import create_category
+
+    db = next(get_db())
+    category = create_category(db, name)
+    console.print(f"[green]Category created with ID: {category.id}[/green]")
+
+@app.command()
+def category_list():
+    """List all categories"""
+    from rich.table import Table
+    from task_manager.database import get_db
+    from task_manager.crud import get_categories
+
+    db = next(get_db())
+    categories = get_categories(db)
+
+    table = Table(title="Categories")
+    table.add_column("ID", style="cyan")
+    table.add_column("Name")
+
+    for category in categories:
+        table.add_row(str(category.id), category.name)
+
+    console.print(table)
+
+@app.command()
+def category_delete(category_id: int):
+    """Delete a category"""
+    from task_manager.database import get_db
+    from task_manager.crud import delete_category
+
+    db = next(get_db())
+    category = delete_category(db, category_id)
+
+    if category:
+        console.print(f"[green]Category {category_id} deleted successfully![/green]")
+    else:
+        console.print(f"[red]Category with ID {category_id} not found[/red]")
+        raise typer.Exit(1)
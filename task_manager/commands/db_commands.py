@@ -0,0 +1,151 @@
+from datetime import datetime
+from typing import Optional
+import typer
+
+from task_manager.commands import LazyConsole
+from task_manager.enums import Status
+
+app = typer.Typer()
+console = LazyConsole()
+
+def crud_queries():
+    """The read paths worth checking, keyed by a display name."""
+    from task_manager.crud import (
+        get_task, get_tasks, get_tasks_page, get_category, get_categories,
+        get_user, get_user_by_username, iter_tasks, TASK_LIST_COLUMNS
+    )
+    from task_manager.worker import due_batch_query
+
+    return {
+        "get_task": lambda db: get_task(db, 1, load="joined"),
+        "get_tasks(status)": lambda db: get_tasks(db, status=Status.PENDING),
+        "get_tasks(user_id)": lambda db: get_tasks(db, user_id=1),
+        "get_tasks(user_id, status)": lambda db: get_tasks(db, user_id=1, status=Status.PENDING),
+        "task list": lambda db: get_tasks_page(db, columns=TASK_LIST_COLUMNS),
+        "task list --sort due_date": lambda db: get_tasks_page(db, sort="due_date", columns=TASK_LIST_COLUMNS),
+        "task export": lambda db: next(iter_tasks(db), None),
+        "check_due_tasks": lambda db: due_batch_query(db, datetime.utcnow()).all(),
+        "check_due_tasks (next batch)": lambda db: due_batch_query(db, datetime.utcnow(),
+                                                                   after=(datetime.utcnow(), 0)).all(),
+        "get_category": lambda db: get_category(db, 1),
+        "get_categories": lambda db: get_categories(db),
+        "get_user": lambda db: get_user(db, 1),
+        "get_user_by_username": lambda db: get_user_by_username(db, "alice"),
+    }
+
+def capture_statements(db, call):
+    """Run ``call(db)`` and return the (statement, parameters) pairs it executed."""
+    from sqlalchemy import event
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        call(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return statements
+
+@app.command()
+def explain():
+    """Print SQLite's query plan for each CRUD query"""
+    from task_manager.database import get_db, explain_query_plan
+    from task_manager.crud import lookup_cache
+
+    db = next(get_db())
+
+    for name, call in crud_queries().items():
+        console.print(f"[bold cyan]{name}[/bold cyan]")
+        # A cache hit would run no SQL at all.
+        lookup_cache.clear()
+        for statement, parameters in capture_statements(db, call):
+            console.print(" ".join(statement.split()), style="dim", soft_wrap=True)
+            for detail in explain_query_plan(db, statement, parameters):
+                console.print(f"  {detail}", soft_wrap=True)
+    db.rollback()
+
+@app.command("cache-stats")
+def cache_stats():
+    """Show the category/user lookup cache counters for this process"""
+    from rich.table import Table
+    from task_manager.crud import lookup_cache
+
+    table = Table(title="Lookup cache")
+    table.add_column("Counter", style="cyan")
+    table.add_column("Value", justify="right")
+    for key, value in lookup_cache.stats().items():
+        table.add_row(key, f"{value:.1%}" if key == "hit_rate" else str(value))
+    console.print(table)
+
+@app.command("rebuild-stats")
+def rebuild_stats():
+    """Recompute the task_counts summary table from the tasks table"""
+    from task_manager.database import get_db
+    from task_manager.crud import rebuild_task_counts
+
+    db = next(get_db())
+    rows = rebuild_task_counts(db)
+    console.print(f"[green]Rebuilt task counts: {rows} groups[/green]")
+
+@app.command()
+def rerank():
+    """Re-rank tasks for `task next` with the current RANK_* settings"""
+    from task_manager.database import get_db
+    from task_manager.crud import rebuild_task_rank
+
+    db = next(get_db())
+    rebuild_task_rank(db)
+    console.print("[green]Task ranks rebuilt[/green]")
+
+@app.command("check-stats")
+def check_stats():
+    """Check the task_counts summary table against the tasks table"""
+    from rich.table import Table
+    from task_manager.database import get_db
+    from task_manager.crud import check_task_counts
+
+    db = next(get_db())
+    mismatches = check_task_counts(db)
+    if not mismatches:
+        console.print("[green]Task counts are consistent[/green]")
+        return
+
+    table = Table(title="Task count mismatches")
+    for column in mismatches[0]:
+        table.add_column(column.replace("_", " ").capitalize())
+    for mismatch in mismatches:
+        table.add_row(*[str(value) for value in mismatch.values()])
+    console.print(table)
+    console.print(f"[red]{len(mismatches)} groups disagree; run `db rebuild-stats` to fix them[/red]")
+    raise typer.Exit(1)
+
+@app.command()
+def reshard(
+    user_id: Optional[int] = typer.Option(None, "--user-id", help="Move this user's tasks"),
+    shard: Optional[int] = typer.Option(None, "--to", min=0, help="Shard to move --user-id to"),
+    rebalance: bool = typer.Option(False, "--rebalance", help="Move every user to its default shard (user id modulo SHARD_COUNT)"),
+    batch_size: int = typer.Option(500, "--batch-size", min=1, help="Tasks moved per transaction"),
+    settle: Optional[float] = typer.Option(None, "--settle", min=0.0,
+                                           help="Seconds to wait for other processes to see the move [default: SHARD_DIRECTORY_TTL]")
+):
+    """Move users' tasks between shards while the application keeps running"""
+    from task_manager.database import get_db
+    from task_manager.crud import rebalance_targets, reshard_users
+
+    if rebalance == (user_id is not None) or (user_id is not None and shard is None):
+        console.print("[red]Give either --user-id with --to, or --rebalance[/red]")
+        raise typer.Exit(1)
+    db = next(get_db())
+    try:
+        targets = rebalance_targets(db) if rebalance else {user_id: shard}
+        moved = reshard_users(db, targets, batch_size=batch_size, settle=settle)
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(1)
+    for moved_user, count in moved.items():
+        console.print(f"User {moved_user}: {count} tasks moved to shard {targets[moved_user]}")
+    console.print(f"[green]Moved {sum(moved.values())} tasks for {len(moved)} users[/green]")
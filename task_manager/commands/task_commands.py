@@ -1,33 +1,122 @@
+import csv
+import json
+import os
+import sys
+import time
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 import typer
-from rich.console import Console
-from rich.table import Table
 
-from task_manager.database import get_db
-from task_manager.crud import (
-    create_task, get_task, get_tasks, update_task, delete_task
-)
-from task_manager.models import Priority, Status
+from task_manager.commands import LazyConsole
+from task_manager.enums import Frequency, Priority, Status
+
+# SQLAlchemy, the engine and rich are imported inside the commands that need
+# them so that `--help` and argument errors stay fast.
 
 app = typer.Typer()
-console = Console()
+console = LazyConsole()
+
+class SortKey(str, Enum):
+    id = "id"
+    due_date = "due_date"
+
+class FileFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+class ListFormat(str, Enum):
+    table = "table"
+    plain = "plain"
+    tsv = "tsv"
+    ndjson = "ndjson"
+
+class StatsDimension(str, Enum):
+    status = "status"
+    priority = "priority"
+    category = "category"
+    user = "user"
+    overdue = "overdue"
+
+class DateField(str, Enum):
+    created = "created"
+    due = "due"
+
+class StatsFormat(str, Enum):
+    table = "table"
+    json = "json"
+
+EXPORT_FIELDS = [
+    "id", "title", "description", "due_date", "priority", "status",
+    "category", "user_id", "created_at", "reminder_sent",
+]
+
+def _token_option(help_text: str = "Act as the user this session token belongs to"):
+    return typer.Option(None, "--token", envvar="TASK_MANAGER_TOKEN", show_envvar=False, help=help_text)
+
+def _resolve_user(db, user_id: Optional[int], token: Optional[str]) -> Optional[int]:
+    """The user --token stands for, checked against --user-id if both are given."""
+    if token is None:
+        return user_id
+    from task_manager.crud import validate_session
+
+    token_user = validate_session(db, token)
+    if token_user is None:
+        console.print("[red]Invalid or expired session token; log in again with 'user login'.[/red]")
+        raise typer.Exit(1)
+    if user_id is not None and user_id != token_user:
+        console.print("[red]--user-id does not match the user of --token.[/red]")
+        raise typer.Exit(1)
+    return token_user
 
 @app.command()
 def add(
     title: str,
     description: Optional[str] = typer.Option(None, "--description", "-d"),
     due_date: Optional[str] = typer.Option(None, "--due-date", "-dd"),
-    priority: Priority = typer.Option(Priority.medium, "--priority", "-p"),
+    priority: Priority = typer.Option(Priority.MEDIUM, "--priority", "-p"),
     category_id: Optional[int] = typer.Option(None, "--category-id", "-c"),
-    status: Status = typer.Option(Status.pending, "--status", "-s"),
-    user_id: Optional[int] = typer.Option(None, "--user-id", "-u")
+    status: Status = typer.Option(Status.PENDING, "--status", "-s"),
+    user_id: Optional[int] = typer.Option(None, "--user-id", "-u"),
+    repeat: Optional[Frequency] = typer.Option(None, "--repeat", "-r",
+                                               help="Make it a recurring task, starting on --due-date"),
+    every: int = typer.Option(1, "--every", min=1, help="With --repeat: every N days, weeks or months"),
+    until: Optional[str] = typer.Option(None, "--until", help="With --repeat: last possible date (YYYY-MM-DD)"),
+    count: Optional[int] = typer.Option(None, "--count", min=1, help="With --repeat: number of occurrences"),
+    token: Optional[str] = _token_option("Create the task for the user of this session token")
 ):
-    """Add a new task"""
+    """Add a new task, or a recurring one with --repeat"""
+    from task_manager.database import get_db
+    from task_manager.crud import create_task
+
     db = next(get_db())
+    user_id = _resolve_user(db, user_id, token)
 
     due_date_obj = datetime.strptime(due_date, "%Y-%m-%d") if due_date else None
 
+    if repeat is None and (until or count or every != 1):
+        console.print("[red]--every, --until and --count need --repeat[/red]")
+        raise typer.Exit(1)
+    if repeat is not None and status != Status.PENDING:
+        # Occurrences are created pending; a series has no status of its own.
+        raise typer.BadParameter("a recurring task's occurrences always start pending", param_hint="'--status'")
+    if repeat is not None:
+        from task_manager.crud import create_task_series
+        from task_manager.recurrence import describe
+
+        starts_at = due_date_obj or datetime.combine(datetime.now().date(), datetime.min.time())
+        try:
+            series = create_task_series(
+                db, title, description, starts_at, priority, repeat, interval=every,
+                until=datetime.strptime(until, "%Y-%m-%d") if until else None, count=count,
+                category_id=category_id, user_id=user_id
+            )
+        except ValueError as exc:
+            console.print(f"[red]{exc}[/red]")
+            raise typer.Exit(1)
+        console.print(f"[green]Recurring task created with ID: {series.id} ({describe(series)})[/green]")
+        return
+
     task = create_task(
         db=db,
         title=title,
@@ -41,15 +130,10 @@ def add(
 
     console.print(f"[green]Task created with ID: {task.id}[/green]")
 
-@app.command()
-def list(
-    status: Optional[Status] = typer.Option(None, "--status", "-s", help="Filter tasks by status")
-):
-    """List all tasks"""
-    db = next(get_db())
-    tasks = get_tasks(db, status=status.value if status else None)
+def _tasks_table(tasks, title: str = "Tasks", category_names: dict = None, scores: list = None):
+    from rich.table import Table
 
-    table = Table(title="Tasks")
+    table = Table(title=title)
     table.add_column("ID", style="cyan")
     table.add_column("Title")
     table.add_column("Description")
@@ -57,8 +141,11 @@ def list(
     table.add_column("Priority")
     table.add_column("Status")
     table.add_column("Category")
+    if scores is not None:
+        table.add_column("Score", justify="right")
 
-    for task in tasks:
+    for index, task in enumerate(tasks):
+        extra = [] if scores is None else [f"{scores[index]:.1f}" if scores[index] is not None else ""]
         table.add_row(
             str(task.id),
             task.title,
@@ -66,16 +153,234 @@ def list(
             task.due_date.strftime("%Y-%m-%d") if task.due_date else "",
             task.priority,
             task.status,
-            task.category.name if task.category else ""
+            category_names.get(task.category_id, "") if category_names is not None
+            else task.category.name if task.category else "",
+            *extra
         )
+    return table
+
+LIST_FIELDS = ["id", "title", "description", "due_date", "priority", "status", "category"]
+
+def _list_values(row, category_names: dict) -> dict:
+    return {
+        "id": row.id, "title": row.title, "description": row.description, "due_date": row.due_date,
+        "priority": row.priority, "status": row.status, "category": category_names.get(row.category_id),
+    }
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+def _tsv(value) -> str:
+    return _text(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+# Column widths for --format plain; rows are written before later ones are
+# seen, so they cannot be sized to fit.
+PLAIN_WIDTHS = {"id": 7, "title": 30, "description": 30, "due_date": 10, "priority": 8, "status": 9, "category": 15}
+
+def _plain(values: dict) -> str:
+    cells = []
+    for field, width in PLAIN_WIDTHS.items():
+        text = " ".join(_text(values[field]).split())
+        text = text if len(text) <= width else text[:width - 1] + "…"
+        cells.append(text.rjust(width) if field == "id" else text.ljust(width))
+    return "  ".join(cells).rstrip() + "\n"
+
+def _stream_rows(rows, output: ListFormat, category_names: dict, page_size: Optional[int]):
+    """Write ``rows`` to stdout as they arrive; return the last row written
+    and whether there were more than ``page_size``."""
+    write = sys.stdout.write
+    if output == ListFormat.tsv:
+        write("\t".join(LIST_FIELDS) + "\n")
+    elif output == ListFormat.plain:
+        write(_plain({field: field.replace("_", " ").capitalize() for field in LIST_FIELDS}))
+    last = None
+    for count, row in enumerate(rows):
+        if page_size is not None and count == page_size:
+            return last, True
+        values = _list_values(row, category_names)
+        if output == ListFormat.ndjson:
+            write(json.dumps({key: _format_value(value) for key, value in values.items()}) + "\n")
+        elif output == ListFormat.tsv:
+            write("\t".join(_tsv(values[field]) for field in LIST_FIELDS) + "\n")
+        else:
+            write(_plain(values))
+        last = row
+    return last, False
+
+@app.command("list")
+def list_tasks(
+    status: Optional[Status] = typer.Option(None, "--status", "-s", help="Filter tasks by status"),
+    user_id: Optional[int] = typer.Option(None, "--user-id", "-u", help="Filter tasks by user"),
+    sort: SortKey = typer.Option(SortKey.id, "--sort", help="Order tasks by id or due date"),
+    page_size: int = typer.Option(100, "--page-size", "-n", min=1, help="Tasks per page"),
+    after: Optional[str] = typer.Option(None, "--after", help="Cursor printed by the previous page"),
+    all_pages: bool = typer.Option(False, "--all", help="Print every page instead of just one"),
+    output: Optional[ListFormat] = typer.Option(
+        None, "--format", "-f",
+        help="table, or a streaming format: plain, tsv, ndjson [default: table on a terminal, else tsv]"),
+    token: Optional[str] = _token_option("Only list tasks of the user of this session token")
+):
+    """List tasks, one page at a time"""
+    from task_manager.database import get_db
+    from task_manager.crud import (
+        encode_cursor, get_category_names, get_tasks_page, iter_task_pages, iter_task_rows,
+        materialize_occurrences, TASK_LIST_COLUMNS
+    )
 
+    db = next(get_db())
+    user_id = _resolve_user(db, user_id, token)
+    # Recurring tasks due soon become rows now; usually a single index probe.
+    materialize_occurrences(db)
+    if output is None:
+        output = ListFormat.table if sys.stdout.isatty() else ListFormat.tsv
+    # Category names come from the lookup cache rather than a join per page.
+    filters = dict(sort=sort.value, status=status.value if status else None, user_id=user_id)
+
+    if output != ListFormat.table:
+        # Rows go straight from a yield_per cursor to stdout; the cursor hint
+        # goes to stderr so the output stays machine-readable.
+        try:
+            rows = iter_task_rows(db, after=after, limit=None if all_pages else page_size + 1, **filters)
+            last, more = _stream_rows(rows, output, get_category_names(db), None if all_pages else page_size)
+            sys.stdout.flush()
+        except ValueError as exc:
+            console.print(f"[red]{exc}[/red]")
+            raise typer.Exit(1)
+        except BrokenPipeError:
+            # The reader (head, less...) went away; that is not an error.
+            # Point stdout at /dev/null so the flush at exit does not fail too.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return
+        if more:
+            typer.echo(f"More tasks available: --after {encode_cursor(sort.value, last)}", err=True)
+        return
+
+    filters["columns"] = TASK_LIST_COLUMNS
+    try:
+        if all_pages:
+            for page in iter_task_pages(db, page_size, after, **filters):
+                console.print(_tasks_table(page, category_names=get_category_names(db)))
+            return
+        tasks, next_cursor = get_tasks_page(db, page_size, after, **filters)
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(1)
+
+    console.print(_tasks_table(tasks, category_names=get_category_names(db)))
+    if next_cursor:
+        console.print(f"More tasks available: --after {next_cursor}")
+
+@app.command("next")
+def next_tasks(
+    limit: int = typer.Option(10, "--limit", "-n", min=1, help="How many tasks to show"),
+    user_id: Optional[int] = typer.Option(None, "--user-id", "-u", help="Only this user's tasks"),
+    token: Optional[str] = _token_option("Only tasks of the user of this session token")
+):
+    """Pending tasks to work on first, by priority, due date and age"""
+    from task_manager.database import get_db
+    from task_manager.crud import get_category_names, materialize_occurrences, next_tasks as rank_next_tasks
+
+    db = next(get_db())
+    user_id = _resolve_user(db, user_id, token)
+    materialize_occurrences(db)
+    ranked = rank_next_tasks(db, limit, user_id=user_id)
+    if not ranked:
+        console.print("Nothing left to do")
+        return
+    console.print(_tasks_table([task for task, _ in ranked], title="Next tasks",
+                               category_names=get_category_names(db), scores=[score for _, score in ranked]))
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help="Words to look for in titles and descriptions"),
+    status: Optional[Status] = typer.Option(None, "--status", "-s", help="Filter tasks by status"),
+    user_id: Optional[int] = typer.Option(None, "--user-id", "-u", help="Filter tasks by user"),
+    limit: int = typer.Option(20, "--limit", "-n", min=1, help="Most results to show"),
+    prefix: bool = typer.Option(True, "--prefix/--exact", help="Match words as prefixes"),
+    raw: bool = typer.Option(False, "--raw", help="Pass QUERY to SQLite FTS5 unchanged"),
+    token: Optional[str] = _token_option("Only search tasks of the user of this session token")
+):
+    """Full-text search over tasks, best match first"""
+    from task_manager.database import get_db
+    from task_manager.crud import search_tasks
+
+    db = next(get_db())
+    user_id = _resolve_user(db, user_id, token)
+    try:
+        results = search_tasks(db, query, status=status.value if status else None, user_id=user_id,
+                               limit=limit, prefix=prefix, raw=raw)
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(1)
+
+    if not results:
+        console.print(f"No tasks match '{query}'")
+        return
+    console.print(_tasks_table([task for task, _ in results], title=f"Tasks matching '{query}'"))
+
+@app.command()
+def stats(
+    by: List[StatsDimension] = typer.Option([StatsDimension.status], "--by", "-b",
+                                            help="Group by this; repeat to group by several"),
+    user_id: Optional[int] = typer.Option(None, "--user-id", "-u", help="Only count this user's tasks"),
+    since: Optional[str] = typer.Option(None, "--since", help="Only tasks on or after this date (YYYY-MM-DD)"),
+    until: Optional[str] = typer.Option(None, "--until", help="Only tasks before this date (YYYY-MM-DD)"),
+    date_field: DateField = typer.Option(DateField.created, "--date-field", help="Date --since/--until apply to"),
+    output: StatsFormat = typer.Option(StatsFormat.table, "--format", "-f", help="Output format"),
+    scan: bool = typer.Option(False, "--scan", help="Count the tasks table instead of reading the summary counts"),
+    token: Optional[str] = _token_option("Only count tasks of the user of this session token")
+):
+    """Count tasks by status, priority, category, user or overdue bucket"""
+    from task_manager.database import get_db
+    from task_manager.crud import task_stats
+
+    db = next(get_db())
+    user_id = _resolve_user(db, user_id, token)
+    group_by = [dimension.value for dimension in by]
+    try:
+        rows = task_stats(
+            db, group_by, user_id=user_id,
+            since=datetime.strptime(since, "%Y-%m-%d") if since else None,
+            until=datetime.strptime(until, "%Y-%m-%d") if until else None,
+            date_field=date_field.value, use_summary=not scan,
+        )
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(1)
+
+    total = sum(row["count"] for row in rows)
+    if output == StatsFormat.json:
+        sys.stdout.write(json.dumps({"group_by": group_by, "total": total, "groups": rows}) + "\n")
+        return
+
+    from rich.table import Table
+
+    table = Table(title="Task statistics", show_footer=True)
+    for index, dimension in enumerate(group_by):
+        table.add_column(dimension.capitalize(), footer="Total" if index == 0 else "")
+    table.add_column("Count", justify="right", footer=str(total))
+    table.add_column("Share", justify="right")
+    for row in rows:
+        table.add_row(*[str(row[dimension]) if row[dimension] is not None else "-" for dimension in group_by],
+                      str(row["count"]), f"{row['count'] / total:.1%}")
     console.print(table)
 
 @app.command()
 def show(task_id: int):
     """Show details of a specific task"""
+    from rich.table import Table
+    from task_manager.database import get_db
+    from task_manager.crud import get_task, get_task_series
+    from task_manager.recurrence import describe
+
     db = next(get_db())
-    task = get_task(db, task_id)
+    task = get_task(db, task_id, load="joined")
 
     if not task:
         console.print(f"[red]Task with ID {task_id} not found[/red]")
@@ -91,20 +396,132 @@ def show(task_id: int):
     table.add_row("Priority", task.priority)
     table.add_row("Category", task.category.name if task.category else "")
     table.add_row("Created At", task.created_at.strftime("%Y-%m-%d %H:%M:%S"))
+    series = get_task_series(db, task.series_id) if task.series_id else None
+    if series:
+        table.add_row("Repeats", f"{describe(series)} (series {series.id})")
+
+    console.print(table)
 
+@app.command()
+def series_list(
+    user_id: Optional[int] = typer.Option(None, "--user-id", "-u", help="Only this user's recurring tasks"),
+    token: Optional[str] = _token_option("Only list recurring tasks of the user of this session token")
+):
+    """List recurring tasks"""
+    from rich.table import Table
+    from task_manager.database import get_db
+    from task_manager.crud import get_task_series_list
+    from task_manager.recurrence import describe
+
+    db = next(get_db())
+    user_id = _resolve_user(db, user_id, token)
+    table = Table(title="Recurring tasks")
+    table.add_column("ID", style="cyan")
+    table.add_column("Title")
+    table.add_column("Repeats")
+    table.add_column("Starts")
+    for series in get_task_series_list(db, user_id=user_id):
+        table.add_row(str(series.id), series.title, describe(series), series.starts_at.strftime("%Y-%m-%d"))
+    console.print(table)
+
+@app.command()
+def series_show(
+    series_id: int,
+    through: Optional[str] = typer.Option(None, "--through", help="Last date to show (YYYY-MM-DD) [default: 30 days ahead]")
+):
+    """Show the occurrences of a recurring task, materialized or not"""
+    from datetime import timedelta
+    from rich.table import Table
+    from task_manager.database import get_db
+    from task_manager.crud import get_task_series, series_occurrences
+    from task_manager.recurrence import describe
+
+    db = next(get_db())
+    through_date = datetime.strptime(through, "%Y-%m-%d") if through else datetime.now() + timedelta(days=30)
+    rows = series_occurrences(db, series_id, through_date)
+    if rows is None:
+        console.print(f"[red]Recurring task with ID {series_id} not found[/red]")
+        raise typer.Exit(1)
+
+    series = get_task_series(db, series_id)
+    table = Table(title=f"{series.title}: {describe(series)}")
+    table.add_column("Due Date")
+    table.add_column("Task ID", style="cyan")
+    table.add_column("Status")
+    for due, task in rows:
+        table.add_row(due.strftime("%Y-%m-%d"), str(task.id) if task else "",
+                      task.status if task else "upcoming")
     console.print(table)
 
+@app.command()
+def series_delete(series_id: int):
+    """Stop a recurring task; its completed occurrences are kept"""
+    from task_manager.database import get_db
+    from task_manager.crud import delete_task_series
+
+    db = next(get_db())
+    if delete_task_series(db, series_id):
+        console.print(f"[green]Recurring task {series_id} deleted successfully![/green]")
+    else:
+        console.print(f"[red]Recurring task with ID {series_id} not found[/red]")
+        raise typer.Exit(1)
+
+def _parse_ids(specs: List[str]):
+    """Split ``["3", "5,7", "10-20"]`` into ids and inclusive ranges."""
+    ids, ranges = [], []
+    for spec in specs or []:
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                if "-" in part:
+                    low, high = (int(value) for value in part.split("-", 1))
+                    ranges.append((min(low, high), max(low, high)))
+                else:
+                    ids.append(int(part))
+            except ValueError:
+                raise typer.BadParameter(f"'{part}' is not a task ID or range like 10-20")
+    return ids, ranges
+
+def _selection(task_ids, where_status, where_category, where_user, due_before) -> dict:
+    ids, ranges = _parse_ids(task_ids)
+    return dict(
+        ids=ids,
+        id_ranges=ranges,
+        status=where_status,
+        category=where_category,
+        user_id=where_user,
+        due_before=datetime.strptime(due_before, "%Y-%m-%d") if due_before else None,
+    )
+
+def _single_id(selection: dict):
+    """The task ID when exactly one task was named and no filters were given."""
+    if len(selection["ids"]) == 1 and not any(
+            selection[key] for key in ("id_ranges", "status", "category", "user_id", "due_before")):
+        return selection["ids"][0]
+    return None
+
+TASK_IDS_HELP = "Task IDs, comma lists or ranges, e.g. 3 5,7 10-20"
+
 @app.command()
 def update(
-    task_id: int,
+    task_ids: Optional[List[str]] = typer.Argument(None, help=TASK_IDS_HELP),
     title: Optional[str] = typer.Option(None, "--title", "-t"),
     description: Optional[str] = typer.Option(None, "--description", "-d"),
     due_date: Optional[str] = typer.Option(None, "--due-date", "-dd"),
     priority: Optional[Priority] = typer.Option(None, "--priority", "-p"),
     category_id: Optional[int] = typer.Option(None, "--category-id", "-c"),
-    status: Optional[Status] = typer.Option(None, "--status", "-s")
+    status: Optional[Status] = typer.Option(None, "--status", "-s"),
+    where_status: Optional[Status] = typer.Option(None, "--where-status", help="Only tasks with this status"),
+    where_category: Optional[str] = typer.Option(None, "--where-category", help="Only tasks in this category (by name)"),
+    where_user: Optional[int] = typer.Option(None, "--where-user", help="Only tasks of this user ID"),
+    due_before: Optional[str] = typer.Option(None, "--due-before", help="Only tasks due before this date (YYYY-MM-DD)")
 ):
-    """Update a task"""
+    """Update one or many tasks"""
+    from task_manager.database import get_db
+    from task_manager.crud import bulk_update_tasks, update_task
+
     db = next(get_db())
 
     update_data = {}
@@ -121,22 +538,184 @@ def update(
     if status:
         update_data["status"] = status
 
-    task = update_task(db, task_id, **update_data)
+    selection = _selection(task_ids, where_status, where_category, where_user, due_before)
+    task_id = _single_id(selection)
+    if task_id is not None:
+        # One task by ID, as before bulk selection: no options is not an error.
+        if update_task(db, task_id, **update_data):
+            console.print(f"[green]Task {task_id} updated successfully![/green]")
+        else:
+            console.print(f"[red]Task with ID {task_id} not found[/red]")
+            raise typer.Exit(1)
+        return
 
-    if task:
-        console.print(f"[green]Task {task_id} updated successfully![/green]")
-    else:
-        console.print(f"[red]Task with ID {task_id} not found[/red]")
+    try:
+        count = bulk_update_tasks(db, update_data, **selection)
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
         raise typer.Exit(1)
+    console.print(f"[green]Updated {count} tasks[/green]")
 
 @app.command()
-def delete(task_id: int):
-    """Delete a task"""
+def complete(
+    task_ids: Optional[List[str]] = typer.Argument(None, help=TASK_IDS_HELP),
+    where_status: Optional[Status] = typer.Option(None, "--where-status", help="Only tasks with this status"),
+    where_category: Optional[str] = typer.Option(None, "--where-category", help="Only tasks in this category (by name)"),
+    where_user: Optional[int] = typer.Option(None, "--where-user", help="Only tasks of this user ID"),
+    due_before: Optional[str] = typer.Option(None, "--due-before", help="Only tasks due before this date (YYYY-MM-DD)")
+):
+    """Mark one or many tasks as completed"""
+    from task_manager.database import get_db
+    from task_manager.crud import complete_tasks
+
     db = next(get_db())
-    task = delete_task(db, task_id)
+    try:
+        count = complete_tasks(db, **_selection(task_ids, where_status, where_category, where_user, due_before))
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(1)
+    console.print(f"[green]Completed {count} tasks[/green]")
+
+@app.command()
+def delete(
+    task_ids: Optional[List[str]] = typer.Argument(None, help=TASK_IDS_HELP),
+    where_status: Optional[Status] = typer.Option(None, "--where-status", help="Only tasks with this status"),
+    where_category: Optional[str] = typer.Option(None, "--where-category", help="Only tasks in this category (by name)"),
+    where_user: Optional[int] = typer.Option(None, "--where-user", help="Only tasks of this user ID"),
+    due_before: Optional[str] = typer.Option(None, "--due-before", help="Only tasks due before this date (YYYY-MM-DD)")
+):
+    """Delete one or many tasks"""
+    from task_manager.database import get_db
+    from task_manager.crud import bulk_delete_tasks
 
-    if task:
-        console.print(f"[green]Task {task_id} deleted successfully![/green]")
+    db = next(get_db())
+    selection = _selection(task_ids, where_status, where_category, where_user, due_before)
+    try:
+        count = bulk_delete_tasks(db, **selection)
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(1)
+
+    task_id = _single_id(selection)
+    if task_id is not None:
+        if count:
+            console.print(f"[green]Task {task_id} deleted successfully![/green]")
+        else:
+            console.print(f"[red]Task with ID {task_id} not found[/red]")
+            raise typer.Exit(1)
     else:
-        console.print(f"[red]Task with ID {task_id} not found[/red]")
+        console.print(f"[green]Deleted {count} tasks[/green]")
+
+def _detect_format(path: str, file_format: Optional[FileFormat]) -> FileFormat:
+    if file_format:
+        return file_format
+    if path.endswith(".csv"):
+        return FileFormat.csv
+    return FileFormat.ndjson
+
+def _parse_row(row: dict) -> dict:
+    # CSV gives us strings for everything; NDJSON gives strings for dates.
+    row = {key: (None if value == "" else value) for key, value in row.items()}
+    for key in ("due_date", "created_at"):
+        if isinstance(row.get(key), str):
+            row[key] = datetime.fromisoformat(row[key])
+    for key in ("category_id", "user_id"):
+        if row.get(key) is not None:
+            row[key] = int(row[key])
+    if isinstance(row.get("reminder_sent"), str):
+        row["reminder_sent"] = row["reminder_sent"].lower() in ("1", "true", "yes")
+    return row
+
+def _read_rows(handle, file_format: FileFormat):
+    if file_format == FileFormat.csv:
+        for row in csv.DictReader(handle):
+            yield _parse_row(row)
+    else:
+        for line in handle:
+            if line.strip():
+                yield _parse_row(json.loads(line))
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+@app.command("import")
+def import_tasks(
+    path: str = typer.Argument(..., help="File to read, or - for stdin"),
+    file_format: Optional[FileFormat] = typer.Option(None, "--format", "-f", help="Defaults to the file extension"),
+    batch_size: int = typer.Option(1000, "--batch-size", "-b", min=1)
+):
+    """Import tasks from an NDJSON or CSV file"""
+    from sqlalchemy.exc import IntegrityError
+    from task_manager.database import get_db
+    from task_manager.crud import bulk_create_tasks
+
+    db = next(get_db())
+    file_format = _detect_format(path, file_format)
+
+    try:
+        handle = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    except OSError as exc:
+        console.print(f"[red]Cannot read {path}: {exc.strerror}[/red]")
+        raise typer.Exit(1)
+    started = time.perf_counter()
+    try:
+        count = bulk_create_tasks(db, _read_rows(handle, file_format), batch_size=batch_size)
+    except (ValueError, KeyError, OSError) as exc:
+        db.rollback()
+        console.print(f"[red]Import failed: {exc}[/red]")
+        raise typer.Exit(1)
+    except IntegrityError as exc:
+        db.rollback()
+        console.print(f"[red]Import failed, nothing from the failing batch was saved: {exc.orig}[/red]")
         raise typer.Exit(1)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    elapsed = time.perf_counter() - started
+
+    rate = count / elapsed if elapsed > 0 else float(count)
+    console.print(f"[green]Imported {count} tasks in {elapsed:.2f}s ({rate:,.0f} rows/sec)[/green]")
+
+@app.command("export")
+def export_tasks(
+    path: str = typer.Argument("-", help="File to write, or - for stdout"),
+    file_format: Optional[FileFormat] = typer.Option(None, "--format", "-f", help="Defaults to the file extension"),
+    status: Optional[Status] = typer.Option(None, "--status", "-s", help="Filter tasks by status"),
+    user_id: Optional[int] = typer.Option(None, "--user-id", "-u"),
+    batch_size: int = typer.Option(1000, "--batch-size", "-b", min=1),
+    token: Optional[str] = _token_option("Only export tasks of the user of this session token")
+):
+    """Export tasks to an NDJSON or CSV file"""
+    from task_manager.database import get_db
+    from task_manager.crud import iter_tasks
+
+    db = next(get_db())
+    user_id = _resolve_user(db, user_id, token)
+    file_format = _detect_format(path, file_format)
+
+    handle = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    started = time.perf_counter()
+    count = 0
+    try:
+        writer = csv.DictWriter(handle, fieldnames=EXPORT_FIELDS) if file_format == FileFormat.csv else None
+        if writer:
+            writer.writeheader()
+        for row in iter_tasks(db, batch_size=batch_size, status=status, user_id=user_id):
+            values = {key: _format_value(row[key]) for key in EXPORT_FIELDS}
+            if writer:
+                writer.writerow(values)
+            else:
+                handle.write(json.dumps(values) + "\n")
+            count += 1
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+    elapsed = time.perf_counter() - started
+
+    if path != "-":
+        rate = count / elapsed if elapsed > 0 else float(count)
+        console.print(f"[green]Exported {count} tasks in {elapsed:.2f}s ({rate:,.0f} rows/sec)[/green]")
@@ -1,17 +1,19 @@
 import typer
 import getpass
-import hashlib
-from rich.console import Console
+from enum import Enum
 
-from task_manager.database import get_db
-from task_manager.crud import create_user, get_user_by_username
+from task_manager.commands import LazyConsole
 
 app = typer.Typer()
-console = Console()
+console = LazyConsole()
 
 @app.command()
 def register(username: str):
     """Register a new user"""
+    from task_manager.database import get_db
+    from task_manager.crud import create_user, get_user_by_username
+    from task_manager.passwords import hash_password
+
     db = next(get_db())
     existing_user = get_user_by_username(db, username)
     if existing_user:
@@ -22,23 +24,79 @@ def register(username: str):
     if password != password_confirm:
         console.print("[red]Passwords do not match.[/red]")
         raise typer.Exit(1)
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
+    password_hash = hash_password(password)
     user = create_user(db, username, password_hash)
     console.print(f"[green]User '{username}' registered successfully with ID: {user.id}[/green]")
 
 @app.command()
 def login(username: str):
-    """Login a user and return a dummy token"""
+    """Log in and print a session token for --token"""
+    from task_manager.database import get_db
+    from task_manager.crud import create_session, get_user_by_username, update_user
+    from task_manager.passwords import hash_password, needs_rehash, verify_password
+
     db = next(get_db())
     user = get_user_by_username(db, username)
     if not user:
         console.print(f"[red]User '{username}' not found.[/red]")
         raise typer.Exit(1)
     password = getpass.getpass("Password: ")
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
-    if password_hash != user.password_hash:
+    if not verify_password(password, user.password_hash):
         console.print("[red]Invalid password.[/red]")
         raise typer.Exit(1)
-    # For simplicity, return a dummy token (in real app, generate JWT)
-    token = f"token-for-user-{user.id}"
-    console.print(f"[green]Login successful. Token: {token}[/green]")
+    if needs_rehash(user.password_hash):
+        # The password is only ever in hand here, so this is where old
+        # hashes are brought up to the configured scheme and cost.
+        update_user(db, user.id, password_hash=hash_password(password))
+    token, expires_at = create_session(db, user.id)
+    console.print(f"[green]Login successful. Token: {token}[/green]", soft_wrap=True)
+    console.print(f"Expires {expires_at:%Y-%m-%d %H:%M} UTC. Pass it to task commands with --token "
+                  "or the TASK_MANAGER_TOKEN environment variable.")
+
+@app.command()
+def logout(token: str = typer.Option(..., "--token", envvar="TASK_MANAGER_TOKEN", help="Session token to end")):
+    """End a session started by login"""
+    from task_manager.database import get_db
+    from task_manager.crud import revoke_session
+
+    db = next(get_db())
+    if not revoke_session(db, token):
+        console.print("[red]Unknown session token.[/red]")
+        raise typer.Exit(1)
+    console.print("[green]Logged out.[/green]")
+
+@app.command("purge-sessions")
+def purge_sessions(batch_size: int = typer.Option(1000, "--batch-size", "-b", min=1, help="Sessions deleted per transaction")):
+    """Delete expired session tokens (the worker also does this every sweep)"""
+    from task_manager.database import get_db
+    from task_manager.crud import purge_expired_sessions
+
+    db = next(get_db())
+    count = purge_expired_sessions(db, batch_size=batch_size)
+    console.print(f"[green]Deleted {count} expired sessions.[/green]")
+
+class PasswordScheme(str, Enum):
+    scrypt = "scrypt"
+    pbkdf2_sha256 = "pbkdf2_sha256"
+
+@app.command("calibrate-hash")
+def calibrate_hash(
+    target_ms: float = typer.Option(250.0, "--target-ms", min=1.0, help="Time one hash should take"),
+    scheme: PasswordScheme = typer.Option(None, "--scheme", help="Hash scheme [default: PASSWORD_SCHEME]")
+):
+    """Pick password hashing costs that take about --target-ms on this machine"""
+    from task_manager.config import PASSWORD_SCHEME
+    from task_manager.passwords import calibrate
+
+    scheme = scheme.value if scheme else PASSWORD_SCHEME
+    params, elapsed = calibrate(target_ms, scheme)
+    console.print(f"{scheme} {', '.join(f'{name}={value}' for name, value in params.items())}: "
+                  f"{elapsed:.0f} ms per hash (target {target_ms:.0f} ms)")
+    settings = {"PASSWORD_SCHEME": scheme}
+    if scheme == "scrypt":
+        settings["PASSWORD_SCRYPT_N"] = params["n"]
+    else:
+        settings["PASSWORD_PBKDF2_ITERATIONS"] = params["i"]
+    console.print("Set in the environment or .env; existing hashes are upgraded at their next login:")
+    for name, value in settings.items():
+        console.print(f"{name}={value}", highlight=False)
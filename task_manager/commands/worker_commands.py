@@ -0,0 +1,81 @@
+import threading
+from enum import Enum
+from typing import Optional
+import typer
+
+from task_manager.commands import LazyConsole
+
+app = typer.Typer()
+console = LazyConsole()
+
+class SenderKind(str, Enum):
+    print = "print"
+    smtp = "smtp"
+
+def _print_metrics(metrics):
+    console.print(
+        f"sweep {metrics.sweeps}: {metrics.reminders_sent} sent in {metrics.batches} batches, "
+        f"{metrics.reminders_failed} failed, {metrics.throughput:,.1f} reminders/sec, "
+        f"lag {metrics.last_lag_seconds:.1f}s (max {metrics.max_lag_seconds:.1f}s), "
+        f"{metrics.sessions_purged} expired sessions purged, "
+        f"{metrics.occurrences_created} recurring occurrences created"
+    )
+
+@app.command()
+def run(
+    batch_size: int = typer.Option(100, "--batch-size", "-b", min=1, help="Tasks processed per transaction"),
+    max_sleep: float = typer.Option(60.0, "--max-sleep", min=0.0, help="Longest wait between sweeps, in seconds"),
+    once: bool = typer.Option(False, "--once", help="Run a single sweep and exit"),
+    sender_kind: SenderKind = typer.Option(SenderKind.print, "--sender", help="How reminders are delivered"),
+    concurrency: Optional[int] = typer.Option(None, "--concurrency", min=1,
+                                              help="Simultaneous SMTP connections [default: REMINDER_CONCURRENCY]"),
+    metrics_file: Optional[str] = typer.Option(None, "--metrics-file",
+                                               help="Rewrite this file with Prometheus metrics after every sweep"),
+    write_socket: Optional[str] = typer.Option(None, "--write-socket",
+                                               help="Send writes to the write queue of the daemon on this socket")
+):
+    """Send due reminders, sleeping until the next task falls due"""
+    from task_manager import config
+    from task_manager.database import get_db
+    from task_manager.senders import AsyncSMTPSender
+    from task_manager.worker import run_worker
+
+    db = next(get_db())
+    stop = threading.Event()
+    sender = None
+    if sender_kind == SenderKind.smtp:
+        sender = AsyncSMTPSender(config.SMTP_HOST, config.SMTP_PORT, config.SMTP_FROM,
+                                 concurrency=concurrency or config.REMINDER_CONCURRENCY)
+
+    query_stats = None
+    if metrics_file:
+        from task_manager.instrumentation import QueryStats, instrument_engine, write_prometheus
+
+        query_stats = QueryStats()
+        instrument_engine(db.get_bind(), query_stats)
+
+    def on_sweep(metrics):
+        _print_metrics(metrics)
+        if metrics_file:
+            write_prometheus(metrics_file, metrics, query_stats)
+        if once:
+            stop.set()
+
+    writes = None
+    if write_socket:
+        from task_manager.write_queue import RemoteWriteQueue
+
+        try:
+            writes = RemoteWriteQueue(write_socket)
+        except OSError as exc:
+            console.print(f"[red]Cannot reach the daemon on {write_socket}: {exc}[/red]")
+            raise typer.Exit(1)
+
+    try:
+        run_worker(db, batch_size=batch_size, max_sleep=max_sleep, stop=stop, on_sweep=on_sweep,
+                   sender=sender, writes=writes)
+    except KeyboardInterrupt:
+        console.print("[yellow]Worker stopped[/yellow]")
+    finally:
+        if writes:
+            writes.close()
@@ -10,6 +10,87 @@ BASE_DIR = Path(__file__).parent
 DB_NAME = os.getenv("DB_NAME", "tasks.db")
 DB_PATH = BASE_DIR / DB_NAME
 SQLALCHEMY_DATABASE_URI = f"sqlite:///{DB_PATH}"
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
+# SQLite performance profile, applied to every new connection. Set
+# DB_PERFORMANCE_PROFILE=off to run with SQLite's stock settings.
+DB_PERFORMANCE_PROFILE = os.getenv("DB_PERFORMANCE_PROFILE", "on").lower() not in ("0", "off", "false", "no")
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB rather than pages.
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", str(-64 * 1024))),
+    "foreign_keys": "ON",
+}
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
 
 # Alembic configuration
-ALEMBIC_INI_PATH = BASE_DIR.parent / "alembic.ini"
\ No newline at end of file
+ALEMBIC_INI_PATH = BASE_DIR.parent / "alembic.ini"
+
+# Reminder delivery
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "25"))
+SMTP_FROM = os.getenv("SMTP_FROM", "reminders@localhost")
+REMINDER_CONCURRENCY = int(os.getenv("REMINDER_CONCURRENCY", "10"))
+
+# In-process cache for category and user lookups. LOOKUP_CACHE_SIZE=0 turns
+# it off; the TTL bounds how stale another process's writes can look.
+LOOKUP_CACHE_SIZE = int(os.getenv("LOOKUP_CACHE_SIZE", "1024"))
+LOOKUP_CACHE_TTL = float(os.getenv("LOOKUP_CACHE_TTL", "60"))
+
+# Password hashing. Raising a cost only affects new hashes; older ones are
+# upgraded the next time their user logs in. `user calibrate-hash` suggests
+# values for this machine.
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "scrypt")
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+# hashlib.scrypt rejects anything else, which would otherwise only show up
+# as every register and login failing.
+if PASSWORD_SCRYPT_N < 2 or PASSWORD_SCRYPT_N & (PASSWORD_SCRYPT_N - 1):
+    raise ValueError(f"PASSWORD_SCRYPT_N must be a power of 2 greater than 1, got {PASSWORD_SCRYPT_N}")
+if PASSWORD_SCRYPT_R < 1 or PASSWORD_SCRYPT_P < 1 or PASSWORD_SCRYPT_R * PASSWORD_SCRYPT_P >= 2 ** 30:
+    raise ValueError("PASSWORD_SCRYPT_R and PASSWORD_SCRYPT_P must be positive with R * P < 2**30, "
+                     f"got {PASSWORD_SCRYPT_R} and {PASSWORD_SCRYPT_P}")
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "600000"))
+
+# Session tokens from `user login`. Validations are cached in process; the
+# cache TTL bounds how long a token revoked by another process keeps working.
+SESSION_TOKEN_TTL = float(os.getenv("SESSION_TOKEN_TTL", str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "4096"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "60"))
+
+# Statements slower than this many milliseconds are logged as warnings to the
+# task_manager.sql.slow logger. 0 turns the slow-query log off.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+# Sharding. With SHARD_COUNT > 1 tasks are spread by user over that many
+# SQLite files: DB_NAME itself plus DB_NAME.shard1, .shard2... next to it, so
+# writers for users on different shards no longer queue for one write lock.
+# Users, categories and sessions stay in DB_NAME. Run `task-manager init`
+# after raising it, then `task-manager db reshard --rebalance`. The directory
+# TTL bounds how long another process keeps using a user's old shard.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_DIRECTORY_TTL = float(os.getenv("SHARD_DIRECTORY_TTL", "5"))
+SHARD_FANOUT_THREADS = int(os.getenv("SHARD_FANOUT_THREADS", "8"))
+
+# Recurring tasks. Occurrences due within this many days are materialized as
+# tasks by the worker and by `task list`; later ones exist only as the rule.
+RECURRENCE_WINDOW_DAYS = float(os.getenv("RECURRENCE_WINDOW_DAYS", "7"))
+
+# `task next` ranking. A pending task scores its priority's weight, plus
+# RANK_URGENCY_PER_DAY for each day it is nearer to (or past) its due date,
+# plus RANK_AGE_PER_DAY for each day since it was created. Tasks without a due
+# date count as due RANK_NO_DUE_DAYS after they were created. Time adds the
+# same to every score, so the order never changes by itself and is kept in
+# the indexed tasks.rank column. Run `task-manager db rerank` after changing
+# any of these.
+RANK_WEIGHT_HIGH = float(os.getenv("RANK_WEIGHT_HIGH", "14"))
+RANK_WEIGHT_MEDIUM = float(os.getenv("RANK_WEIGHT_MEDIUM", "7"))
+RANK_WEIGHT_LOW = float(os.getenv("RANK_WEIGHT_LOW", "0"))
+RANK_URGENCY_PER_DAY = float(os.getenv("RANK_URGENCY_PER_DAY", "1"))
+RANK_AGE_PER_DAY = float(os.getenv("RANK_AGE_PER_DAY", "0.1"))
+RANK_NO_DUE_DAYS = float(os.getenv("RANK_NO_DUE_DAYS", "14"))
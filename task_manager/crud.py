@@ -1,10 +1,85 @@
-from sqlalchemy.orm import Session
-from datetime import datetime
-from .models import Task, Category, Priority, User
+import base64
+import hashlib
+import heapq
+import json
+import secrets
+import time
+from sqlalchemy import (
+    String, and_, case, column, delete, event, func, insert, inspect, literal_column, or_, select, table,
+    type_coerce, union_all, update,
+)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.elements import UnaryExpression
+from sqlalchemy.sql.operators import custom_op
+from sqlalchemy.orm import Session, joinedload, load_only, make_transient_to_detached, selectinload
+from datetime import datetime, timedelta
+from itertools import chain, islice
+from operator import attrgetter, itemgetter
+from typing import Iterable, Iterator
+from .cache import LookupCache
+from .config import (
+    LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL, RANK_AGE_PER_DAY, RANK_URGENCY_PER_DAY, RECURRENCE_WINDOW_DAYS,
+    SESSION_CACHE_SIZE, SESSION_CACHE_TTL, SESSION_TOKEN_TTL
+)
+from .database import Base, allocate_task_ids
+from .models import (
+    ALL_USERS, Task, TaskCount, TaskSeries, Category, Priority, SessionToken, Status, User, UserShard, task_rank_sql
+)
+from .recurrence import occurrence, occurrences
+
+# Sharding (see database.ShardRouter). A sharded session runs task statements
+# on every shard concerned and concatenates the results, so listings merge
+# them back into order here.
+def _router(db: Session):
+    """The ShardRouter behind a sharded session, or None."""
+    return getattr(db, "router", None)
+
+def begin_immediate(db: Session):
+    """Start ``db``'s transaction holding the write lock (of every shard), so
+    what it reads cannot change before it commits."""
+    router = _router(db)
+    if router is None:
+        db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+        return
+    for shard in router.engines:
+        db.connection(bind_arguments={"shard_id": shard}).exec_driver_sql("BEGIN IMMEDIATE")
+
+def merge_shard_results(db: Session, rows: list, key, limit: int = None) -> list:
+    """``rows`` from a sharded session in ``key`` order, cut to ``limit``.
+
+    Each shard returns its own first ``limit`` rows, so the overall first
+    ``limit`` are among them. Duplicates, which a user being moved between
+    shards can briefly leave, are dropped. Unsharded sessions get ``rows``
+    back as they are.
+    """
+    if _router(db) is None:
+        return rows
+    merged, seen = [], set()
+    for row in sorted(rows, key=key):
+        if row.id not in seen:
+            seen.add(row.id)
+            merged.append(row)
+    return merged[:limit] if limit is not None else merged
+
+def _iter_merged(db: Session, stmt, key, user_id: int = None):
+    """Rows of ``stmt``, which must be ordered by ``key``, streamed from every
+    shard concerned and merged in order."""
+    router = _router(db)
+    if router is None:
+        yield from db.execute(stmt)
+        return
+    shards = router.shards_for_user(user_id) if user_id else list(router.engines)
+    streams = [db.execute(stmt, bind_arguments={"shard_id": shard}) for shard in shards]
+    last = None
+    for row in heapq.merge(*streams, key=key):
+        if row.id != last:
+            last = row.id
+            yield row
 
 # Task CRUD operations
 def create_task(db: Session, title: str, description: str, due_date: datetime,
-               priority: Priority, category_id: int = None, status: str = None, user_id: int = None):
+               priority: Priority, category_id: int = None, status: str = None, user_id: int = None,
+               reminder_sent: bool = False):
     task = Task(
         title=title,
         description=description,
@@ -12,33 +87,201 @@ def create_task(db: Session, title: str, description: str, due_date: datetime,
         priority=priority,
         category_id=category_id,
         status=status if status else "pending",
-        user_id=user_id
+        user_id=user_id,
+        reminder_sent=bool(reminder_sent)
     )
     db.add(task)
     db.commit()
     db.refresh(task)
     return task
 
-def get_task(db: Session, task_id: int):
-    return db.query(Task).filter(Task.id == task_id).first()
+# Relationship loader strategies for the listing/show paths. Without one,
+# touching ``task.category`` lazy-loads it with an extra query per row.
+TASK_LOADERS = {"joined": joinedload, "selectin": selectinload}
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100, status: str = None, user_id: int = None):
+# The columns ``task list`` renders (plus what the pagination cursor needs).
+TASK_LIST_COLUMNS = (
+    Task.id, Task.title, Task.description, Task.due_date, Task.priority, Task.status,
+    Task.category_id,
+)
+
+def _task_query(db: Session, load: str = None, columns: tuple = None):
     query = db.query(Task)
+    if columns:
+        query = query.options(load_only(*columns))
+    if load:
+        if load not in TASK_LOADERS:
+            raise ValueError(f"Unknown loader '{load}', expected one of {tuple(TASK_LOADERS)}")
+        loader = TASK_LOADERS[load]
+        if columns:
+            query = query.options(loader(Task.category).load_only(Category.name))
+        else:
+            query = query.options(loader(Task.category), loader(Task.user))
+    return query
+
+def get_task(db: Session, task_id: int, load: str = None):
+    return _task_query(db, load).filter(Task.id == task_id).first()
+
+def get_tasks(db: Session, skip: int = 0, limit: int = 100, status: str = None, user_id: int = None,
+              load: str = None, columns: tuple = None):
+    query = _task_query(db, load, columns)
     if status:
         query = query.filter(Task.status == status)
     if user_id:
         query = query.filter(Task.user_id == user_id)
+    if _router(db):
+        # An offset only means something over the merged order.
+        tasks = query.order_by(Task.id).limit(skip + limit).all()
+        return merge_shard_results(db, tasks, attrgetter("id"))[skip:skip + limit]
     return query.offset(skip).limit(limit).all()
 
+# Keyset pagination: the cursor records the sort key of the last row served,
+# so every page is an index seek rather than an OFFSET scan.
+TASK_SORT_KEYS = ("id", "due_date")
+
+def encode_cursor(sort: str, task: Task) -> str:
+    if sort == "due_date":
+        key = [task.due_date.isoformat() if task.due_date else None, task.id]
+    else:
+        key = [task.id]
+    payload = json.dumps({"s": sort, "k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(sort: str, cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = payload["k"]
+        if payload["s"] != sort or len(key) != (2 if sort == "due_date" else 1):
+            raise ValueError
+        if sort == "due_date":
+            key = [datetime.fromisoformat(key[0]) if key[0] else None, int(key[1])]
+        else:
+            key = [int(key[0])]
+    except (ValueError, TypeError, KeyError, json.JSONDecodeError):
+        raise ValueError(f"Invalid cursor for sort '{sort}': {cursor}")
+    return key
+
+def _sort_key(sort: str):
+    """The Python equivalent of ``_keyset``'s ORDER BY, for merging shards."""
+    if sort == "due_date":
+        return lambda task: (task.due_date is None, task.due_date or datetime.min, task.id)
+    return attrgetter("id")
+
+def _keyset(query, sort: str, after: str = None):
+    """Order ``query`` (a Query or select) by ``sort`` and start it after ``after``."""
+    if sort == "due_date":
+        query = query.order_by(Task.due_date.asc().nulls_last(), Task.id)
+        if after:
+            due_date, task_id = decode_cursor(sort, after)
+            if due_date is None:
+                query = query.filter(Task.due_date.is_(None), Task.id > task_id)
+            else:
+                query = query.filter(or_(
+                    Task.due_date > due_date,
+                    and_(Task.due_date == due_date, Task.id > task_id),
+                    Task.due_date.is_(None),
+                ))
+    else:
+        query = query.order_by(Task.id)
+        if after:
+            query = query.filter(Task.id > decode_cursor(sort, after)[0])
+    return query
+
+def get_tasks_page(db: Session, page_size: int = 100, after: str = None, sort: str = "id",
+                   status: str = None, user_id: int = None, load: str = None, columns: tuple = None):
+    """Return ``(tasks, next_cursor)``; ``next_cursor`` is None on the last page."""
+    if sort not in TASK_SORT_KEYS:
+        raise ValueError(f"Unknown sort key '{sort}', expected one of {TASK_SORT_KEYS}")
+
+    def page(session):
+        query = _task_query(session, load, columns)
+        if status:
+            query = query.filter(Task.status == status)
+        if user_id:
+            query = query.filter(Task.user_id == user_id)
+        return _keyset(query, sort, after).limit(page_size + 1).all()
+
+    router = _router(db)
+    if router is None:
+        tasks = page(db)
+    else:
+        # Each shard reads its own page in parallel.
+        shards = router.shards_for_user(user_id) if user_id else None
+        tasks = merge_shard_results(db, list(chain.from_iterable(router.fan_out(page, shards))),
+                                    _sort_key(sort), page_size + 1)
+    if len(tasks) > page_size:
+        tasks = tasks[:page_size]
+        return tasks, encode_cursor(sort, tasks[-1])
+    return tasks, None
+
+def iter_task_pages(db: Session, page_size: int = 100, after: str = None, sort: str = "id",
+                    status: str = None, user_id: int = None, load: str = None, columns: tuple = None):
+    """Yield successive pages from ``get_tasks_page`` until the table is exhausted.
+
+    The session's identity map only holds weak references, so pages the
+    caller has finished with are released as it goes.
+    """
+    while True:
+        tasks, after = get_tasks_page(db, page_size, after, sort, status, user_id, load, columns)
+        if tasks:
+            yield tasks
+        if after is None:
+            return
+
+def task_rows_statement(sort: str = "id", after: str = None, status: str = None, user_id: int = None,
+                        limit: int = None):
+    """A select of ``TASK_LIST_COLUMNS`` ordered and started like ``get_tasks_page``."""
+    if sort not in TASK_SORT_KEYS:
+        raise ValueError(f"Unknown sort key '{sort}', expected one of {TASK_SORT_KEYS}")
+    stmt = _keyset(select(*TASK_LIST_COLUMNS), sort, after)
+    if status:
+        stmt = stmt.where(Task.status == status)
+    if user_id:
+        stmt = stmt.where(Task.user_id == user_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def iter_task_rows(db: Session, sort: str = "id", after: str = None, status: str = None,
+                   user_id: int = None, limit: int = None, batch_size: int = 1000):
+    """Stream the ``TASK_LIST_COLUMNS`` of matching tasks as rows.
+
+    Rows come off a ``yield_per`` cursor, ``batch_size`` at a time, so memory
+    stays flat however many tasks match. Ordering and ``after`` work as in
+    ``get_tasks_page``, and each row can be passed to ``encode_cursor``.
+    """
+    stmt = task_rows_statement(sort, after, status, user_id, limit)
+    rows = _iter_merged(db, stmt.execution_options(yield_per=batch_size), _sort_key(sort), user_id)
+    yield from islice(rows, limit)
+
 def update_task(db: Session, task_id: int, **kwargs):
     task = db.query(Task).filter(Task.id == task_id).first()
     if task:
-        for key, value in kwargs.items():
-            setattr(task, key, value)
+        completes_occurrence = (task.series_id is not None and task.status != Status.COMPLETED
+                                and kwargs.get("status") == Status.COMPLETED)
+        router = _router(db)
+        if router and "user_id" in kwargs and router.shard_for_user(kwargs["user_id"]) != inspect(task).identity_token:
+            task = _move_task(db, task, kwargs)
+        else:
+            for key, value in kwargs.items():
+                setattr(task, key, value)
+        if completes_occurrence:
+            db.flush()
+            _advance_series(db, [task.series_id])
         db.commit()
         db.refresh(task)
     return task
 
+def _move_task(db: Session, task: Task, changes: dict) -> Task:
+    """Re-create ``task``, with ``changes``, on the shard of its new user."""
+    values = {**_row_values(task), **changes}
+    db.delete(task)
+    db.flush()
+    moved = Task(**values)
+    db.add(moved)
+    return moved
+
 def delete_task(db: Session, task_id: int):
     task = db.query(Task).filter(Task.id == task_id).first()
     if task:
@@ -46,25 +289,628 @@ def delete_task(db: Session, task_id: int):
         db.commit()
     return task
 
+# Set-based operations over many tasks
+def task_selection(ids: Iterable[int] = None, id_ranges: Iterable[tuple] = None, status: str = None,
+                   category: str = None, user_id: int = None, due_before: datetime = None) -> list:
+    """WHERE clauses selecting tasks by id, id range (inclusive) and filters.
+
+    Ids and ranges are OR-ed together; the filters narrow that down further.
+    Raises ValueError when nothing at all is given, so a missing argument can
+    never turn into an update of the whole table.
+    """
+    ids = list(ids or ())
+    id_ranges = list(id_ranges or ())
+    clauses = []
+    id_clauses = [Task.id.between(low, high) for low, high in id_ranges]
+    if ids:
+        id_clauses.append(Task.id.in_(ids))
+    if id_clauses:
+        clauses.append(or_(*id_clauses))
+    if status:
+        clauses.append(Task.status == status)
+    if category:
+        clauses.append(Task.category_id.in_(select(Category.id).where(Category.name == category)))
+    if user_id:
+        clauses.append(Task.user_id == user_id)
+    if due_before:
+        clauses.append(Task.due_date < due_before)
+    if not clauses:
+        raise ValueError("Select tasks by id, range or at least one filter")
+    return clauses
+
+def bulk_update_tasks(db: Session, values: dict, **selection) -> int:
+    """Apply ``values`` to every selected task in one UPDATE; returns the row count."""
+    if not values:
+        raise ValueError("Nothing to update")
+    if "user_id" in values and _router(db):
+        raise ValueError("Tasks cannot change user in bulk when sharding is on; update them one at a time")
+    clauses = task_selection(**selection)
+    series_ids = set()
+    if values.get("status") == Status.COMPLETED:
+        series_ids.update(db.execute(
+            select(Task.series_id).where(*clauses, Task.series_id.is_not(None), Task.status != Status.COMPLETED)
+            .distinct()
+        ).scalars())
+    result = db.execute(
+        update(Task).where(*clauses).values(**values),
+        execution_options={"synchronize_session": False},
+    )
+    _advance_series(db, series_ids)
+    db.commit()
+    return result.rowcount
+
+def bulk_delete_tasks(db: Session, **selection) -> int:
+    """Delete every selected task in one DELETE; returns the row count."""
+    result = db.execute(
+        delete(Task).where(*task_selection(**selection)),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+    return result.rowcount
+
+def complete_tasks(db: Session, **selection) -> int:
+    return bulk_update_tasks(db, {"status": Status.COMPLETED}, **selection)
+
+def mark_reminders_sent(db: Session, task_ids: Iterable[int]) -> int:
+    result = db.execute(
+        update(Task).where(Task.id.in_(list(task_ids))).values(reminder_sent=True),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+    return result.rowcount
+
+# "What next": pending tasks by score (see config.RANK_*). The stored rank is
+# the score less (urgency + age) * julianday(now), which every task shares,
+# so the top N are the first N entries of a partial index on rank.
+PENDING_LITERAL = Task.status == literal_column("'PENDING'")  # matches the rank indexes' WHERE
+
+def _julian_day(moment: datetime) -> float:
+    return (moment - datetime(1970, 1, 1)).total_seconds() / 86400 + 2440587.5
+
+def task_score(rank: float, now: datetime = None) -> float:
+    """The score of a task of ``rank`` at ``now``."""
+    if rank is None:
+        return None
+    return rank + (RANK_URGENCY_PER_DAY + RANK_AGE_PER_DAY) * _julian_day(now or datetime.utcnow())
+
+def next_tasks(db: Session, limit: int = 10, user_id: int = None, now: datetime = None) -> list:
+    """``[(task, score)]`` for the ``limit`` pending tasks to work on first,
+    highest score first."""
+    query = db.query(Task).filter(PENDING_LITERAL)
+    if user_id:
+        query = query.filter(Task.user_id == user_id)
+    tasks = query.order_by(Task.rank.desc(), Task.id.desc()).limit(limit).all()
+    # Tasks without a creation date have no rank and sort last.
+    tasks = merge_shard_results(db, tasks, lambda task: (task.rank is None, -(task.rank or 0.0), -task.id), limit)
+    return [(task, task_score(task.rank, now)) for task in tasks]
+
+def rebuild_task_rank(db: Session):
+    """Redefine tasks.rank with the current RANK_* settings and rebuild its
+    indexes, on every shard. SQLite cannot alter a generated column, so it
+    is dropped and added again."""
+    db.commit()
+    router = _router(db)
+    engines = list(router.engines.values()) if router else [db.get_bind()]
+    indexes = [index for index in Task.__table__.indexes if "rank" in index.columns]
+    for engine in engines:
+        with engine.begin() as connection:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            for index in indexes:
+                index.drop(connection, checkfirst=True)
+            connection.exec_driver_sql("ALTER TABLE tasks DROP COLUMN rank")
+            connection.exec_driver_sql(f"ALTER TABLE tasks ADD COLUMN rank FLOAT GENERATED ALWAYS AS "
+                                       f"({task_rank_sql()}) VIRTUAL")
+            for index in indexes:
+                index.create(connection)
+
+# Recurring tasks (see models.TaskSeries). Occurrences are claimed by moving
+# the series' next_index on with a conditional UPDATE, so processes that
+# materialize the same series at once never create an occurrence twice.
+def create_task_series(db: Session, title: str, description: str, starts_at: datetime, priority: Priority,
+                       frequency: str, interval: int = 1, until: datetime = None, count: int = None,
+                       category_id: int = None, user_id: int = None, now: datetime = None) -> TaskSeries:
+    """Store a recurring task and materialize its occurrences within the
+    look-ahead window, or at least the first one."""
+    if interval < 1:
+        raise ValueError("The interval must be at least 1")
+    if count is not None and count < 1:
+        raise ValueError("The count must be at least 1")
+    if until is not None and until < starts_at:
+        raise ValueError("The series would end before its first occurrence")
+    series = TaskSeries(title=title, description=description, priority=priority, category_id=category_id,
+                        user_id=user_id, frequency=frequency, interval=interval, starts_at=starts_at,
+                        until=until, count=count, next_index=0, next_due=starts_at)
+    db.add(series)
+    db.flush()
+    if not _materialize_series(db, series, _window_end(now)):
+        _materialize_series(db, series)
+    db.commit()
+    db.refresh(series)
+    return series
+
+def get_task_series(db: Session, series_id: int):
+    return db.get(TaskSeries, series_id)
+
+def get_task_series_list(db: Session, skip: int = 0, limit: int = 100, user_id: int = None):
+    query = db.query(TaskSeries)
+    if user_id:
+        query = query.filter(TaskSeries.user_id == user_id)
+    return query.order_by(TaskSeries.id).offset(skip).limit(limit).all()
+
+def delete_task_series(db: Session, series_id: int):
+    """End a series: its pending occurrences are deleted, completed ones kept."""
+    series = db.get(TaskSeries, series_id)
+    if series:
+        db.execute(delete(Task).where(Task.series_id == series_id, Task.status != Status.COMPLETED),
+                   execution_options={"synchronize_session": False})
+        # Shards cannot enforce the foreign key's ON DELETE SET NULL.
+        db.execute(update(Task).where(Task.series_id == series_id).values(series_id=None),
+                   execution_options={"synchronize_session": False})
+        db.delete(series)
+        db.commit()
+    return series
+
+def _window_end(now: datetime = None, window_days: float = None) -> datetime:
+    days = RECURRENCE_WINDOW_DAYS if window_days is None else window_days
+    return (now or datetime.utcnow()) + timedelta(days=days)
+
+def _materialize_series(db: Session, series, through: datetime = None) -> int:
+    """Create the occurrences of ``series`` (a TaskSeries or a row of one)
+    due by ``through``, or only the next one when ``through`` is None.
+    Returns how many were created; none when another writer got there first."""
+    index, due, created = series.next_index, series.next_due, 0
+    while due is not None and (due <= through if through is not None else not created):
+        following = occurrence(series, index + 1)
+        claimed = db.execute(
+            update(TaskSeries).where(TaskSeries.id == series.id, TaskSeries.next_index == index)
+            .values(next_index=index + 1, next_due=following),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+        if not claimed:
+            break
+        db.add(Task(title=series.title, description=series.description, due_date=due, priority=series.priority,
+                    category_id=series.category_id, user_id=series.user_id, status=Status.PENDING,
+                    series_id=series.id))
+        index, due, created = index + 1, following, created + 1
+    db.flush()
+    return created
+
+def _advance_series(db: Session, series_ids: Iterable[int]):
+    """After occurrences were completed: give each series that has no pending
+    occurrence left its next one, however far off that is."""
+    series_ids = list(series_ids)
+    if not series_ids:
+        return
+    pending = set(db.execute(
+        select(Task.series_id).where(Task.series_id.in_(series_ids), Task.status != Status.COMPLETED).distinct()
+    ).scalars())
+    for series in db.execute(select(TaskSeries.__table__).where(
+            TaskSeries.id.in_([series_id for series_id in series_ids if series_id not in pending]),
+            TaskSeries.next_due.is_not(None))):
+        _materialize_series(db, series)
+
+def materialize_occurrences(db: Session, now: datetime = None, window_days: float = None) -> int:
+    """Create every occurrence due within the look-ahead window; returns how
+    many. When nothing is due this is one index probe on task_series."""
+    through = _window_end(now, window_days)
+    due = db.execute(select(TaskSeries.__table__).where(TaskSeries.next_due <= through)).all()
+    created = sum(_materialize_series(db, series, through) for series in due)
+    db.commit()
+    return created
+
+def series_occurrences(db: Session, series_id: int, through: datetime) -> list:
+    """``(due_date, task)`` for each occurrence of a series up to ``through``:
+    the materialized ones with their task, the rest computed from the rule
+    with None. A year of a daily series needs only the window's rows."""
+    series = db.get(TaskSeries, series_id)
+    if series is None:
+        return None
+    stored = db.query(Task).filter(Task.series_id == series_id, Task.due_date <= through).all()
+    rows = sorted(((task.due_date, task) for task in stored), key=lambda row: (row[0], row[1].id))
+    rows += [(due, None) for _, due in occurrences(series, series.next_index, through)]
+    return rows
+
+# Full-text search (see TASKS_FTS_DDL in models.py)
+tasks_fts = table("tasks_fts", column("rowid"))
+
+# bm25() weights per FTS column: a hit in the title counts ten times one in
+# the description.
+SEARCH_WEIGHTS = (10.0, 1.0)
+
+def fts_query(text: str, prefix: bool = True) -> str:
+    """Turn free text into an FTS5 query: every word must match, as a prefix
+    unless ``prefix`` is False. Quoting each word keeps FTS syntax characters
+    in user input from being interpreted."""
+    terms = [word.replace('"', '""') for word in text.split()]
+    suffix = "*" if prefix else ""
+    return " ".join(f'"{term}"{suffix}' for term in terms)
+
+def search_tasks(db: Session, query: str, status: str = None, user_id: int = None,
+                 limit: int = 20, prefix: bool = True, raw: bool = False):
+    """Return ``[(task, score)]`` best match first; lower scores are better.
+
+    With ``raw`` the query is passed to FTS5 unchanged (phrases, OR, NEAR,
+    column filters...).
+    """
+    match = query if raw else fts_query(query, prefix)
+    if not match.strip():
+        return []
+    fts = literal_column("tasks_fts")
+    score = func.bm25(fts, *SEARCH_WEIGHTS).label("score")
+    stmt = (
+        select(Task, score)
+        .join(tasks_fts, tasks_fts.c.rowid == Task.id)
+        .where(fts.op("MATCH")(match))
+        .options(joinedload(Task.category))
+        .order_by(score)
+        .limit(limit)
+    )
+    if status:
+        stmt = stmt.where(Task.status == status)
+    if user_id:
+        stmt = stmt.where(Task.user_id == user_id)
+    try:
+        results = [(task, score) for task, score in db.execute(stmt)]
+    except OperationalError as exc:
+        db.rollback()
+        raise ValueError(f"Invalid search query {query!r}: {exc.orig}")
+    if _router(db):
+        # Each shard sends its own best matches. bm25 ranks against each
+        # shard's own statistics, so their scores are only roughly comparable.
+        results = sorted(results, key=itemgetter(1))[:limit]
+    return results
+
+# Task statistics
+STATS_DIMENSIONS = ("status", "priority", "category", "user", "overdue")
+STATS_DATE_FIELDS = {"created": Task.created_at, "due": Task.due_date}
+OVERDUE_BUCKETS = (
+    "overdue > 7 days", "overdue", "due within 7 days", "due later", "no due date", "completed",
+)
+
+def _overdue_bucket(now: datetime):
+    return case(
+        (Task.status == Status.COMPLETED, "completed"),
+        (Task.due_date.is_(None), "no due date"),
+        (Task.due_date < now - timedelta(days=7), "overdue > 7 days"),
+        (Task.due_date < now, "overdue"),
+        (Task.due_date < now + timedelta(days=7), "due within 7 days"),
+        else_="due later",
+    )
+
+def _unindexed(expression):
+    """``+expression``: the same value, but SQLite will not use an index for it."""
+    return UnaryExpression(expression, operator=custom_op("+"), type_=expression.type)
+
+def task_stats(db: Session, group_by: Iterable[str] = ("status",), user_id: int = None,
+               since: datetime = None, until: datetime = None, date_field: str = "created",
+               now: datetime = None, use_summary: bool = True) -> list:
+    """Count tasks grouped by one or more of ``STATS_DIMENSIONS``.
+
+    Counts by status, priority, category and user are read from the
+    ``task_counts`` summary table, whose size does not depend on the number
+    of tasks. Overdue buckets, date windows and ``use_summary=False`` run a
+    single GROUP BY over ``tasks`` instead. Category and user ids are
+    labelled afterwards rather than joined. ``since``/``until`` bound
+    ``date_field`` ("created" or "due") to the half-open window
+    ``[since, until)``. Returns a list of dicts, one per group, each with a
+    ``count``.
+    """
+    group_by = list(dict.fromkeys(group_by))
+    unknown = [dimension for dimension in group_by if dimension not in STATS_DIMENSIONS]
+    if not group_by or unknown:
+        raise ValueError(f"Cannot group by {unknown or 'nothing'}, expected some of {STATS_DIMENSIONS}")
+    if date_field not in STATS_DATE_FIELDS:
+        raise ValueError(f"Unknown date field '{date_field}', expected one of {tuple(STATS_DATE_FIELDS)}")
+
+    if use_summary and not (since or until) and "overdue" not in group_by:
+        rows = _summary_stats(db, group_by, user_id)
+    else:
+        rows = _scanned_stats(db, group_by, user_id, since, until, date_field, now)
+
+    if "category" in group_by:
+        names = get_category_names(db)
+        for row in rows:
+            row["category"] = names.get(row["category"])
+    if "user" in group_by:
+        user_ids = {row["user"] for row in rows} - {None}
+        usernames = dict(db.execute(select(User.id, User.username).where(User.id.in_(user_ids))).all())
+        for row in rows:
+            row["user"] = usernames.get(row["user"])
+    for row in rows:
+        for dimension in ("status", "priority"):
+            if row.get(dimension) is not None:
+                row[dimension] = row[dimension].value
+
+    def order(row):
+        return tuple(
+            OVERDUE_BUCKETS.index(row[dimension]) if dimension == "overdue"
+            else (row[dimension] is None, str(row[dimension]))
+            for dimension in group_by
+        )
+    return sorted(rows, key=order)
+
+def _scanned_stats(db: Session, group_by: list, user_id: int, since: datetime, until: datetime,
+                   date_field: str, now: datetime) -> list:
+    expressions = {
+        "status": Task.status,
+        "priority": Task.priority,
+        "category": Task.category_id,
+        "user": Task.user_id,
+        "overdue": _overdue_bucket(now or datetime.utcnow()),
+    }
+    date_column = STATS_DATE_FIELDS[date_field]
+    if (since or until) and not user_id:
+        # SQLite has no range statistics, so with a date window it would walk
+        # a grouping index and fetch most rows one by one, several times
+        # slower than reading the table once.
+        expressions = {dimension: _unindexed(expression) for dimension, expression in expressions.items()}
+        date_column = _unindexed(date_column)
+    columns = [expressions[dimension].label(dimension) for dimension in group_by]
+    stmt = select(*columns, func.count().label("count")).group_by(*columns)
+    if user_id:
+        stmt = stmt.where(Task.user_id == user_id)
+    if since:
+        stmt = stmt.where(date_column >= since)
+    if until:
+        stmt = stmt.where(date_column < until)
+    return _sum_groups([dict(row._mapping) for row in db.execute(stmt)])
+
+def _sum_groups(rows: list) -> list:
+    """Add up the counts of equal groups; a sharded session returns each
+    shard's groups separately."""
+    totals = {}
+    for row in rows:
+        key = tuple((name, value) for name, value in row.items() if name != "count")
+        totals[key] = totals.get(key, 0) + row["count"]
+    return [dict(key, count=count) for key, count in totals.items()]
+
+def _summary_stats(db: Session, group_by: list, user_id: int) -> list:
+    columns = {
+        "status": TaskCount.status,
+        "priority": TaskCount.priority,
+        "category": TaskCount.category_id,
+        "user": TaskCount.user_id,
+    }
+    selected = [columns[dimension].label(dimension) for dimension in group_by]
+    stmt = select(*selected, func.sum(TaskCount.count).label("count")).group_by(*selected)
+    if user_id:
+        stmt = stmt.where(TaskCount.user_id == user_id)
+    elif "user" in group_by:
+        stmt = stmt.where(TaskCount.user_id != ALL_USERS)
+    else:
+        stmt = stmt.where(TaskCount.user_id == ALL_USERS)
+    rows = _sum_groups([dict(row._mapping) for row in db.execute(stmt)])
+    # Undo the summary table's stand-ins for NULL.
+    for row in rows:
+        if "status" in row:
+            row["status"] = Status[row["status"]]
+        if "priority" in row:
+            row["priority"] = Priority[row["priority"]] if row["priority"] else None
+        for dimension in ("category", "user"):
+            if dimension in row:
+                row[dimension] = row[dimension] or None
+    return rows
+
+def _task_count_rows():
+    """``tasks`` grouped the way ``task_counts`` stores them."""
+    rest = (
+        func.coalesce(Task.category_id, literal_column("0")).label("category_id"),
+        type_coerce(Task.status, String).label("status"),
+        func.coalesce(type_coerce(Task.priority, String), literal_column("''")).label("priority"),
+    )
+    per_user = (func.coalesce(Task.user_id, literal_column("0")).label("user_id"),) + rest
+    all_users = (literal_column(str(ALL_USERS)).label("user_id"),) + rest
+    return union_all(
+        select(*per_user, func.count().label("count")).group_by(*per_user),
+        select(*all_users, func.count().label("count")).group_by(*rest),
+    )
+
+def rebuild_task_counts(db: Session) -> int:
+    """Recompute ``task_counts`` from ``tasks``; returns the number of rows."""
+    try:
+        db.execute(delete(TaskCount))
+        db.execute(insert(TaskCount).from_select(
+            ["user_id", "category_id", "status", "priority", "count"], _task_count_rows()))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return sum(db.execute(select(func.count()).select_from(TaskCount)).scalars())
+
+def check_task_counts(db: Session) -> list:
+    """Compare ``task_counts`` with a fresh count of ``tasks``.
+
+    Returns one dict per disagreeing group with the ``expected`` and
+    ``actual`` counts; an empty list means the summary is consistent.
+    """
+    def counts(rows):
+        totals = {}
+        for row in rows:
+            key = (row.user_id, row.category_id, row.status, row.priority)
+            totals[key] = totals.get(key, 0) + row.count
+        return totals
+
+    expected = counts(db.execute(_task_count_rows()))
+    actual = counts(db.execute(select(
+        TaskCount.user_id, TaskCount.category_id, TaskCount.status, TaskCount.priority, TaskCount.count)))
+    return [
+        {"user_id": key[0], "category_id": key[1], "status": key[2], "priority": key[3],
+         "expected": expected.get(key, 0), "actual": actual.get(key, 0)}
+        for key in sorted(expected.keys() | actual.keys())
+        if expected.get(key, 0) != actual.get(key, 0)
+    ]
+
+# Bulk task import/export
+TASK_IMPORT_FIELDS = (
+    "title", "description", "due_date", "priority", "status",
+    "category_id", "user_id", "created_at", "reminder_sent",
+)
+
+def _batched(rows: Iterable[dict], size: int) -> Iterator[list]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def _task_row(row: dict, now: datetime) -> dict:
+    # executemany needs every row to carry the same keys, so fill in the
+    # column defaults explicitly instead of relying on the ORM.
+    values = {field: row.get(field) for field in TASK_IMPORT_FIELDS}
+    if not values["title"]:
+        raise ValueError(f"Task row is missing a title: {row!r}")
+    if values["priority"] is not None:
+        values["priority"] = Priority(values["priority"])
+    values["status"] = Status(values["status"]) if values["status"] else Status.PENDING
+    values["created_at"] = values["created_at"] or now
+    values["reminder_sent"] = bool(values["reminder_sent"])
+    return values
+
+def _resolve_category_names(db: Session, batch: list, category_ids: dict):
+    """Replace ``category`` names in ``batch`` with ``category_id`` values.
+
+    ``category_ids`` is a name -> id cache shared across batches; names that
+    are not cached are looked up in one query and missing ones are created.
+    Returns the number of categories created.
+    """
+    created = []
+    names = {row["category"] for row in batch if row.get("category")}
+    unknown = names - category_ids.keys()
+    if unknown:
+        found = db.execute(
+            select(Category.name, Category.id).where(Category.name.in_(unknown))
+        ).all()
+        category_ids.update(found)
+        missing = unknown - category_ids.keys()
+        if missing:
+            created = db.execute(
+                insert(Category).returning(Category.name, Category.id),
+                [{"name": name} for name in sorted(missing)],
+            ).all()
+            category_ids.update(created)
+    for row in batch:
+        if row.get("category"):
+            row["category_id"] = category_ids[row["category"]]
+    return len(created)
+
+def bulk_create_tasks(db: Session, rows: Iterable[dict], batch_size: int = 1000) -> int:
+    """Insert tasks from an iterable of dicts, one transaction per batch.
+
+    Rows use the ``Task`` column names; a ``category`` key holding a category
+    name may be given instead of ``category_id``. Returns the number of rows
+    inserted.
+    """
+    category_ids = {}
+    total = 0
+    for batch in _batched(rows, batch_size):
+        now = datetime.utcnow()
+        try:
+            new_categories = _resolve_category_names(db, batch, category_ids)
+            _insert_tasks(db, [_task_row(row, now) for row in batch])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        if new_categories:
+            lookup_cache.invalidate("category")
+        total += len(batch)
+    return total
+
+def _insert_tasks(db: Session, rows: list):
+    router = _router(db)
+    if router is None:
+        db.execute(insert(Task), rows)
+        return
+    by_shard = {}
+    for row in rows:
+        by_shard.setdefault(router.shard_for_user(row["user_id"]), []).append(row)
+    for shard, shard_rows in by_shard.items():
+        # The ORM's bulk insert cannot be routed, so go straight to the shard.
+        connection = db.connection(bind_arguments={"shard_id": shard})
+        ids = allocate_task_ids(connection, len(shard_rows))
+        connection.execute(insert(Task.__table__), [dict(row, id=task_id) for row, task_id in zip(shard_rows, ids)])
+
+def iter_tasks(db: Session, batch_size: int = 1000, status: str = None, user_id: int = None):
+    """Stream task rows (with the category name) ordered by id."""
+    stmt = (
+        select(
+            Task.id, Task.title, Task.description, Task.due_date, Task.priority,
+            Task.status, Category.name.label("category"), Task.user_id,
+            Task.created_at, Task.reminder_sent,
+        )
+        .outerjoin(Category, Task.category_id == Category.id)
+        .order_by(Task.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if status:
+        stmt = stmt.where(Task.status == status)
+    if user_id:
+        stmt = stmt.where(Task.user_id == user_id)
+    for row in _iter_merged(db, stmt, attrgetter("id"), user_id):
+        yield row._mapping
+
+# Category and user lookups are served from an in-process cache; every
+# write below that could change a cached answer invalidates its namespace.
+lookup_cache = LookupCache(LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL)
+
+def _clear_lookup_cache(*args, **kwargs):
+    lookup_cache.clear()
+    session_cache.clear()
+
+# Recreated tables reuse ids, so nothing cached before can be trusted.
+event.listen(Base.metadata, "after_create", _clear_lookup_cache)
+event.listen(Base.metadata, "after_drop", _clear_lookup_cache)
+
+def _row_values(obj) -> dict:
+    # Generated columns (tasks.rank) are SQLite's to fill in.
+    return {attr.key: getattr(obj, attr.key) for attr in obj.__mapper__.column_attrs
+            if attr.columns[0].computed is None}
+
+def _from_cache(db: Session, model, values: dict):
+    """An instance of ``db`` for cached ``values``, without a query."""
+    obj = model(**values)
+    make_transient_to_detached(obj)
+    return db.merge(obj, load=False)
+
+def _cached_one(db: Session, key: tuple, model, query):
+    values = lookup_cache.get((key[0], db.get_bind()) + key[1:], lambda: _first_values(query))
+    return _from_cache(db, model, values) if values is not None else None
+
+def _first_values(query):
+    obj = query.first()
+    return _row_values(obj) if obj is not None else None
+
 # Category CRUD operations
 def create_category(db: Session, name: str):
     category = Category(name=name)
     db.add(category)
     db.commit()
+    lookup_cache.invalidate("category")
     db.refresh(category)
     return category
 
 def get_category(db: Session, category_id: int):
-    return db.query(Category).filter(Category.id == category_id).first()
+    query = db.query(Category).filter(Category.id == category_id)
+    return _cached_one(db, ("category", category_id), Category, query)
 
 def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Category).offset(skip).limit(limit).all()
+    query = db.query(Category).offset(skip).limit(limit)
+    rows = lookup_cache.get(("category", db.get_bind(), "list", skip, limit),
+                            lambda: [_row_values(category) for category in query])
+    return [_from_cache(db, Category, values) for values in rows]
+
+def get_category_names(db: Session) -> dict:
+    """Every category name keyed by id, for labelling tasks without a join."""
+    return lookup_cache.get(("category", db.get_bind(), "names"),
+                            lambda: dict(db.execute(select(Category.id, Category.name)).all()))
 
 def update_category(db: Session, category_id: int, name: str):
     category = db.query(Category).filter(Category.id == category_id).first()
     if category:
         category.name = name
         db.commit()
+        lookup_cache.invalidate("category")
         db.refresh(category)
     return category
 
@@ -73,13 +919,20 @@ def delete_category(db: Session, category_id: int):
     if category:
         db.delete(category)
         db.commit()
+        lookup_cache.invalidate("category")
     return category
 
 # User CRUD operations
 def create_user(db: Session, username: str, password_hash: str):
     user = User(username=username, password_hash=password_hash)
     db.add(user)
+    router = _router(db)
+    if router:
+        db.flush()
+        db.add(UserShard(user_id=user.id, shard=router.default_shard(user.id)))
     db.commit()
+    if router:
+        router.directory.invalidate("shard")
     db.refresh(user)
     return user
 
@@ -87,7 +940,8 @@ def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 def get_user_by_username(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+    query = db.query(User).filter(User.username == username)
+    return _cached_one(db, ("user", username), User, query)
 
 def update_user(db: Session, user_id: int, **kwargs):
     user = db.query(User).filter(User.id == user_id).first()
@@ -95,6 +949,7 @@ def update_user(db: Session, user_id: int, **kwargs):
         for key, value in kwargs.items():
             setattr(user, key, value)
         db.commit()
+        lookup_cache.invalidate("user")
         db.refresh(user)
     return user
 
@@ -103,4 +958,140 @@ def delete_user(db: Session, user_id: int):
     if user:
         db.delete(user)
         db.commit()
+        lookup_cache.invalidate("user")
+        session_cache.invalidate("session")
+        if _router(db):
+            _router(db).directory.invalidate("shard")
     return user
+
+# Session tokens. Tokens are 256 random bits, so a plain SHA-256 is enough to
+# keep the stored form useless to a reader, and checking one is a cache hit
+# or a primary-key lookup rather than a password hash.
+session_cache = LookupCache(SESSION_CACHE_SIZE, SESSION_CACHE_TTL)
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def create_session(db: Session, user_id: int, ttl: float = SESSION_TOKEN_TTL, now: datetime = None) -> tuple:
+    """Start a session for ``user_id``; returns ``(token, expires_at)``."""
+    token = secrets.token_urlsafe(32)
+    now = now or datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    db.add(SessionToken(token_hash=_token_hash(token), user_id=user_id, created_at=now, expires_at=expires_at))
+    db.commit()
+    return token, expires_at
+
+def _session_row(db: Session, token_hash: str):
+    row = db.execute(select(SessionToken.user_id, SessionToken.expires_at)
+                     .where(SessionToken.token_hash == token_hash)).first()
+    return tuple(row) if row else None
+
+def validate_session(db: Session, token: str, now: datetime = None):
+    """The id of the user ``token`` belongs to, or None if it is unknown or expired."""
+    token_hash = _token_hash(token)
+    session = session_cache.get(("session", db.get_bind(), token_hash), lambda: _session_row(db, token_hash))
+    if session is None or session[1] <= (now or datetime.utcnow()):
+        return None
+    return session[0]
+
+def revoke_session(db: Session, token: str) -> bool:
+    result = db.execute(delete(SessionToken).where(SessionToken.token_hash == _token_hash(token)))
+    db.commit()
+    session_cache.invalidate("session")
+    return result.rowcount > 0
+
+def revoke_user_sessions(db: Session, user_id: int) -> int:
+    result = db.execute(delete(SessionToken).where(SessionToken.user_id == user_id))
+    db.commit()
+    session_cache.invalidate("session")
+    return result.rowcount
+
+def purge_expired_sessions(db: Session, now: datetime = None, batch_size: int = 1000) -> int:
+    """Delete expired sessions, one transaction per ``batch_size`` rows so the
+    write lock is never held for long; returns the number deleted.
+
+    Cached validations need no invalidation: they check the expiry themselves.
+    """
+    now = now or datetime.utcnow()
+    expired = (select(SessionToken.token_hash).where(SessionToken.expires_at <= now)
+               .limit(batch_size).scalar_subquery())
+    total = 0
+    while True:
+        deleted = db.execute(delete(SessionToken).where(SessionToken.token_hash.in_(expired))).rowcount
+        db.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+# Moving users between shards
+def rebalance_targets(db: Session) -> dict:
+    """``{user_id: shard}`` for every user not on its default shard."""
+    router = _router(db)
+    if router is None:
+        raise ValueError("Sharding is off; set SHARD_COUNT above 1")
+    placed = dict(db.execute(select(UserShard.user_id, UserShard.shard)).all())
+    user_ids = db.execute(select(User.id).order_by(User.id)).scalars()
+    return {user_id: router.default_shard(user_id) for user_id in user_ids
+            if placed.get(user_id, 0) != router.default_shard(user_id)}
+
+def reshard_users(db: Session, targets: dict, batch_size: int = 500, settle: float = None,
+                  sleep=time.sleep) -> dict:
+    """Move each user's tasks to the shard ``targets`` names, online.
+
+    The directory first marks the users as moving, which sends their new
+    tasks to the new shard and their reads to both. Once ``settle`` seconds
+    (by default the directory cache TTL) have passed, no process still writes
+    to the old shard, and the tasks are moved in batches: each batch is
+    deleted from the old shard and inserted into the new one with its ids
+    unchanged, the old shard's transaction committing only after the new
+    one's, so an update racing the move fails rather than being lost. A move
+    that was interrupted is finished by running it again. Returns
+    ``{user_id: tasks moved}``.
+    """
+    router = _router(db)
+    if router is None:
+        raise ValueError("Sharding is off; set SHARD_COUNT above 1")
+    entries = {}
+    for user_id, shard in targets.items():
+        if shard not in router.engines:
+            raise ValueError(f"No shard {shard}; shards are 0-{router.count - 1}")
+        if db.get(User, user_id) is None:
+            raise ValueError(f"User {user_id} not found")
+        entry = db.get(UserShard, user_id)
+        if entry is None:
+            entry = UserShard(user_id=user_id, shard=0)
+            db.add(entry)
+        if entry.moving_from is None and entry.shard != shard:
+            entry.moving_from, entry.shard = entry.shard, shard
+        elif entry.moving_from is not None and entry.shard != shard:
+            raise ValueError(f"User {user_id} is still moving to shard {entry.shard}; finish that move first")
+        if entry.moving_from is not None:
+            entries[user_id] = (entry.moving_from, shard)
+    db.commit()
+    router.directory.invalidate("shard")
+    if entries:
+        sleep(router.directory.ttl if settle is None else settle)
+
+    moved = {}
+    table = Task.__table__
+    for user_id, (source, shard) in entries.items():
+        moved[user_id] = 0
+        with router.engines[source].connect() as src, router.engines[shard].connect() as dst:
+            while True:
+                picked = select(table.c.id).where(table.c.user_id == user_id).limit(batch_size).scalar_subquery()
+                columns = [column for column in table.c if column.computed is None]
+                rows = [dict(row) for row in
+                        src.execute(delete(table).where(table.c.id.in_(picked)).returning(*columns)).mappings()]
+                if not rows:
+                    src.rollback()
+                    break
+                # Rows an interrupted move already copied are replaced.
+                dst.execute(delete(table).where(table.c.id.in_([row["id"] for row in rows])))
+                dst.execute(insert(table), rows)
+                dst.commit()
+                src.commit()
+                moved[user_id] += len(rows)
+        db.get(UserShard, user_id).moving_from = None
+        db.commit()
+        router.directory.invalidate("shard")
+    return moved
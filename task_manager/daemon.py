@@ -0,0 +1,163 @@
+"""Long-running CLI daemon (``task-manager serve``).
+
+Keeps the engine, session factory and model metadata loaded and answers
+commands from ``task_manager.client`` over a Unix domain socket. ``task add``
+requests, and operations sent by a ``write_queue.RemoteWriteQueue``, go
+through one ``WriteQueue``, so writes that arrive together are committed in
+a single transaction; every other command runs through the normal Typer app
+with its output captured.
+"""
+import contextlib
+import io
+import os
+import socketserver
+import threading
+import traceback
+from datetime import datetime
+
+import typer
+
+from .client import FORWARDED_ENV, decode, encode
+from .write_queue import WriteQueue, load_arguments
+
+try:
+    from click.exceptions import ClickException
+except ImportError:  # typer 0.20+ ships its own copy of click
+    from typer._click.exceptions import ClickException
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _Output(io.StringIO):
+    """Captured command output that is a terminal when the client's is, so
+    commands pick the same format (`task list`: table or tsv) as run locally."""
+
+    def __init__(self, isatty: bool):
+        super().__init__()
+        self._isatty = isatty
+
+    def isatty(self) -> bool:
+        return self._isatty
+
+
+@contextlib.contextmanager
+def _environment(env: dict):
+    """Set FORWARDED_ENV to ``env`` for the duration, unsetting the rest, so
+    options never fall back to the daemon's own environment."""
+    saved = {name: os.environ.pop(name, None) for name in FORWARDED_ENV}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+
+
+class TaskManagerDaemon:
+    def __init__(self, socket_path: str, max_batch: int = 256, max_wait: float = 0.002):
+        # Import everything a command could need up front; that is the point.
+        from . import crud, models  # noqa: F401
+        from .cli import app
+        from .commands import task_commands
+        from .database import SessionLocal, engine
+
+        self.socket_path = socket_path
+        self.app = app
+        self.add_command = typer.main.get_command(task_commands.app).commands["add"]
+        engine.connect().close()
+        self.committer = WriteQueue(SessionLocal, max_batch=max_batch, max_wait=max_wait)
+        # redirect_stdout is process-wide, so captured commands run one at a time.
+        self._cli_lock = threading.Lock()
+        self.server = None
+
+    def handle(self, argv: list, env: dict = None, isatty: bool = False) -> dict:
+        """Run one command for a client, with the client's ``env`` (names
+        from FORWARDED_ENV) in place of the daemon's own, and output that is
+        a terminal if the client's is."""
+        env = {name: value for name, value in (env or {}).items() if name in FORWARDED_ENV}
+        if argv[:2] == ["task", "add"] and not env:
+            values = self._parse_add(argv[2:])
+            if values is not None:
+                task_id = self.committer.submit("create_task", **values)
+                return {"exit_code": 0, "output": f"Task created with ID: {task_id}\n"}
+        return self._run_cli(argv, env, isatty)
+
+    def write(self, operation: str, kwargs: dict) -> dict:
+        try:
+            return {"result": self.committer.submit(operation, **load_arguments(kwargs))}
+        except Exception as exc:
+            return {"error": f"{type(exc).__name__}: {exc}"}
+
+    def _parse_add(self, args: list):
+        """Parse ``task add`` arguments into Task columns, or None to let the
+        regular command handle them (and report any usage error)."""
+        try:
+            with self.add_command.make_context("add", list(args)) as ctx:
+                params = dict(ctx.params)
+        except (ClickException, typer.Exit):
+            return None
+        if params.pop("token") is not None:
+            # Resolving a session token needs the database; leave it to the command.
+            return None
+        if params.pop("repeat") is not None:
+            # A recurring task is a series, not a row the queue can insert.
+            return None
+        for name in ("every", "until", "count"):
+            params.pop(name)
+        due_date = params.pop("due_date")
+        try:
+            params["due_date"] = datetime.strptime(due_date, "%Y-%m-%d") if due_date else None
+        except ValueError:
+            return None
+        return params
+
+    def _run_cli(self, argv: list, env: dict = None, isatty: bool = False) -> dict:
+        output = _Output(isatty)
+        exit_code = 0
+        with self._cli_lock, _environment(env or {}), contextlib.redirect_stdout(output), \
+                contextlib.redirect_stderr(output):
+            try:
+                self.app(list(argv), prog_name="task-manager", standalone_mode=True)
+            except SystemExit as exc:
+                exit_code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+        return {"exit_code": exit_code, "output": output.getvalue()}
+
+    def serve_forever(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        message = decode(line)
+                        if "write" in message:
+                            reply = daemon.write(message["write"], message.get("kwargs", {}))
+                        else:
+                            reply = daemon.handle(message["argv"], message.get("env"), message.get("isatty", False))
+                    except Exception as exc:
+                        reply = {"exit_code": 1, "output": f"daemon error: {exc}\n"}
+                    self.wfile.write(encode(reply))
+                    self.wfile.flush()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = _UnixServer(self.socket_path, Handler)
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self.committer.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        if self.server:
+            self.server.shutdown()
@@ -1,11 +1,290 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-from .config import SQLALCHEMY_DATABASE_URI
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+from sqlalchemy.sql.util import find_tables
 
-engine = create_engine(SQLALCHEMY_DATABASE_URI, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from .cache import LookupCache
+from .config import (
+    SQLALCHEMY_DATABASE_URI, DB_ECHO, DB_PERFORMANCE_PROFILE, SQLITE_PRAGMAS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, SLOW_QUERY_MS, SHARD_COUNT, SHARD_DIRECTORY_TTL, SHARD_FANOUT_THREADS
+)
+
+# Pragmas that only make sense for a database backed by a file.
+FILE_ONLY_PRAGMAS = ("journal_mode", "mmap_size")
+
+def is_memory_url(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def set_sqlite_pragmas(engine, pragmas: dict):
+    """Run ``PRAGMA name=value`` for each entry on every new connection."""
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URI, profile: bool = DB_PERFORMANCE_PROFILE,
+                     echo: bool = DB_ECHO, pragmas: dict = None):
+    """Build an engine with a pool suited to the database and the tuning profile.
+
+    An in-memory database only exists inside its one connection, so it gets a
+    StaticPool shared across threads; file databases get a QueuePool.
+    """
+    pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+    if is_memory_url(url):
+        engine = create_engine(url, echo=echo, poolclass=StaticPool,
+                               connect_args={"check_same_thread": False})
+        for name in FILE_ONLY_PRAGMAS:
+            pragmas.pop(name, None)
+    else:
+        engine = create_engine(url, echo=echo, poolclass=QueuePool,
+                               pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    if profile and pragmas:
+        set_sqlite_pragmas(engine, pragmas)
+    if SLOW_QUERY_MS > 0:
+        from .instrumentation import instrument_engine
+        instrument_engine(engine, slow_ms=SLOW_QUERY_MS)
+    return engine
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URI, profile: bool = DB_PERFORMANCE_PROFILE,
+                           echo: bool = DB_ECHO, pragmas: dict = None):
+    """The asyncio counterpart of ``create_db_engine``, over aiosqlite.
+
+    ``url`` may name the plain sqlite driver; the same pools and pragmas
+    apply. Needs the aiosqlite and greenlet packages.
+    """
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+    memory = is_memory_url(str(url))
+    url = make_url(url).set(drivername="sqlite+aiosqlite")
+    if memory:
+        engine = create_async_engine(url, echo=echo, poolclass=StaticPool)
+        for name in FILE_ONLY_PRAGMAS:
+            pragmas.pop(name, None)
+    else:
+        engine = create_async_engine(url, echo=echo, poolclass=AsyncAdaptedQueuePool,
+                                     pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    if profile and pragmas:
+        set_sqlite_pragmas(engine.sync_engine, pragmas)
+    if SLOW_QUERY_MS > 0:
+        from .instrumentation import instrument_engine
+        instrument_engine(engine.sync_engine, slow_ms=SLOW_QUERY_MS)
+    return engine
+
+# Shards allocate task ids from disjoint ranges, shard k from k * SHARD_ID_SPAN
+# up, so ids stay unique when tasks move between shards.
+SHARD_ID_SPAN = 2 ** 40
+# Tables every shard has its own copy of; everything else is on shard 0.
+SHARDED_TABLES = ("tasks", "task_counts", "shard_sequence")
+
+def shard_path(path: str, shard: int) -> str:
+    """The file of ``shard`` for a main database at ``path`` (shard 0 is the
+    main database itself)."""
+    if shard == 0:
+        return path
+    path = Path(path)
+    return str(path.with_name(f"{path.stem}.shard{shard}{path.suffix}"))
+
+def allocate_task_ids(connection, count: int) -> range:
+    """Reserve ``count`` task ids on the shard ``connection`` is open on.
+
+    The sequence row is updated in the caller's transaction, so ids are
+    never handed out twice even by concurrent writers.
+    """
+    shard = connection.info["shard_id"]
+    next_id = connection.exec_driver_sql(
+        "UPDATE shard_sequence SET next_id = next_id + ? WHERE shard = ? RETURNING next_id", (count, shard)
+    ).scalar()
+    if next_id is None:
+        raise RuntimeError(f"Shard {shard} has no id sequence; run `task-manager init`")
+    return range(next_id - count, next_id)
+
+def _conjuncts(clauses):
+    for clause in clauses:
+        if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+            yield from _conjuncts(clause.clauses)
+        else:
+            yield clause
+
+def _user_id_criterion(statement):
+    """The value of a top-level ``tasks.user_id == value`` in ``statement``'s
+    WHERE clause, or None."""
+    for clause in _conjuncts(getattr(statement, "_where_criteria", ())):
+        if not isinstance(clause, BinaryExpression) or clause.operator is not operators.eq:
+            continue
+        for column, value in ((clause.left, clause.right), (clause.right, clause.left)):
+            if (getattr(column, "table", None) is not None and column.table.name == "tasks"
+                    and column.name == "user_id" and isinstance(value, BindParameter)):
+                return value.effective_value
+    return None
+
+class ShardRouter:
+    """Spreads tasks over several SQLite files, keyed by user.
+
+    Shard 0 is the main database and keeps everything that is not a task:
+    users, categories, sessions and the ``user_shards`` directory naming each
+    user's shard (shard 0 for users it does not list, and for tasks without a
+    user). Shards 1..N-1 hold tasks with their counts and search index, and
+    attach the main database, so joins from tasks to categories and users
+    work on every shard. Writers on different shards never wait for each
+    other.
+
+    ``session()`` opens a session that sends each statement to the shards it
+    concerns: statements on tasks filtered by one user to that user's shard,
+    other task statements to every shard, and everything else to shard 0.
+    """
+
+    def __init__(self, url: str = SQLALCHEMY_DATABASE_URI, count: int = SHARD_COUNT, engine=None,
+                 directory_ttl: float = SHARD_DIRECTORY_TTL, threads: int = SHARD_FANOUT_THREADS):
+        if is_memory_url(str(url)):
+            raise ValueError("Sharding needs a database file, not an in-memory database")
+        self.path = make_url(url).database
+        self.count = count
+        self.engines = {0: engine or create_db_engine(url)}
+        # Shards cannot enforce foreign keys to tables in the main database.
+        pragmas = dict(SQLITE_PRAGMAS, foreign_keys="OFF")
+        for shard in range(1, count):
+            self.engines[shard] = create_db_engine(f"sqlite:///{shard_path(self.path, shard)}", pragmas=pragmas)
+            event.listen(self.engines[shard], "connect", self._attach_main)
+        for shard, shard_engine in self.engines.items():
+            event.listen(shard_engine, "connect", self._tagger(shard))
+        self.directory = LookupCache(4096, directory_ttl)
+        self.threads = threads
+        self._executor = None
+
+    def _tagger(self, shard: int):
+        def tag(dbapi_connection, connection_record):
+            connection_record.info["shard_id"] = shard
+        return tag
+
+    def _attach_main(self, dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ? AS main_db", (self.path,))
+
+    # Placement
+    def default_shard(self, user_id: int) -> int:
+        """Where a new user's tasks go."""
+        return user_id % self.count
+
+    def placement(self, user_id: int) -> tuple:
+        """``(shard, moving_from)`` for a user, from the directory."""
+        def load():
+            with self.engines[0].connect() as connection:
+                row = connection.exec_driver_sql(
+                    "SELECT shard, moving_from FROM user_shards WHERE user_id = ?", (user_id,)).first()
+            return tuple(row) if row else (0, None)
+        return self.directory.get(("shard", user_id), load)
+
+    def shard_for_user(self, user_id: int) -> int:
+        """The shard new tasks of ``user_id`` are written to."""
+        return self.placement(user_id)[0] if user_id else 0
+
+    def shards_for_user(self, user_id: int) -> list:
+        """Every shard that may hold tasks of ``user_id``: two while it is being moved."""
+        shard, moving_from = self.placement(user_id) if user_id else (0, None)
+        return [shard] if moving_from is None else [shard, moving_from]
+
+    # ShardedSession hooks
+    def choose_shard(self, mapper, instance, clause=None, **kwargs):
+        if instance is not None and mapper.local_table.name == "tasks":
+            return self.shard_for_user(instance.user_id)
+        return 0
+
+    def choose_identity(self, mapper, primary_key, **kwargs):
+        return list(self.engines) if mapper.local_table.name in SHARDED_TABLES else [0]
+
+    def choose_execute(self, orm_context):
+        mapper = orm_context.bind_mapper
+        if mapper is not None:
+            tables = {mapper.local_table.name}
+        else:
+            # Compound and textual statements: go by the tables they read.
+            tables = {table.name for table in find_tables(orm_context.statement, include_crud=True)}
+        if not tables & set(SHARDED_TABLES):
+            return [0]
+        if mapper is not None and mapper.local_table.name == "tasks":
+            user_id = _user_id_criterion(orm_context.statement)
+            if user_id:
+                return self.shards_for_user(user_id)
+        return list(self.engines)
+
+    # Sessions
+    def session(self, **kwargs) -> "RoutedSession":
+        return RoutedSession(self, **kwargs)
+
+    def shard_session(self, shard: int) -> Session:
+        """A plain session on one shard."""
+        return Session(bind=self.engines[shard], autoflush=False)
+
+    def fan_out(self, call, shards: list = None) -> list:
+        """``[call(session) for each shard]``, run concurrently on a thread
+        pool, each with its own session on its shard.
+
+        Sessions are closed afterwards: objects returned are detached, with
+        whatever ``call`` loaded.
+        """
+        shards = list(self.engines) if shards is None else list(shards)
+
+        def run(shard):
+            with self.shard_session(shard) as db:
+                return call(db)
+        if len(shards) == 1:
+            return [run(shards[0])]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="shard")
+        return list(self._executor.map(run, shards))
+
+    def create_all(self):
+        """Create the schema on every shard and seed each shard's id sequence."""
+        from . import models  # noqa: F401 -- register the tables on Base.metadata
+
+        tables = [Base.metadata.tables[name] for name in SHARDED_TABLES]
+        for shard, shard_engine in self.engines.items():
+            Base.metadata.create_all(bind=shard_engine, tables=None if shard == 0 else tables)
+            low = shard * SHARD_ID_SPAN
+            with shard_engine.begin() as connection:
+                connection.exec_driver_sql(
+                    "INSERT OR IGNORE INTO shard_sequence (shard, next_id) "
+                    "SELECT ?, max(?, coalesce(max(id) + 1, 0)) FROM tasks WHERE id > ? AND id <= ?",
+                    (shard, low + 1, low, low + SHARD_ID_SPAN))
+
+    def dispose(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        for shard_engine in self.engines.values():
+            shard_engine.dispose()
+
+class RoutedSession(ShardedSession):
+    """A session whose statements ``router`` sends to the right shards."""
+
+    def __init__(self, router: ShardRouter, **kwargs):
+        self.router = router
+        super().__init__(shard_chooser=router.choose_shard, identity_chooser=router.choose_identity,
+                         execute_chooser=router.choose_execute, shards=router.engines, **kwargs)
+
+    def get_bind(self, mapper=None, **kwargs):
+        # Without a mapper or instance (db.connection(), caches keyed by the
+        # engine) the session means the main database.
+        if mapper is None and kwargs.get("shard_id") is None and kwargs.get("instance") is None:
+            kwargs["shard_id"] = 0
+        return super().get_bind(mapper, **kwargs)
+
+engine = create_db_engine()
+router = ShardRouter(engine=engine) if SHARD_COUNT > 1 else None
+if router is not None:
+    SessionLocal = sessionmaker(class_=RoutedSession, router=router, autocommit=False, autoflush=False)
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -17,4 +296,14 @@ def get_db():
         db.close()
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from . import models  # noqa: F401 -- register the tables on Base.metadata
+    if router is not None:
+        router.create_all()
+    else:
+        Base.metadata.create_all(bind=engine)
+
+
+def explain_query_plan(db, statement: str, parameters=()):
+    """Return the detail lines of SQLite's EXPLAIN QUERY PLAN for a statement."""
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return [row[3] for row in rows]
@@ -0,0 +1,17 @@
+from enum import Enum as PyEnum
+
+# Kept free of SQLAlchemy so the CLI can build its options without loading the ORM.
+
+class Priority(str, PyEnum):
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
+class Status(str, PyEnum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+
+class Frequency(str, PyEnum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
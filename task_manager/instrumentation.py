@@ -0,0 +1,214 @@
+"""Opt-in timing of SQL statements and commands.
+
+``instrument_engine`` hooks an engine's ``before/after_cursor_execute``
+events to time every statement into a ``QueryStats`` and to log those
+slower than a threshold. The CLI's ``--profile`` option reports from it;
+``task-manager worker run --metrics-file`` exports it, with the worker's
+own counters, in the Prometheus text format. Nothing here runs unless one
+of those (or ``SLOW_QUERY_MS``) asks for it.
+"""
+import bisect
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+slow_query_log = logging.getLogger("task_manager.sql.slow")
+
+# Upper bounds, in seconds, of the statement latency histogram buckets.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+STATEMENT_KINDS = ("select", "insert", "update", "delete")
+
+
+def statement_kind(statement: str) -> str:
+    words = statement.split(None, 1)
+    kind = words[0].lower() if words else ""
+    return kind if kind in STATEMENT_KINDS else "other"
+
+
+class StatementStats:
+    __slots__ = ("calls", "seconds", "max_seconds", "rows")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+
+
+class QueryStats:
+    """Per-statement totals plus a latency histogram per statement kind.
+
+    Row counts are the DBAPI ``rowcount``: rows changed by INSERT, UPDATE
+    and DELETE. sqlite3 reports -1 for SELECT, whose rows are fetched after
+    the statement has run, so those add nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements = {}
+        self.histograms = {kind: [0] * (len(LATENCY_BUCKETS) + 1) for kind in STATEMENT_KINDS + ("other",)}
+        self.kind_seconds = dict.fromkeys(self.histograms, 0.0)
+
+    def record(self, statement: str, seconds: float, rows: int):
+        kind = statement_kind(statement)
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self.statements.get(statement)
+            if stats is None:
+                stats = self.statements[statement] = StatementStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += max(rows, 0)
+            self.histograms[kind][bucket] += 1
+            self.kind_seconds[kind] += seconds
+
+    @property
+    def calls(self) -> int:
+        return sum(stats.calls for stats in self.statements.values())
+
+    @property
+    def seconds(self) -> float:
+        return sum(stats.seconds for stats in self.statements.values())
+
+    def top(self, limit: int = 10) -> list:
+        """``[(statement, StatementStats)]`` with the most total time first."""
+        with self._lock:
+            ranked = sorted(self.statements.items(), key=lambda item: item[1].seconds, reverse=True)
+        return ranked[:limit]
+
+
+def instrument_engine(engine, stats: QueryStats = None, slow_ms: float = None):
+    """Time every statement ``engine`` runs; returns a function that stops it.
+
+    Statements slower than ``slow_ms`` are logged as warnings to
+    ``task_manager.sql.slow`` with their parameters.
+    """
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        if stats is not None:
+            stats.record(statement, seconds, cursor.rowcount)
+        if slow_ms is not None and seconds * 1000 >= slow_ms:
+            slow_query_log.warning("slow query (%.1f ms): %s %s", seconds * 1000, " ".join(statement.split()),
+                                   _short(parameters))
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+
+    def remove():
+        event.remove(engine, "before_cursor_execute", before)
+        event.remove(engine, "after_cursor_execute", after)
+    return remove
+
+
+def _short(parameters, limit: int = 200) -> str:
+    text = repr(parameters)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class CommandProfile:
+    """Wall time and SQL statements of one CLI command, plus a cProfile
+    of it when ``cpu`` is set. ``stop`` ends it; ``report`` renders it."""
+
+    def __init__(self, engine, cpu: bool = False):
+        self.stats = QueryStats()
+        self.seconds = None
+        self._remove = instrument_engine(engine, self.stats)
+        self.profiler = None
+        if cpu:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self._started = time.perf_counter()
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._started
+        if self.profiler is not None:
+            self.profiler.disable()
+        self._remove()
+
+    def report(self, command: str, limit: int = 10) -> str:
+        sql_seconds = self.stats.seconds
+        lines = [f"{command}: {self.seconds * 1000:.1f} ms wall, {self.stats.calls} SQL statements "
+                 f"in {sql_seconds * 1000:.1f} ms"]
+        if self.stats.statements:
+            lines.append(f"{'calls':>6} {'total ms':>9} {'max ms':>8} {'rows':>7}  statement")
+            for statement, stats in self.stats.top(limit):
+                text = " ".join(statement.split())
+                lines.append(f"{stats.calls:>6} {stats.seconds * 1000:>9.2f} {stats.max_seconds * 1000:>8.2f} "
+                             f"{stats.rows:>7}  {text[:100] + '...' if len(text) > 100 else text}")
+        if self.profiler is not None:
+            import io
+            import pstats
+            output = io.StringIO()
+            pstats.Stats(self.profiler, stream=output).sort_stats("cumulative").print_stats(limit * 2)
+            lines.append(output.getvalue().strip())
+        return "\n".join(lines)
+
+
+WORKER_METRICS = (
+    # (attribute, metric name, type, help)
+    ("sweeps", "worker_sweeps_total", "counter", "Sweeps over due tasks."),
+    ("batches", "worker_batches_total", "counter", "Batches of due tasks processed."),
+    ("reminders_sent", "worker_reminders_sent_total", "counter", "Reminders delivered."),
+    ("reminders_failed", "worker_reminders_failed_total", "counter", "Reminders that failed to deliver."),
+    ("sessions_purged", "worker_sessions_purged_total", "counter", "Expired session tokens deleted."),
+    ("occurrences_created", "worker_occurrences_created_total", "counter",
+     "Occurrences of recurring tasks materialized."),
+    ("sweep_seconds", "worker_sweep_seconds_total", "counter", "Time spent sweeping."),
+    ("last_sweep_seconds", "worker_last_sweep_seconds", "gauge", "Duration of the latest sweep."),
+    ("last_lag_seconds", "worker_reminder_lag_seconds", "gauge",
+     "How late the latest reminder was sent after its due date."),
+    ("max_lag_seconds", "worker_reminder_lag_max_seconds", "gauge", "Worst reminder lag so far."),
+)
+
+
+def _sample(name: str, value, **labels) -> str:
+    label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+    return f"task_manager_{name}{{{label_text}}} {value:g}" if labels else f"task_manager_{name} {value:g}"
+
+
+def prometheus_text(worker_metrics=None, query_stats: QueryStats = None) -> str:
+    """Render worker counters and SQL timings in the Prometheus text format."""
+    lines = []
+    if worker_metrics is not None:
+        for attribute, name, kind, help_text in WORKER_METRICS:
+            lines += [f"# HELP task_manager_{name} {help_text}", f"# TYPE task_manager_{name} {kind}",
+                      _sample(name, getattr(worker_metrics, attribute))]
+
+    if query_stats is not None:
+        with query_stats._lock:
+            histograms = {kind: list(counts) for kind, counts in query_stats.histograms.items()}
+            kind_seconds = dict(query_stats.kind_seconds)
+        name = "sql_duration_seconds"
+        lines += [f"# HELP task_manager_{name} SQL statement latency by statement kind.",
+                  f"# TYPE task_manager_{name} histogram"]
+        for kind, counts in histograms.items():
+            cumulative = 0
+            for bound, count in zip([f"{bound:g}" for bound in LATENCY_BUCKETS] + ["+Inf"], counts):
+                cumulative += count
+                lines.append(_sample(f"{name}_bucket", cumulative, kind=kind, le=bound))
+            lines.append(_sample(f"{name}_sum", kind_seconds[kind], kind=kind))
+            lines.append(_sample(f"{name}_count", cumulative, kind=kind))
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, worker_metrics=None, query_stats: QueryStats = None):
+    """Write ``prometheus_text`` to ``path`` atomically, for node_exporter's
+    textfile collector or anything else that scrapes files."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, partial = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".prom")
+    try:
+        with os.fdopen(fd, "w") as handle:
+            handle.write(prometheus_text(worker_metrics, query_stats))
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
@@ -1,18 +1,25 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Boolean
+from sqlalchemy import (
+    Column, Computed, Integer, Float, String, DateTime, Enum, ForeignKey, Boolean, Index, DDL, event, text
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from enum import Enum as PyEnum
 
-from .database import Base
+from .config import (
+    RANK_AGE_PER_DAY, RANK_NO_DUE_DAYS, RANK_URGENCY_PER_DAY, RANK_WEIGHT_HIGH, RANK_WEIGHT_LOW,
+    RANK_WEIGHT_MEDIUM
+)
+from .database import Base, allocate_task_ids
+from .enums import Frequency, Priority, Status
 
-class Priority(str, PyEnum):
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
-
-class Status(str, PyEnum):
-    PENDING = "pending"
-    COMPLETED = "completed"
+def task_rank_sql(high: float = RANK_WEIGHT_HIGH, medium: float = RANK_WEIGHT_MEDIUM, low: float = RANK_WEIGHT_LOW,
+                  urgency: float = RANK_URGENCY_PER_DAY, age: float = RANK_AGE_PER_DAY,
+                  no_due_days: float = RANK_NO_DUE_DAYS) -> str:
+    """SQL for a task's ``task next`` score less the part every task shares:
+    ``(urgency + age) * julianday(now)`` (see config.RANK_*)."""
+    return (f"(CASE priority WHEN 'HIGH' THEN {high!r} WHEN 'MEDIUM' THEN {medium!r} "
+            f"WHEN 'LOW' THEN {low!r} ELSE 0.0 END) "
+            f"- {urgency!r} * coalesce(julianday(due_date), julianday(created_at) + {no_due_days!r}) "
+            f"- {age!r} * julianday(created_at)")
 
 class Category(Base):
     __tablename__ = "categories"
@@ -25,7 +32,7 @@ class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, index=True)
+    title = Column(String)
     description = Column(String)
     due_date = Column(DateTime)
     priority = Column(Enum(Priority, native_enum=False))
@@ -37,6 +44,120 @@ class Task(Base):
     category = relationship("Category", back_populates="tasks")
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="tasks")
+    # Set on the occurrences of a recurring task (see TaskSeries).
+    series_id = Column(Integer, ForeignKey("task_series.id", ondelete="SET NULL"))
+    # Virtual, so it costs no space in the table, only in the rank indexes.
+    rank = Column(Float, Computed(task_rank_sql(), persisted=False))
+
+    __table_args__ = (
+        # worker.check_due_tasks: reminder_sent = 0 AND due_date <= ? AND status != ?
+        # Partial, so tasks whose reminder has gone out drop out of the index.
+        Index("ix_tasks_reminder_due", "due_date", "status", sqlite_where=text("reminder_sent = 0")),
+        # get_tasks filtered by user, optionally by status
+        Index("ix_tasks_user_status", "user_id", "status"),
+        # get_tasks filtered by status alone; task_stats by status and overdue
+        # bucket read only this index
+        Index("ix_tasks_status_due_date", "status", "due_date"),
+        # task_stats by priority / category, and --where-category
+        Index("ix_tasks_priority", "priority"),
+        Index("ix_tasks_category_id", "category_id"),
+        # keyset pagination ordered by due date
+        Index("ix_tasks_due_date_id", "due_date", "id"),
+        # occurrences of a series; partial, so one-off tasks cost nothing
+        Index("ix_tasks_series_status", "series_id", "status", sqlite_where=text("series_id IS NOT NULL")),
+        # crud.next_tasks: status = 'PENDING' ORDER BY rank DESC LIMIT n,
+        # optionally for one user. The WHERE must be spelled the same there.
+        # status leads so the planner sees an equality search here too, not
+        # just on ix_tasks_status_due_date followed by a sort.
+        Index("ix_tasks_pending_rank", "status", "rank", "id", sqlite_where=text("status = 'PENDING'")),
+        Index("ix_tasks_user_pending_rank", "user_id", "rank", "id", sqlite_where=text("status = 'PENDING'")),
+    )
+
+@event.listens_for(Task, "before_insert")
+def _allocate_shard_task_id(mapper, connection, task):
+    # On a shard, ids come from that shard's own range (see
+    # database.ShardRouter) rather than SQLite's max(rowid) + 1.
+    if task.id is None and "shard_id" in connection.info:
+        task.id = allocate_task_ids(connection, 1)[0]
+
+# Full-text index over task titles and descriptions. It is an external-content
+# FTS5 table (it stores only the index, not a copy of the text) kept in step
+# with ``tasks`` by triggers. Migration a3f1c9d2e4b7 creates the same objects.
+TASKS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+)
+
+for statement in TASKS_FTS_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Task.__table__, "after_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
+
+# Task counts per user x category x status x priority, so dashboards can read
+# totals without scanning tasks. Triggers keep it current; "no user" and "no
+# category" are stored as 0 and "no priority" as '' because NULLs never match
+# in a primary key. Every task is also counted under user_id -1 (ALL_USERS),
+# so totals across users read a few hundred rows however many users and
+# tasks there are. `db rebuild-stats` recomputes it from scratch.
+ALL_USERS = -1
+
+class TaskCount(Base):
+    __tablename__ = "task_counts"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    category_id = Column(Integer, primary_key=True, autoincrement=False)
+    status = Column(String, primary_key=True)
+    priority = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+def _task_count_increment(row: str) -> str:
+    return "".join(
+        "INSERT INTO task_counts(user_id, category_id, status, priority, count) VALUES ("
+        f"{user}, coalesce({row}.category_id, 0), {row}.status, coalesce({row}.priority, ''), 1) "
+        "ON CONFLICT(user_id, category_id, status, priority) DO UPDATE SET count = count + 1; "
+        for user in (f"coalesce({row}.user_id, 0)", ALL_USERS)
+    )
+
+def _task_count_decrement(row: str) -> str:
+    keys = [
+        f"user_id = {user} AND category_id = coalesce({row}.category_id, 0) "
+        f"AND status = {row}.status AND priority = coalesce({row}.priority, '')"
+        for user in (f"coalesce({row}.user_id, 0)", ALL_USERS)
+    ]
+    return "".join(
+        f"UPDATE task_counts SET count = count - 1 WHERE {key}; "
+        f"DELETE FROM task_counts WHERE {key} AND count <= 0; "
+        for key in keys
+    )
+
+TASK_COUNTS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS task_counts_insert AFTER INSERT ON tasks BEGIN "
+    + _task_count_increment("new") + "END",
+    "CREATE TRIGGER IF NOT EXISTS task_counts_delete AFTER DELETE ON tasks BEGIN "
+    + _task_count_decrement("old") + "END",
+    "CREATE TRIGGER IF NOT EXISTS task_counts_update AFTER UPDATE OF user_id, category_id, status, priority "
+    "ON tasks WHEN old.user_id IS NOT new.user_id OR old.category_id IS NOT new.category_id "
+    "OR old.status IS NOT new.status OR old.priority IS NOT new.priority BEGIN "
+    + _task_count_decrement("old") + _task_count_increment("new") + "END",
+)
+
+# The triggers live on tasks, so create them once both tables exist.
+for statement in TASK_COUNTS_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
 
 class User(Base):
     __tablename__ = "users"
@@ -45,3 +166,58 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     tasks = relationship("Task", back_populates="user")
+
+class SessionToken(Base):
+    """A login session. Only a SHA-256 of the token is stored; the token
+    itself is shown once, to the user who logged in."""
+    __tablename__ = "session_tokens"
+
+    token_hash = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # crud.purge_expired_sessions deletes by range over this
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class UserShard(Base):
+    """Which shard holds a user's tasks when sharding is on; users without a
+    row are on shard 0. ``moving_from`` is set while `db reshard` moves them."""
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    shard = Column(Integer, nullable=False)
+    moving_from = Column(Integer)
+
+class ShardSequence(Base):
+    """The next task id of a shard. Each shard file keeps its own row."""
+    __tablename__ = "shard_sequence"
+
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    next_id = Column(Integer, nullable=False)
+
+class TaskSeries(Base):
+    """A recurring task. The rule (see recurrence.py) is stored once; its
+    occurrences become Task rows only as they come within the look-ahead
+    window or the previous one is completed (crud.materialize_occurrences).
+    ``next_index`` and ``next_due`` are the first occurrence not yet
+    materialized; ``next_due`` is NULL once the series has ended."""
+    __tablename__ = "task_series"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String, nullable=False)
+    description = Column(String)
+    priority = Column(Enum(Priority, native_enum=False))
+    category_id = Column(Integer, ForeignKey("categories.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))
+    frequency = Column(Enum(Frequency, native_enum=False), nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    starts_at = Column(DateTime, nullable=False)
+    until = Column(DateTime)
+    count = Column(Integer)
+    next_index = Column(Integer, nullable=False, default=0)
+    next_due = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # crud.materialize_occurrences: next_due <= the end of the window
+        Index("ix_task_series_next_due", "next_due"),
+    )
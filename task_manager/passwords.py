@@ -0,0 +1,122 @@
+"""Password hashing shared by the CLI and the HTTP API.
+
+Hashes are salted scrypt (or PBKDF2-HMAC-SHA256) in a self-describing
+format that records the parameters they were made with:
+
+    scrypt$n=16384,r=8,p=1$<salt>$<digest>
+    pbkdf2_sha256$i=600000$<salt>$<digest>
+
+so the cost can be raised at any time: old hashes still verify, and
+``needs_rehash`` tells login to replace them. Unsalted SHA-256 hex digests
+from earlier versions verify too and are always rehashed.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+from .config import PASSWORD_SCHEME, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P, PASSWORD_PBKDF2_ITERATIONS
+
+SCHEMES = ("scrypt", "pbkdf2_sha256")
+SALT_BYTES = 16
+DIGEST_BYTES = 32
+
+
+def default_params(scheme: str = None) -> dict:
+    scheme = scheme or PASSWORD_SCHEME
+    if scheme == "scrypt":
+        return {"n": PASSWORD_SCRYPT_N, "r": PASSWORD_SCRYPT_R, "p": PASSWORD_SCRYPT_P}
+    if scheme == "pbkdf2_sha256":
+        return {"i": PASSWORD_PBKDF2_ITERATIONS}
+    raise ValueError(f"Unknown password scheme '{scheme}', expected one of {SCHEMES}")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _derive(scheme: str, password: str, salt: bytes, params: dict) -> bytes:
+    if scheme == "scrypt":
+        n, r, p = params["n"], params["r"], params["p"]
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=DIGEST_BYTES,
+                              maxmem=128 * r * (n + p + 2) + (1 << 20))
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params["i"], DIGEST_BYTES)
+
+
+def hash_password(password: str, scheme: str = None, **params) -> str:
+    """Hash with a fresh salt; ``params`` override the configured cost."""
+    scheme = scheme or PASSWORD_SCHEME
+    params = {**default_params(scheme), **params}
+    salt = os.urandom(SALT_BYTES)
+    encoded_params = ",".join(f"{name}={value}" for name, value in params.items())
+    return f"{scheme}${encoded_params}${_b64encode(salt)}${_b64encode(_derive(scheme, password, salt, params))}"
+
+
+def parse_hash(password_hash: str):
+    """Split an encoded hash into ``(scheme, params, salt, digest)``.
+
+    Legacy SHA-256 digests come back as scheme "sha256" with no salt.
+    Raises ValueError for anything else.
+    """
+    if "$" not in password_hash:
+        if len(password_hash) == 64:
+            return "sha256", {}, b"", bytes.fromhex(password_hash)
+        raise ValueError("Unrecognised password hash")
+    try:
+        scheme, encoded_params, salt, digest = password_hash.split("$")
+        params = {name: int(value) for name, value in
+                  (item.split("=", 1) for item in encoded_params.split(","))}
+        if scheme not in SCHEMES or set(params) != set(default_params(scheme)):
+            raise ValueError
+        return scheme, params, _b64decode(salt), _b64decode(digest)
+    except (ValueError, TypeError):
+        raise ValueError("Unrecognised password hash")
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    try:
+        scheme, params, salt, digest = parse_hash(password_hash)
+    except ValueError:
+        return False
+    if scheme == "sha256":
+        candidate = hashlib.sha256(password.encode()).digest()
+    else:
+        candidate = _derive(scheme, password, salt, params)
+    return hmac.compare_digest(candidate, digest)
+
+
+def needs_rehash(password_hash: str, scheme: str = None) -> bool:
+    """Whether a hash was made with another scheme or cost than the current one."""
+    scheme = scheme or PASSWORD_SCHEME
+    try:
+        hashed_scheme, params, _, _ = parse_hash(password_hash)
+    except ValueError:
+        return True
+    return hashed_scheme != scheme or params != default_params(scheme)
+
+
+def calibrate(target_ms: float = 250.0, scheme: str = None, clock=time.perf_counter) -> tuple:
+    """Find the cost that makes one hash take about ``target_ms`` here.
+
+    Doubles scrypt's N (r and p stay as configured) or PBKDF2's iteration
+    count until a hash takes at least the target, and returns
+    ``(params, milliseconds)`` for the last cost that did not exceed it
+    (or the cheapest one tried, if even that was slower).
+    """
+    scheme = scheme or PASSWORD_SCHEME
+    key = "n" if scheme == "scrypt" else "i"
+    params = dict(default_params(scheme), **{key: 1024 if scheme == "scrypt" else 10_000})
+    best = None
+    while True:
+        started = clock()
+        _derive(scheme, "calibration", b"\0" * SALT_BYTES, params)
+        elapsed = (clock() - started) * 1000
+        if elapsed > target_ms:
+            return best or (params, elapsed)
+        best = (dict(params), elapsed)
+        params[key] *= 2
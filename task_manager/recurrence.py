@@ -0,0 +1,70 @@
+"""Recurrence rules for task series.
+
+A rule is a subset of iCalendar's RRULE: a frequency (daily, weekly or
+monthly), an interval, the first occurrence, and optionally an ``until``
+date and a ``count``, either of which ends the series. Occurrence ``n`` is
+computed directly from the first, so a series never has to be expanded from
+its start to find where it is. Monthly rules keep the first occurrence's day
+of the month, on the last day of months too short for it (31 January, 28
+February, 31 March...).
+
+Anything with ``frequency``, ``interval``, ``starts_at``, ``until`` and
+``count`` attributes is a rule: a ``models.TaskSeries`` or a row of one.
+"""
+import calendar
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from .enums import Frequency
+
+
+def _add_months(start: datetime, months: int) -> datetime:
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    day = min(start.day, calendar.monthrange(year, month + 1)[1])
+    return start.replace(year=year, month=month + 1, day=day)
+
+
+def nth_occurrence(frequency: str, interval: int, starts_at: datetime, n: int) -> datetime:
+    """Occurrence ``n`` (from 0) of an unbounded rule."""
+    steps = n * interval
+    if frequency == Frequency.DAILY:
+        return starts_at + timedelta(days=steps)
+    if frequency == Frequency.WEEKLY:
+        return starts_at + timedelta(weeks=steps)
+    if frequency == Frequency.MONTHLY:
+        return _add_months(starts_at, steps)
+    raise ValueError(f"Unknown frequency: {frequency}")
+
+
+def occurrence(rule, n: int):
+    """Occurrence ``n`` of ``rule``, or None once ``until`` or ``count`` has ended it."""
+    if rule.count is not None and n >= rule.count:
+        return None
+    due = nth_occurrence(rule.frequency, rule.interval, rule.starts_at, n)
+    if rule.until is not None and due > rule.until:
+        return None
+    return due
+
+
+def occurrences(rule, start: int = 0, through: datetime = None) -> Iterator[tuple]:
+    """``(n, due)`` for occurrences ``start``, ``start + 1``... of ``rule``,
+    up to ``through`` or the end of the series."""
+    n = start
+    while True:
+        due = occurrence(rule, n)
+        if due is None or (through is not None and due > through):
+            return
+        yield n, due
+        n += 1
+
+
+def describe(rule) -> str:
+    """``rule`` in words: "every 2 weeks, 10 times"."""
+    unit = {Frequency.DAILY: "day", Frequency.WEEKLY: "week", Frequency.MONTHLY: "month"}[Frequency(rule.frequency)]
+    text = f"every {unit}" if rule.interval == 1 else f"every {rule.interval} {unit}s"
+    if rule.count is not None:
+        text += f", {rule.count} times"
+    if rule.until is not None:
+        text += f", until {rule.until:%Y-%m-%d}"
+    return text
@@ -0,0 +1,202 @@
+import asyncio
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import Callable, List, NamedTuple
+
+
+class Reminder(NamedTuple):
+    task_id: int
+    email: str
+    title: str
+
+
+class ReminderSender(ABC):
+    """Delivers a batch of reminders and reports which ones went out.
+
+    The worker only flips ``reminder_sent`` for the task ids returned by
+    ``deliver``, so a failed delivery is retried on the next sweep.
+    """
+
+    @abstractmethod
+    def deliver(self, reminders: List[Reminder]) -> List[int]:
+        """Send ``reminders``; return the task ids of those that went out."""
+
+
+class CallableSender(ReminderSender):
+    """Calls ``send(email, title)`` for each reminder, one after another."""
+
+    def __init__(self, send: Callable[[str, str], None]):
+        self.send = send
+
+    def deliver(self, reminders):
+        delivered = []
+        for reminder in reminders:
+            try:
+                self.send(reminder.email, reminder.title)
+            except Exception:
+                continue
+            delivered.append(reminder.task_id)
+        return delivered
+
+
+class SMTPError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+    @property
+    def transient(self) -> bool:
+        return 400 <= self.code < 500
+
+
+class SMTPProtocolError(ConnectionError):
+    """The server answered with something that is not an SMTP reply; the
+    connection is dropped and the message retried like any other."""
+
+
+class _SMTPConnection:
+    """Just enough of an SMTP client to hand messages to a relay."""
+
+    def __init__(self, reader, writer, timeout):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+
+    @classmethod
+    async def open(cls, host: str, port: int, timeout: float):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        conn = cls(reader, writer, timeout)
+        try:
+            await conn._reply(220)
+            await conn.command("EHLO task-manager", 250)
+        except BaseException:
+            writer.close()
+            raise
+        return conn
+
+    async def _reply(self, expect: int) -> str:
+        lines = []
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not line:
+                raise ConnectionError("SMTP server closed the connection")
+            line = line.decode("utf-8", "replace").rstrip("\r\n")
+            lines.append(line[4:])
+            if line[3:4] != "-":
+                break
+        code = line[:3]
+        if len(code) != 3 or not (code.isascii() and code.isdigit()):
+            raise SMTPProtocolError(f"Malformed SMTP reply: {line!r}")
+        code = int(code)
+        if code != expect:
+            raise SMTPError(code, " ".join(lines))
+        return "\n".join(lines)
+
+    async def command(self, line: str, expect: int) -> str:
+        self.writer.write(line.encode() + b"\r\n")
+        await self.writer.drain()
+        return await self._reply(expect)
+
+    async def send_message(self, sender: str, recipient: str, message: str):
+        try:
+            await self.command(f"MAIL FROM:<{sender}>", 250)
+            await self.command(f"RCPT TO:<{recipient}>", 250)
+            await self.command("DATA", 354)
+        except SMTPError:
+            # Abandon the transaction, so the next MAIL FROM (a retry, or
+            # the next message) on this connection starts a fresh one.
+            await self.reset()
+            raise
+        body = "\r\n".join("." + line if line.startswith(".") else line
+                           for line in message.splitlines())
+        self.writer.write(body.encode() + b"\r\n.\r\n")
+        await self.writer.drain()
+        await self._reply(250)
+
+    async def reset(self):
+        try:
+            await self.command("RSET", 250)
+        except SMTPError as exc:
+            # A connection that can't be reset can't be reused.
+            raise SMTPProtocolError(f"RSET refused: {exc}") from exc
+
+    async def close(self, quit: bool = True):
+        try:
+            if quit:
+                await self.command("QUIT", 221)
+        except (OSError, SMTPError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.writer.close()
+
+
+class AsyncSMTPSender(ReminderSender):
+    """Delivers reminders over up to ``concurrency`` SMTP connections at once.
+
+    Each connection is reused for as many messages as it can take. Transient
+    failures (4xx replies, dropped connections, timeouts) are retried with
+    exponential backoff; permanent 5xx rejections are not.
+    """
+
+    def __init__(self, host: str, port: int, from_address: str, concurrency: int = 10,
+                 retries: int = 3, backoff: float = 0.5, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.from_address = from_address
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def deliver(self, reminders):
+        if not reminders:
+            return []
+        return asyncio.run(self.deliver_async(reminders))
+
+    async def deliver_async(self, reminders: List[Reminder]) -> List[int]:
+        queue = asyncio.Queue()
+        for reminder in reminders:
+            queue.put_nowait(reminder)
+        delivered = []
+        workers = min(self.concurrency, len(reminders))
+        await asyncio.gather(*(self._drain(queue, delivered) for _ in range(workers)))
+        return delivered
+
+    def _message(self, reminder: Reminder) -> str:
+        message = EmailMessage()
+        message["From"] = self.from_address
+        message["To"] = reminder.email
+        # A header value can't hold a line break; folding the title onto one
+        # line keeps a title like "x\nBcc: ..." from adding headers.
+        message["Subject"] = f"Reminder: {' '.join(reminder.title.split())}"
+        message.set_content(f"Your task \"{reminder.title}\" is due.\n", charset="utf-8")
+        return message.as_string()
+
+    async def _drain(self, queue: asyncio.Queue, delivered: list):
+        conn = None
+        while not queue.empty():
+            reminder = queue.get_nowait()
+            try:
+                message = self._message(reminder)
+            except ValueError:
+                # An address no header can carry (a line break in it): the
+                # relay would never take it, so don't retry.
+                continue
+            for attempt in range(self.retries + 1):
+                try:
+                    if conn is None:
+                        conn = await _SMTPConnection.open(self.host, self.port, self.timeout)
+                    await conn.send_message(self.from_address, reminder.email, message)
+                    delivered.append(reminder.task_id)
+                    break
+                except SMTPError as exc:
+                    if not exc.transient:
+                        break
+                except (OSError, asyncio.TimeoutError):
+                    if conn is not None:
+                        await conn.close(quit=False)
+                        conn = None
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+        if conn is not None:
+            await conn.close()
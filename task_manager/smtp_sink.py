@@ -0,0 +1,139 @@
+"""A local SMTP server that accepts and records messages.
+
+Used by the tests and the sender benchmark in place of a real relay. It can
+add a fixed delay per reply to simulate network round trips, and inject
+transient or permanent failures.
+
+Run it standalone with ``python -m task_manager.smtp_sink [PORT]``.
+"""
+import asyncio
+import sys
+import threading
+
+
+class SMTPSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0,
+                 transient_failures: int = 0, reject: set = None, transient_rcpt_failures: int = 0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        # Number of messages to answer with 451 before accepting any.
+        self.transient_failures = transient_failures
+        # Number of RCPT commands to answer with 451 before accepting any.
+        self.transient_rcpt_failures = transient_rcpt_failures
+        # Recipients answered with a permanent 550.
+        self.reject = set(reject or ())
+        self.messages = []
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    async def _reply(self, writer, line: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        mail_from, rcpt_to = None, []
+        await self._reply(writer, "220 smtp-sink ready")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").rstrip("\r\n")
+                verb = command[:4].upper()
+                if verb in ("EHLO", "HELO"):
+                    await self._reply(writer, "250 smtp-sink")
+                elif verb == "MAIL":
+                    if mail_from is not None:
+                        await self._reply(writer, "503 Nested MAIL command")
+                        continue
+                    mail_from, rcpt_to = command[10:].strip("<>"), []
+                    await self._reply(writer, "250 OK")
+                elif verb == "RCPT":
+                    address = command[8:].strip("<>")
+                    if self.transient_rcpt_failures > 0:
+                        self.transient_rcpt_failures -= 1
+                        await self._reply(writer, "451 Try again later")
+                    elif address in self.reject:
+                        await self._reply(writer, "550 No such user")
+                    else:
+                        rcpt_to.append(address)
+                        await self._reply(writer, "250 OK")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data = (await reader.readline()).decode("utf-8", "replace").rstrip("\r\n")
+                        if data == ".":
+                            break
+                        lines.append(data[1:] if data.startswith("..") else data)
+                    if self.transient_failures > 0:
+                        self.transient_failures -= 1
+                        await self._reply(writer, "451 Try again later")
+                    else:
+                        self.messages.append((mail_from, rcpt_to, "\n".join(lines)))
+                        await self._reply(writer, "250 OK")
+                    mail_from, rcpt_to = None, []
+                elif verb == "RSET":
+                    mail_from, rcpt_to = None, []
+                    await self._reply(writer, "250 OK")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    break
+                else:
+                    await self._reply(writer, "502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def __enter__(self):
+        """Serve from a background thread for the duration of a ``with`` block."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8025
+    sink = SMTPSink(port=port)
+
+    async def serve():
+        await sink.start()
+        print(f"SMTP sink listening on {sink.host}:{sink.port}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print(f"Received {len(sink.messages)} messages")
+
+
+if __name__ == "__main__":
+    main()
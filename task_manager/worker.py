@@ -1,25 +1,162 @@
+import threading
+import time
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, joinedload
+from .crud import mark_reminders_sent, materialize_occurrences, merge_shard_results, purge_expired_sessions
 from .models import Task, Status
-from .crud import get_tasks
 from .database import get_db
+from .senders import CallableSender, Reminder, ReminderSender
 
 def send_reminder_email(email: str, task_title: str):
     # Placeholder for sending email logic
     print(f"Sending reminder email to {email} for task: {task_title}")
 
-def check_due_tasks(db=None):
+def due_tasks_query(db: Session, now: datetime):
+    # reminder_sent == False renders as a literal 0, which lets SQLite use the
+    # partial ix_tasks_reminder_due index.
+    return db.query(Task).filter(
+        Task.reminder_sent == False,
+        Task.due_date <= now,
+        Task.status != Status.COMPLETED
+    )
+
+def due_batch_query(db: Session, now: datetime, batch_size: int = 100, after: tuple = None):
+    """One batch of process_due_batch: due tasks after ``after`` in
+    ``(due_date, id)`` order, with their users."""
+    query = due_tasks_query(db, now).options(joinedload(Task.user))
+    if after:
+        due_date, task_id = after
+        query = query.filter(or_(Task.due_date > due_date,
+                                 and_(Task.due_date == due_date, Task.id > task_id)))
+    return query.order_by(Task.due_date, Task.id).limit(batch_size)
+
+class WorkerMetrics:
+    """Running totals for the reminder worker."""
+
+    def __init__(self):
+        self.sweeps = 0
+        self.batches = 0
+        self.reminders_sent = 0
+        self.reminders_failed = 0
+        self.sweep_seconds = 0.0
+        self.last_sweep_seconds = 0.0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.sessions_purged = 0
+        self.occurrences_created = 0
+
+    @property
+    def throughput(self) -> float:
+        """Reminders sent per second of sweep time."""
+        return self.reminders_sent / self.sweep_seconds if self.sweep_seconds else 0.0
+
+    def record_lag(self, now: datetime, due_date: datetime):
+        lag = max((now - due_date).total_seconds(), 0.0)
+        self.last_lag_seconds = lag
+        self.max_lag_seconds = max(self.max_lag_seconds, lag)
+
+def process_due_batch(db: Session, now: datetime, batch_size: int = 100, after: tuple = None,
+                      metrics: WorkerMetrics = None, sender: ReminderSender = None, writes=None):
+    """Send reminders for one batch of due tasks, oldest first.
+
+    ``after`` is the ``(due_date, id)`` of the last task of the previous batch;
+    tasks whose user has no email stay unsent, so the sweep has to move past
+    them rather than re-read them. Returns ``(sent, after)`` where ``after`` is
+    None once there is nothing left to process. With ``writes`` (a WriteQueue
+    or RemoteWriteQueue) the sent flags are written through it.
+    """
+    tasks = due_batch_query(db, now, batch_size, after).all()
+    tasks = merge_shard_results(db, tasks, lambda task: (task.due_date, task.id), batch_size)
+    if not tasks:
+        return 0, None
+
+    sender = sender or CallableSender(send_reminder_email)
+    # Assuming task.user has an email attribute; if not, adjust accordingly
+    reminders = [Reminder(task.id, task.user.email, task.title)
+                 for task in tasks if hasattr(task.user, "email")]
+    sent_ids = sender.deliver(reminders) if reminders else []
+    if metrics:
+        due_dates = {task.id: task.due_date for task in tasks}
+        for task_id in sent_ids:
+            metrics.record_lag(now, due_dates[task_id])
+        metrics.reminders_failed += len(reminders) - len(sent_ids)
+    last = (tasks[-1].due_date, tasks[-1].id)
+
+    db.commit()
+    if sent_ids:
+        if writes:
+            writes.submit("mark_reminders_sent", task_ids=sent_ids)
+        else:
+            mark_reminders_sent(db, sent_ids)
+    if metrics:
+        metrics.batches += 1
+        metrics.reminders_sent += len(sent_ids)
+    return len(sent_ids), (last if len(tasks) == batch_size else None)
+
+def check_due_tasks(db=None, batch_size: int = 100, metrics: WorkerMetrics = None,
+                    sender: ReminderSender = None, writes=None):
+    """Send every reminder that is due now, one batch at a time."""
     if db is None:
         db = next(get_db())
     now = datetime.utcnow()
-    overdue_tasks = db.query(Task).filter(
-        Task.due_date <= now,
-        Task.status != Status.COMPLETED,
-        Task.reminder_sent == False
-    ).all()
-    for task in overdue_tasks:
-        # Assuming task.user has an email attribute; if not, adjust accordingly
-        if hasattr(task.user, "email"):
-            send_reminder_email(task.user.email, task.title)
-            task.reminder_sent = True
-            db.commit()
+    started = time.perf_counter()
+    total, after = 0, None
+    while True:
+        sent, after = process_due_batch(db, now, batch_size, after, metrics, sender, writes)
+        total += sent
+        if after is None:
+            break
+    if metrics:
+        metrics.sweeps += 1
+        metrics.last_sweep_seconds = time.perf_counter() - started
+        metrics.sweep_seconds += metrics.last_sweep_seconds
+    return total
+
+def next_due_date(db: Session, now: datetime):
+    """The earliest future due date that will need a reminder, if any."""
+    # A sharded session returns one minimum per shard.
+    due_dates = db.execute(select(func.min(Task.due_date)).where(
+        Task.reminder_sent == False,
+        Task.due_date > now,
+        Task.status != Status.COMPLETED
+    )).scalars()
+    return min((due_date for due_date in due_dates if due_date is not None), default=None)
+
+def run_worker(db=None, batch_size: int = 100, max_sleep: float = 60.0,
+               stop: threading.Event = None, metrics: WorkerMetrics = None, on_sweep=None,
+               sender: ReminderSender = None, writes=None):
+    """Sweep due tasks, then sleep until the next one falls due.
+
+    Tasks can be added or rescheduled at any time, so the sleep is capped at
+    ``max_sleep`` seconds. Each sweep first materializes the occurrences of
+    recurring tasks that have come within the look-ahead window, and also
+    deletes expired session tokens. Runs until ``stop`` is set. ``writes``
+    routes the worker's writes through a write queue (see
+    process_due_batch).
+    """
+    if db is None:
+        db = next(get_db())
+    stop = stop or threading.Event()
+    metrics = metrics or WorkerMetrics()
+    while not stop.is_set():
+        if writes:
+            metrics.occurrences_created += writes.submit("materialize_occurrences")
+        else:
+            metrics.occurrences_created += materialize_occurrences(db)
+        check_due_tasks(db, batch_size, metrics, sender, writes)
+        if writes:
+            metrics.sessions_purged += writes.submit("purge_expired_sessions")
+        else:
+            metrics.sessions_purged += purge_expired_sessions(db)
+        if on_sweep:
+            on_sweep(metrics)
+
+        now = datetime.utcnow()
+        upcoming = next_due_date(db, now)
+        db.commit()
+        delay = max_sleep
+        if upcoming is not None:
+            delay = min(max((upcoming - now).total_seconds(), 0.0), max_sleep)
+        stop.wait(delay)
+    return metrics
@@ -0,0 +1,245 @@
+"""Write queue with group commit.
+
+Every crud mutation commits on its own, so concurrent writers each pay for a
+commit and queue for SQLite's single write lock through ``busy_timeout``.
+A ``WriteQueue`` funnels mutations through one writer thread instead: it
+takes whatever is queued (up to ``max_batch`` operations, waiting at most
+``max_wait`` seconds for more while writes are arriving together), runs each
+in its own savepoint of one ``BEGIN IMMEDIATE`` transaction and commits
+once. Callers block until their operation has committed and get its result
+(the new id, a row count...).
+
+Other processes share a queue through the daemon (``task-manager serve``):
+``RemoteWriteQueue`` sends operations to it over its socket. Queues in
+separate processes on the same database file also take an advisory lock
+around each batch, so they hand the write lock to each other in turn rather
+than polling SQLite for it.
+"""
+import contextlib
+import fcntl
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+from sqlalchemy.engine import make_url
+
+from . import crud
+from .cache import deferred_invalidations
+from .client import DEFAULT_SOCKET, DaemonClient
+
+
+def _create_task(db, title: str, description: str = None, due_date: datetime = None, priority: str = "medium",
+                 **values) -> int:
+    return crud.create_task(db, title, description, due_date, priority, **values).id
+
+
+def _update_task(db, task_id: int, **changes) -> bool:
+    return crud.update_task(db, task_id, **changes) is not None
+
+
+def _delete_task(db, task_id: int) -> bool:
+    return crud.delete_task(db, task_id) is not None
+
+
+# The operations a queue accepts by name, which is all a RemoteWriteQueue can
+# send. Each runs a crud function and returns something JSON can carry.
+OPERATIONS = {
+    "create_task": _create_task,
+    "update_task": _update_task,
+    "delete_task": _delete_task,
+    "bulk_update_tasks": crud.bulk_update_tasks,
+    "bulk_delete_tasks": crud.bulk_delete_tasks,
+    "complete_tasks": crud.complete_tasks,
+    "mark_reminders_sent": crud.mark_reminders_sent,
+    "purge_expired_sessions": crud.purge_expired_sessions,
+    "materialize_occurrences": crud.materialize_occurrences,
+}
+
+
+class RolledBack(RuntimeError):
+    """A queued operation called ``db.rollback()`` and then returned."""
+
+
+@contextlib.contextmanager
+def _operation(db):
+    """Run one queued operation in its own savepoint of the open batch.
+
+    Its ``db.commit()`` only flushes. Its ``db.rollback()`` must not end the
+    batch's transaction either: it fails the operation instead, rolling back
+    just its savepoint. Crud functions roll back and re-raise, which fails it
+    anyway; one that returned normally gets ``RolledBack``.
+    """
+    rolled_back = []
+    db.commit = db.flush
+    db.rollback = lambda: rolled_back.append(True)
+    try:
+        with db.begin_nested():
+            yield
+            if rolled_back:
+                raise RolledBack("A queued operation rolled back; it should raise instead")
+    finally:
+        del db.commit, db.rollback
+
+
+def default_lock_path(session_factory):
+    """``<database>-writelock`` next to a file database, None in memory."""
+    db = session_factory()
+    try:
+        database = make_url(str(db.get_bind().url)).database
+    finally:
+        db.close()
+    return f"{database}-writelock" if database and database != ":memory:" else None
+
+
+class WriteQueue:
+    """Runs submitted operations on one writer thread, many per commit.
+
+    An operation is a name from ``OPERATIONS`` or any callable taking the
+    session first. Operations must leave the transaction to the queue: their
+    ``db.commit()`` only flushes, and one that fails (or calls
+    ``db.rollback()``) is rolled back to its savepoint without affecting the
+    rest of its batch. Cache invalidations they make take effect once the
+    batch has committed, so no reader caches what it read before that.
+    """
+
+    def __init__(self, session_factory, max_batch: int = 256, max_wait: float = 0.002, lock_path: str = "auto"):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.lock_path = default_lock_path(session_factory) if lock_path == "auto" else lock_path
+        self.commits = 0
+        self.operations = 0
+        self._last_batch = 1
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self._thread.start()
+
+    def submit_async(self, operation, **kwargs) -> Future:
+        if not callable(operation) and operation not in OPERATIONS:
+            raise ValueError(f"Unknown write operation: {operation}")
+        future = Future()
+        self._queue.put((operation, kwargs, future))
+        return future
+
+    def submit(self, operation, **kwargs):
+        """Run one operation and return its result once its batch has committed."""
+        return self.submit_async(operation, **kwargs).result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _take_batch(self, first):
+        """``first`` plus whatever else is queued. Only wait for more while
+        writes have been arriving together: a lone producer would just be
+        delayed by ``max_wait`` on every operation."""
+        batch = [first]
+        deadline = time.monotonic() + (self.max_wait if self._last_batch > 1 else 0)
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        lock_file = open(self.lock_path, "a") if self.lock_path else None
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    return
+                batch = self._take_batch(first)
+                self._last_batch = len(batch)
+                if lock_file is None:
+                    self._commit_batch(batch)
+                    continue
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._commit_batch(batch)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            if lock_file:
+                lock_file.close()
+
+    def _commit_batch(self, batch: list):
+        db = self.session_factory()
+        results = []
+        try:
+            with deferred_invalidations():
+                # Take the write lock before the first savepoint. Without it
+                # SQLite would start the transaction at the SAVEPOINT, and
+                # releasing that one would commit the whole batch.
+                crud.begin_immediate(db)
+                for operation, kwargs, future in batch:
+                    function = OPERATIONS[operation] if isinstance(operation, str) else operation
+                    try:
+                        with _operation(db):
+                            result = function(db, **kwargs)
+                    except Exception as exc:
+                        future.set_exception(exc)
+                    else:
+                        results.append((future, result))
+                db.commit()
+        except Exception as exc:
+            db.rollback()
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            db.close()
+        self.commits += 1
+        self.operations += len(results)
+        for future, result in results:
+            future.set_result(result)
+
+
+def dump_arguments(kwargs: dict) -> dict:
+    """``kwargs`` with datetimes tagged, so they survive JSON."""
+    return {key: {"datetime": value.isoformat()} if isinstance(value, datetime) else value
+            for key, value in kwargs.items()}
+
+
+def load_arguments(kwargs: dict) -> dict:
+    return {key: datetime.fromisoformat(value["datetime"]) if isinstance(value, dict) and "datetime" in value
+            else value for key, value in kwargs.items()}
+
+
+class RemoteWriteQueue:
+    """``WriteQueue.submit`` for another process: operations go to the
+    daemon's queue over its socket. One request is in flight at a time."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 30.0):
+        self.client = DaemonClient(socket_path, timeout=timeout)
+        self._lock = threading.Lock()
+
+    def submit(self, operation: str, **kwargs):
+        with self._lock:
+            reply = self.client.write(operation, dump_arguments(kwargs))
+        if "error" in reply:
+            raise RuntimeError(f"{operation} failed in the daemon: {reply['error']}")
+        return reply["result"]
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
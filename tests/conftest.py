@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# Point the CLI's engine at a throwaway database before task_manager is imported,
+# so test runs never touch (or depend on) task_manager/tasks.db.
+os.environ["DB_NAME"] = os.path.join(tempfile.mkdtemp(), "test_tasks.db")
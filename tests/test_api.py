@@ -0,0 +1,172 @@
+import gzip
+import http.client
+import json
+import threading
+from urllib.parse import urlsplit
+
+import pytest
+
+from sqlalchemy.orm import sessionmaker
+
+from task_manager.api import APIServer
+from task_manager.database import Base, create_db_engine
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    engine = create_db_engine(f"sqlite:///{tmp_path_factory.mktemp('api') / 'api.db'}", echo=False)
+    Base.metadata.create_all(engine)
+    server = APIServer("127.0.0.1", 0, session_factory=sessionmaker(bind=engine, autoflush=False))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    engine.dispose()
+
+
+@pytest.fixture
+def call(server):
+    url = urlsplit(server.url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+
+    def call(method, path, payload=None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        data = response.read()
+        if response.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        return response, json.loads(data) if data else None
+
+    yield call
+    connection.close()
+
+
+def test_task_crud_with_etags(call):
+    response, task = call("POST", "/tasks", {"title": "API task", "priority": "high", "due_date": "2099-01-02T00:00:00"})
+    assert response.status == 201
+    assert task["priority"] == "high" and task["status"] == "pending"
+    path = response.getheader("Location")
+    tag = response.getheader("ETag")
+
+    response, fetched = call("GET", path)
+    assert response.status == 200 and fetched == task
+    assert response.getheader("ETag") == tag
+
+    response, body = call("GET", path, headers={"If-None-Match": tag})
+    assert response.status == 304 and body is None
+
+    response, updated = call("PATCH", path, {"status": "completed"}, headers={"If-Match": tag})
+    assert response.status == 200 and updated["status"] == "completed"
+    assert response.getheader("ETag") != tag
+
+    response, body = call("PATCH", path, {"title": "Lost update"}, headers={"If-Match": tag})
+    assert response.status == 412
+    response, _ = call("GET", path, headers={"If-None-Match": tag})
+    assert response.status == 200
+
+    assert call("DELETE", path)[0].status == 204
+    assert call("GET", path)[0].status == 404
+
+    response, task = call("POST", "/tasks", {"title": "Already reminded", "reminder_sent": True})
+    assert response.status == 201 and task["reminder_sent"] is True
+
+
+def test_errors(call):
+    assert call("POST", "/tasks", {"description": "no title"})[0].status == 400
+    assert call("POST", "/tasks", {"title": "x", "priority": "urgent"})[0].status == 400
+    assert call("POST", "/tasks", {"title": "x", "colour": "red"})[0].status == 400
+    assert call("GET", "/tasks?after=garbage")[0].status == 400
+    assert call("GET", "/nowhere")[0].status == 404
+    response, body = call("PUT", "/tasks/1", {"title": "x"})
+    assert response.status == 405 and response.getheader("Allow") == "GET, PATCH, DELETE"
+    response, body = call("DELETE", "/tasks")
+    assert response.status == 405 and response.getheader("Allow") == "GET, POST"
+    for where in ({"ids": 5}, {"ids": ["5"]}, {"ranges": [[1]]}, {"user_id": "1"}, {"status": 3}):
+        assert call("POST", "/tasks/batch", {"op": "delete", "where": where})[0].status == 400
+    for body in ({"description": {}}, {"user_id": [1]}, {"category_id": "1"}, {"reminder_sent": "no"}):
+        assert call("POST", "/tasks", {"title": "x", **body})[0].status == 400
+    for category in (5, ["a"]):
+        response, _ = call("POST", "/tasks/batch", {"op": "create", "tasks": [{"title": "x", "category": category}]})
+        assert response.status == 400
+
+
+def test_if_match_is_checked_in_the_updating_transaction(server, call):
+    response, task = call("POST", "/tasks", {"title": "Contended"})
+    path, tag = response.getheader("Location"), response.getheader("ETag")
+    results = []
+
+    def patch(title):
+        url = urlsplit(server.url)
+        connection = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+        connection.request("PATCH", path, body=json.dumps({"title": title}), headers={"If-Match": tag})
+        results.append(connection.getresponse().status)
+        connection.close()
+
+    threads = [threading.Thread(target=patch, args=(f"Writer {i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [200] + [412] * 7
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_invalid_content_length(server, length):
+    url = urlsplit(server.url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+    connection.putrequest("POST", "/tasks")
+    connection.putheader("Content-Length", length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400 and "Content-Length" in json.loads(response.read())["error"]
+    connection.close()
+
+
+def test_pagination_batch_and_gzip(call):
+    response, body = call("POST", "/tasks/batch", {"op": "create", "tasks": [
+        {"title": f"Paged {i}", "category": "api-batch", "priority": "low"} for i in range(25)]})
+    assert response.status == 201 and body == {"created": 25}
+
+    ids, after = [], ""
+    while True:
+        response, page = call("GET", f"/tasks?limit=10{after}", headers={"Accept-Encoding": "gzip"})
+        assert response.status == 200
+        ids.extend(task["id"] for task in page["tasks"])
+        if page["next"] is None:
+            break
+        after = f"&after={page['next']}"
+    assert ids == sorted(ids) and len(ids) == len(set(ids)) >= 25
+    assert response.getheader("Content-Encoding") == "gzip"
+    response, _ = call("GET", "/tasks?limit=10")
+    assert response.getheader("Content-Encoding") is None
+
+    response, body = call("POST", "/tasks/batch", {"op": "complete", "where": {"category": "api-batch"}})
+    assert body == {"updated": 25}
+    response, stats = call("GET", "/tasks/stats?by=category&by=status")
+    assert {"category": "api-batch", "status": "completed", "count": 25} in stats["groups"]
+    response, body = call("POST", "/tasks/batch", {"op": "delete", "where": {}})
+    assert response.status == 400
+    response, body = call("POST", "/tasks/batch", {"op": "delete", "where": {"category": "api-batch"}})
+    assert body == {"deleted": 25}
+
+
+def test_search_categories_and_users(call):
+    call("POST", "/tasks", {"title": "Searchable zebra"})
+    response, body = call("GET", "/tasks/search?q=zebr")
+    assert [task["title"] for task in body["tasks"]] == ["Searchable zebra"]
+
+    response, category = call("POST", "/categories", {"name": "api-category"})
+    assert response.status == 201
+    assert call("POST", "/categories", {"name": "api-category"})[0].status == 409
+    response, renamed = call("PATCH", f"/categories/{category['id']}", {"name": "api-renamed"})
+    assert renamed == {"id": category["id"], "name": "api-renamed"}
+    assert call("DELETE", f"/categories/{category['id']}")[0].status == 204
+
+    response, user = call("POST", "/users", {"username": "api-user", "password": "secret"})
+    assert response.status == 201 and set(user) == {"id", "username"}
+    response, body = call("GET", "/users?username=api-user")
+    assert body == {"users": [user]}
+    assert call("POST", "/users", {"username": "api-user", "password": "x"})[0].status == 409
+    assert call("DELETE", f"/users/{user['id']}")[0].status == 204
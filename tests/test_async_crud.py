@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from task_manager import async_crud, crud
+from task_manager.database import Base, create_async_db_engine, create_db_engine
+from task_manager.models import Priority, Status
+
+
+class SyncBackend:
+    def __init__(self, url):
+        self.engine = create_db_engine(url, echo=False)
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def __call__(self, name, *args, **kwargs):
+        return getattr(crud, name)(self.db, *args, **kwargs)
+
+    def close(self):
+        self.db.close()
+        self.engine.dispose()
+
+
+class AsyncBackend:
+    def __init__(self, url):
+        self.loop = asyncio.new_event_loop()
+        self.engine = create_async_db_engine(url, echo=False)
+        self.loop.run_until_complete(self._create_all())
+        self.db = AsyncSession(self.engine, expire_on_commit=False, autoflush=False)
+
+    async def _create_all(self):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    def __call__(self, name, *args, **kwargs):
+        return self.loop.run_until_complete(getattr(async_crud, name)(self.db, *args, **kwargs))
+
+    def close(self):
+        self.loop.run_until_complete(self.db.close())
+        self.loop.run_until_complete(self.engine.dispose())
+        self.loop.close()
+
+
+@pytest.fixture(params=[SyncBackend, AsyncBackend], ids=["sync", "async"])
+def crud_call(request, tmp_path):
+    backend = request.param(f"sqlite:///{tmp_path / 'tasks.db'}")
+    yield backend
+    backend.close()
+
+
+def test_user_crud(crud_call):
+    user = crud_call("create_user", "testuser", "hashedpassword")
+    assert crud_call("get_user_by_username", "testuser").id == user.id
+    assert crud_call("update_user", user.id, username="newname").username == "newname"
+    assert crud_call("delete_user", user.id).id == user.id
+    assert crud_call("get_user_by_username", "newname") is None
+
+
+def test_category_crud(crud_call):
+    category = crud_call("create_category", "Work")
+    assert crud_call("get_category", category.id).name == "Work"
+    assert crud_call("update_category", category.id, "Personal").name == "Personal"
+    assert [c.name for c in crud_call("get_categories")] == ["Personal"]
+    assert crud_call("delete_category", category.id).id == category.id
+    assert crud_call("get_category", category.id) is None
+
+
+def test_task_crud(crud_call):
+    category = crud_call("create_category", "TestCat")
+    user = crud_call("create_user", "taskuser", "passhash")
+    due_date = datetime.utcnow() + timedelta(days=1)
+    task = crud_call("create_task", "Test Task", "Desc", due_date, Priority.MEDIUM, category.id,
+                     Status.PENDING, user.id)
+    fetched = crud_call("get_task", task.id, load="joined")
+    assert (fetched.title, fetched.category.name, fetched.user.username) == ("Test Task", "TestCat", "taskuser")
+    assert crud_call("update_task", task.id, title="Updated Task").title == "Updated Task"
+    assert crud_call("delete_task", task.id).id == task.id
+    assert crud_call("get_task", task.id) is None
+
+
+def test_bulk_operations_stats_and_search(crud_call):
+    user = crud_call("create_user", "bulkuser", "passhash")
+    rows = ({"title": f"Bulk {i}", "priority": "low", "category": "Imported", "user_id": user.id}
+            for i in range(25))
+    assert crud_call("bulk_create_tasks", rows, batch_size=10) == 25
+    assert crud_call("complete_tasks", id_ranges=[(1, 10)]) == 10
+    assert crud_call("bulk_update_tasks", {"priority": Priority.HIGH}, status=Status.PENDING) == 15
+    assert crud_call("bulk_delete_tasks", ids=[25]) == 1
+    assert crud_call("task_stats", ["status", "priority"], user_id=user.id) == [
+        {"status": "completed", "priority": "low", "count": 10},
+        {"status": "pending", "priority": "high", "count": 14},
+    ]
+    assert [task.title for task, _ in crud_call("search_tasks", "bulk 23")] == ["Bulk 23"]
+
+    tasks, cursor = crud_call("get_tasks_page", 20, load="joined")
+    rest, end = crud_call("get_tasks_page", 20, cursor)
+    assert len(tasks) + len(rest) == 24 and end is None
+    assert tasks[0].category.name == "Imported"
+
+
+def test_async_concurrent_readers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'tasks.db'}"
+    backend = SyncBackend(url)
+    user = backend("create_user", "reader", "passhash")
+    backend("bulk_create_tasks", ({"title": f"Read {i}", "user_id": user.id} for i in range(50)))
+    backend.close()
+
+    async def read_all():
+        engine = create_async_db_engine(url, echo=False)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def read(task_id):
+            async with factory() as db:
+                return (await async_crud.get_task(db, task_id)).title
+
+        async def stream():
+            async with factory() as db:
+                return [row.id async for row in async_crud.iter_task_rows(db, batch_size=7)]
+
+        try:
+            return await asyncio.gather(*(read(i) for i in range(1, 51)), stream())
+        finally:
+            await engine.dispose()
+
+    *titles, streamed = asyncio.run(read_all())
+    assert titles == [f"Read {i}" for i in range(50)]
+    assert streamed == list(range(1, 51))
@@ -0,0 +1,76 @@
+from task_manager.cache import LookupCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_counts_hits_and_misses():
+    cache = LookupCache(maxsize=4, ttl=60)
+    loads = []
+    load = lambda: loads.append(1) or "value"
+    assert cache.get(("category", 1), load) == "value"
+    assert cache.get(("category", 1), load) == "value"
+    assert len(loads) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+
+
+def test_cache_evicts_least_recently_used():
+    cache = LookupCache(maxsize=2, ttl=60)
+    cache.get(("user", "a"), lambda: 1)
+    cache.get(("user", "b"), lambda: 2)
+    cache.get(("user", "a"), lambda: 1)
+    cache.get(("user", "c"), lambda: 3)
+    assert cache.evictions == 1
+    assert cache.get(("user", "a"), lambda: "reloaded") == 1
+    assert cache.get(("user", "b"), lambda: "reloaded") == "reloaded"
+
+
+def test_cache_entries_expire_and_none_is_not_cached():
+    clock = FakeClock()
+    cache = LookupCache(maxsize=4, ttl=10, clock=clock)
+    cache.get(("user", "a"), lambda: 1)
+    clock.now = 11
+    assert cache.get(("user", "a"), lambda: 2) == 2
+    assert cache.get(("user", "x"), lambda: None) is None
+    assert cache.get(("user", "x"), lambda: 3) == 3
+
+
+def test_cache_invalidates_by_namespace():
+    cache = LookupCache(maxsize=8, ttl=60)
+    cache.get(("category", 1), lambda: "work")
+    cache.get(("user", "a"), lambda: "alice")
+    cache.invalidate("category")
+    assert cache.get(("category", 1), lambda: "home") == "home"
+    assert cache.get(("user", "a"), lambda: "bob") == "alice"
+
+
+def test_invalidate_during_load_is_not_lost():
+    cache = LookupCache(maxsize=8, ttl=60)
+
+    def load():
+        # A write commits and invalidates while this lookup is reading.
+        cache.invalidate("category")
+        return "before the write"
+
+    assert cache.get(("category", 1), load) == "before the write"
+    assert cache.get(("category", 1), lambda: "after the write") == "after the write"
+
+    def load_then_clear():
+        cache.clear()
+        return "before the clear"
+
+    cache.get(("user", "a"), load_then_clear)
+    assert cache.get(("user", "a"), lambda: "reloaded") == "reloaded"
+
+
+def test_zero_size_disables_cache():
+    cache = LookupCache(maxsize=0)
+    cache.get(("user", "a"), lambda: 1)
+    assert cache.get(("user", "a"), lambda: 2) == 2
+    assert len(cache) == 0
@@ -1,4 +1,5 @@
 import pytest
+import json
 from typer.testing import CliRunner
 from task_manager.cli import app
 from task_manager.database import init_db, get_db
@@ -72,3 +73,207 @@ def test_user_commands():
     result = runner.invoke(app, ["user", "login", "cliuser"], input="password\n")
     assert result.exit_code == 0
     assert "Login successful" in result.output
+
+    result = runner.invoke(app, ["user", "login", "cliuser"], input="wrong\n")
+    assert result.exit_code == 1
+    assert "Invalid password" in result.output
+
+def test_session_token_commands():
+    result = runner.invoke(app, ["user", "login", "cliuser"], input="password\n")
+    token = result.output.split("Token: ", 1)[1].split()[0]
+
+    result = runner.invoke(app, ["task", "add", "Token task", "--token", token])
+    assert result.exit_code == 0
+    task_id = result.output.rsplit(":", 1)[1].strip()
+    result = runner.invoke(app, ["task", "list", "--format", "tsv"], env={"TASK_MANAGER_TOKEN": token})
+    assert result.exit_code == 0
+    assert [line.split("\t")[0] for line in result.output.splitlines()[1:]] == [task_id]
+
+    result = runner.invoke(app, ["task", "list", "--token", token, "--user-id", "999999"])
+    assert result.exit_code == 1
+    assert "does not match" in result.output
+
+    result = runner.invoke(app, ["user", "logout", "--token", token])
+    assert result.exit_code == 0
+    result = runner.invoke(app, ["task", "list", "--token", token])
+    assert result.exit_code == 1
+    assert "Invalid or expired session token" in result.output
+    assert runner.invoke(app, ["task", "delete", task_id]).exit_code == 0
+
+def test_login_upgrades_legacy_hash():
+    # testuser was stored with an unsalted SHA-256 digest by test_task_commands
+    result = runner.invoke(app, ["user", "login", "testuser"], input="password\n")
+    assert result.exit_code == 0
+    db = next(get_db())
+    assert db.query(User).filter(User.username == "testuser").one().password_hash.startswith("scrypt$")
+    result = runner.invoke(app, ["user", "login", "testuser"], input="password\n")
+    assert result.exit_code == 0
+
+def test_task_import_export(tmp_path):
+    source = tmp_path / "tasks.ndjson"
+    source.write_text(
+        '{"title": "Imported A", "priority": "high", "category": "Imports", "due_date": "2099-01-01"}\n'
+        '{"title": "Imported B", "status": "completed"}\n'
+    )
+    result = runner.invoke(app, ["task", "import", str(source), "--batch-size", "1"])
+    assert result.exit_code == 0
+    assert "Imported 2 tasks" in result.output
+
+    target = tmp_path / "tasks.csv"
+    result = runner.invoke(app, ["task", "export", str(target)])
+    assert result.exit_code == 0
+    exported = target.read_text()
+    assert exported.startswith("id,title,description,due_date")
+    assert "Imported A,,2099-01-01T00:00:00,high,pending,Imports" in exported
+    assert "Imported B,,,,completed" in exported
+
+    result = runner.invoke(app, ["task", "import", str(target)])
+    assert result.exit_code == 0
+    assert "Imported 2 tasks" in result.output
+
+    result = runner.invoke(app, ["task", "import", str(tmp_path / "missing.csv")])
+    assert result.exit_code == 1 and "Cannot read" in result.output
+    orphan = tmp_path / "orphan.ndjson"
+    orphan.write_text('{"title": "Orphan", "user_id": 987654}\n')
+    result = runner.invoke(app, ["task", "import", str(orphan)])
+    assert result.exit_code == 1 and "FOREIGN KEY" in result.output
+
+def test_task_list_pagination():
+    for title in ("Paged A", "Paged B", "Paged C"):
+        runner.invoke(app, ["task", "add", title, "--priority", "low"])
+
+    result = runner.invoke(app, ["task", "list", "--page-size", "2"])
+    assert result.exit_code == 0
+    assert "More tasks available: --after " in result.output
+    cursor = result.output.split("--after ")[1].split()[0]
+
+    result = runner.invoke(app, ["task", "list", "--page-size", "2", "--after", cursor])
+    assert result.exit_code == 0
+
+    result = runner.invoke(app, ["task", "list", "--all", "--page-size", "2", "--sort", "due_date"])
+    assert result.exit_code == 0
+    for title in ("Paged A", "Paged B", "Paged C"):
+        assert title in result.output
+
+    result = runner.invoke(app, ["task", "list", "--after", "bogus"])
+    assert result.exit_code == 1
+
+def test_db_explain():
+    result = runner.invoke(app, ["db", "explain"])
+    assert result.exit_code == 0
+    assert "check_due_tasks" in result.output
+    assert "USING INDEX ix_tasks_reminder_due" in result.output
+
+def test_worker_run_once():
+    result = runner.invoke(app, ["worker", "run", "--once", "--batch-size", "10"])
+    assert result.exit_code == 0
+    assert "sweep 1:" in result.output
+
+def test_task_batch_commands():
+    ids = []
+    for title in ("Batch A", "Batch B", "Batch C", "Batch D"):
+        result = runner.invoke(app, ["task", "add", title, "--due-date", "2001-01-01"])
+        ids.append(int(result.output.rsplit(":", 1)[1]))
+
+    result = runner.invoke(app, ["task", "update", f"{ids[0]},{ids[1]}", "--priority", "high"])
+    assert result.exit_code == 0
+    assert "Updated 2 tasks" in result.output
+
+    # A single ID keeps the old behaviour: no options is a no-op, not an error.
+    result = runner.invoke(app, ["task", "update", str(ids[0])])
+    assert result.exit_code == 0
+    assert "updated successfully" in result.output
+    result = runner.invoke(app, ["task", "update", "999999", "--priority", "low"])
+    assert result.exit_code == 1
+    assert "not found" in result.output
+    result = runner.invoke(app, ["task", "update", f"{ids[0]},{ids[1]}"])
+    assert result.exit_code == 1
+    assert "Nothing to update" in result.output
+
+    result = runner.invoke(app, ["task", "complete", f"{ids[0]}-{ids[2]}"])
+    assert result.exit_code == 0
+    assert "Completed 3 tasks" in result.output
+
+    result = runner.invoke(app, ["task", "delete", "--where-status", "completed", "--due-before", "2002-01-01"])
+    assert result.exit_code == 0
+    assert "Deleted 3 tasks" in result.output
+
+    result = runner.invoke(app, ["task", "delete", str(ids[3])])
+    assert "deleted successfully" in result.output
+
+    result = runner.invoke(app, ["task", "delete"])
+    assert result.exit_code == 1
+
+    result = runner.invoke(app, ["task", "complete", "x-y"])
+    assert result.exit_code == 2
+
+def test_task_search():
+    result = runner.invoke(app, ["task", "add", "Ficus", "--description", "plants on the balcony"])
+    task_id = result.output.split("ID: ")[1].strip()
+    result = runner.invoke(app, ["task", "search", "balc"])
+    assert result.exit_code == 0
+    assert "Ficus" in result.output
+    assert f" {task_id} " in result.output
+
+    result = runner.invoke(app, ["task", "search", "nothing-matches-this"])
+    assert "No tasks match" in result.output
+
+def test_task_stats():
+    runner.invoke(app, ["task", "add", "Counted", "--priority", "high"])
+    result = runner.invoke(app, ["task", "stats", "--by", "priority", "--format", "json"])
+    assert result.exit_code == 0
+    stats = json.loads(result.output)
+    assert stats["group_by"] == ["priority"]
+    assert stats["total"] == sum(group["count"] for group in stats["groups"])
+    assert any(group["priority"] == "high" for group in stats["groups"])
+
+    result = runner.invoke(app, ["task", "stats", "--by", "status", "--by", "overdue"])
+    assert result.exit_code == 0
+    assert "Task statistics" in result.output
+
+def test_rebuild_and_check_stats():
+    result = runner.invoke(app, ["db", "rebuild-stats"])
+    assert result.exit_code == 0
+    result = runner.invoke(app, ["db", "check-stats"])
+    assert result.exit_code == 0
+    assert "consistent" in result.output
+
+    summary = runner.invoke(app, ["task", "stats", "--by", "status", "--format", "json"])
+    scanned = runner.invoke(app, ["task", "stats", "--by", "status", "--format", "json", "--scan"])
+    assert json.loads(summary.output) == json.loads(scanned.output)
+
+def test_task_list_streaming_formats():
+    for title in ("Stream A", "Stream B", "Stream C"):
+        runner.invoke(app, ["task", "add", title, "--description", "tab\there"])
+
+    # CliRunner's stdout is not a terminal, so the default is tsv.
+    result = runner.invoke(app, ["task", "list", "--all", "--status", "pending"])
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[0].split("\t") == ["id", "title", "description", "due_date", "priority", "status", "category"]
+    assert any(line.split("\t")[1:3] == ["Stream B", "tab\\there"] for line in lines[1:])
+
+    result = runner.invoke(app, ["task", "list", "--format", "ndjson", "--all"])
+    rows = [json.loads(line) for line in result.output.splitlines()]
+    assert {"Stream A", "Stream B", "Stream C"} <= {row["title"] for row in rows}
+
+    result = runner.invoke(app, ["task", "list", "--format", "plain", "--page-size", "1"])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[0].split()[:2] == ["Id", "Title"]
+    cursor = result.output.split("--after ")[1].split()[0]
+    result = runner.invoke(app, ["task", "list", "--format", "ndjson", "--page-size", "1", "--after", cursor])
+    assert json.loads(result.output.splitlines()[0])["id"] > rows[0]["id"]
+
+    result = runner.invoke(app, ["task", "list", "--format", "table", "--page-size", "1"])
+    assert "┃ ID" in result.output
+
+def test_task_next():
+    runner.invoke(app, ["task", "add", "Next up", "--priority", "high", "--due-date", "2000-01-01"])
+    result = runner.invoke(app, ["task", "next", "--limit", "1"])
+    assert result.exit_code == 0
+    assert "Next up" in result.output and "Score" in result.output
+
+    result = runner.invoke(app, ["db", "rerank"])
+    assert result.exit_code == 0
+    assert "Next up" in runner.invoke(app, ["task", "next", "-n", "1"]).output
+
@@ -6,13 +6,20 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from task_manager.models import Base, User, Task, Category, Priority, Status
+from task_manager.models import Base, User, Task, TaskCount, Category, Priority, SessionToken, Status
 from task_manager.crud import (
     create_user, get_user_by_username, create_task, get_task, update_task, delete_task,
     create_category, get_category, update_category, delete_category,
-    update_user, delete_user
+    update_user, delete_user, bulk_create_tasks, iter_tasks,
+    get_tasks_page, iter_task_pages, get_tasks, TASK_LIST_COLUMNS,
+    bulk_update_tasks, bulk_delete_tasks, complete_tasks, search_tasks,
+    get_categories, get_category_names, lookup_cache, task_stats,
+    rebuild_task_counts, check_task_counts, iter_task_rows, encode_cursor,
+    create_session, validate_session, revoke_session, revoke_user_sessions, purge_expired_sessions,
+    session_cache, next_tasks, rebuild_task_rank, PENDING_LITERAL
 )
-from task_manager.worker import check_due_tasks
+from task_manager.worker import check_due_tasks, due_tasks_query, run_worker, WorkerMetrics
+from task_manager.database import explain_query_plan
 
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
@@ -90,3 +97,400 @@ def test_check_due_tasks(db, capsys):
     # Verify reminder_sent is set
     updated_task = get_task(db, task.id)
     assert updated_task.reminder_sent is True
+
+def test_bulk_create_tasks(db):
+    existing = create_category(db, "Bulk")
+    rows = (
+        {"title": f"Bulk {i}", "priority": "low", "category": "Bulk" if i % 2 else "Imported"}
+        for i in range(25)
+    )
+    assert bulk_create_tasks(db, rows, batch_size=10) == 25
+    exported = [row for row in iter_tasks(db, batch_size=7) if row["title"].startswith("Bulk ")]
+    assert len(exported) == 25
+    assert {row["category"] for row in exported} == {"Bulk", "Imported"}
+    assert all(row["priority"] == Priority.LOW for row in exported)
+    assert all(row["status"] == Status.PENDING for row in exported)
+    assert db.query(Category).filter(Category.name == "Bulk").one().id == existing.id
+    assert db.query(Category).filter(Category.name == "Imported").count() == 1
+
+def test_bulk_create_tasks_rolls_back_failed_batch(db):
+    before = db.query(Task).count()
+    rows = [{"title": "Good"}, {"title": "Bad", "priority": "urgent"}]
+    with pytest.raises(ValueError):
+        bulk_create_tasks(db, rows, batch_size=10)
+    assert db.query(Task).count() == before
+
+def test_get_tasks_page_keyset(db):
+    user = create_user(db, "pageuser", "passhash")
+    base = datetime(2030, 1, 1)
+    rows = [
+        {"title": f"Page {i}", "user_id": user.id,
+         "due_date": None if i % 3 == 0 else base + timedelta(days=i % 4)}
+        for i in range(10)
+    ]
+    bulk_create_tasks(db, rows)
+
+    for sort in ("id", "due_date"):
+        seen, cursor = [], None
+        while True:
+            tasks, cursor = get_tasks_page(db, page_size=3, after=cursor, sort=sort, user_id=user.id)
+            seen.extend(tasks)
+            if cursor is None:
+                break
+        assert len(seen) == 10
+        assert len({task.id for task in seen}) == 10
+        if sort == "due_date":
+            keys = [(task.due_date is None, task.due_date or base, task.id) for task in seen]
+            assert keys == sorted(keys)
+        else:
+            assert [task.id for task in seen] == sorted(task.id for task in seen)
+
+    pages = list(iter_task_pages(db, page_size=4, user_id=user.id))
+    assert [len(page) for page in pages] == [4, 4, 2]
+
+def test_get_tasks_page_rejects_bad_cursor(db):
+    _, cursor = get_tasks_page(db, page_size=1)
+    with pytest.raises(ValueError):
+        get_tasks_page(db, after=cursor, sort="due_date")
+    with pytest.raises(ValueError):
+        get_tasks_page(db, after="not-a-cursor")
+
+def _count_statements(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+@pytest.mark.parametrize("load", ["joined", "selectin"])
+def test_task_listing_statement_count_is_constant(db, load):
+    user_id = create_user(db, f"n1user-{load}", "passhash").id
+
+    def render(limit):
+        db.expire_all()
+        tasks = get_tasks(db, limit=limit, user_id=user_id, load=load, columns=TASK_LIST_COLUMNS)
+        assert len(tasks) == limit
+        return [(task.title, task.category.name if task.category else "") for task in tasks]
+
+    rows = [{"title": f"N1 {i}", "user_id": user_id, "category": f"N1 cat {i % 7}"} for i in range(60)]
+    bulk_create_tasks(db, rows)
+
+    small = _count_statements(lambda: render(5))
+    large = _count_statements(lambda: render(60))
+    assert small == large
+    assert large <= 2
+
+def test_hot_queries_use_indexes(db):
+    queries = {
+        "ix_tasks_reminder_due": due_tasks_query(db, datetime.utcnow()),
+        "ix_tasks_user_status": db.query(Task).filter(Task.user_id == 1, Task.status == Status.PENDING),
+        "ix_tasks_status_due_date": db.query(Task).filter(Task.status == Status.PENDING),
+        "ix_tasks_pending_rank": db.query(Task).filter(PENDING_LITERAL).order_by(Task.rank.desc(), Task.id.desc()),
+        "ix_tasks_user_pending_rank": db.query(Task).filter(PENDING_LITERAL, Task.user_id == 1)
+                                        .order_by(Task.rank.desc(), Task.id.desc()),
+    }
+    for index, query in queries.items():
+        compiled = query.statement.compile(engine)
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        plan = explain_query_plan(db, str(compiled), params)
+        assert any(f"USING INDEX {index}" in detail for detail in plan), plan
+
+def test_check_due_tasks_in_batches(db, capsys):
+    with_email = create_user(db, "batchmail", "passhash")
+    with_email.email = "batch@example.com"
+    without_email = create_user(db, "batchnomail", "passhash")
+    past = datetime.utcnow() - timedelta(hours=1)
+    bulk_create_tasks(db, [
+        {"title": f"Batch {i}", "due_date": past + timedelta(seconds=i),
+         "user_id": with_email.id if i % 2 else without_email.id}
+        for i in range(23)
+    ])
+    capsys.readouterr()
+
+    updates = []
+    listener = lambda *args: args[2].startswith("UPDATE") and updates.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        metrics = WorkerMetrics()
+        sent = check_due_tasks(db, batch_size=5, metrics=metrics)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert sent == 11
+    assert metrics.reminders_sent == 11
+    assert metrics.batches == 5
+    assert len(updates) == 5
+    assert metrics.max_lag_seconds >= 3600 - 30
+    assert capsys.readouterr().out.count("batch@example.com") == 11
+    remaining = due_tasks_query(db, datetime.utcnow()).filter(Task.title.like("Batch %")).count()
+    assert remaining == 12
+
+def test_run_worker_stops_after_sweep(db):
+    import threading
+    stop = threading.Event()
+    sweeps = []
+
+    def on_sweep(metrics):
+        sweeps.append(metrics.sweeps)
+        stop.set()
+
+    metrics = run_worker(db, max_sleep=0.01, stop=stop, on_sweep=on_sweep)
+    assert sweeps == [1]
+    assert metrics.sweeps == 1
+
+def test_worker_only_marks_delivered_reminders(db):
+    from task_manager.senders import AsyncSMTPSender
+    from task_manager.smtp_sink import SMTPSink
+
+    good = create_user(db, "smtpgood", "passhash")
+    good.email = "good@example.com"
+    bad = create_user(db, "smtpbad", "passhash")
+    bad.email = "bad@example.com"
+    past = datetime.utcnow() - timedelta(minutes=5)
+    good_task = create_task(db, "SMTP good", None, past, Priority.LOW, None, Status.PENDING, good.id)
+    bad_task = create_task(db, "SMTP bad", None, past, Priority.LOW, None, Status.PENDING, bad.id)
+
+    with SMTPSink(reject={"bad@example.com"}) as sink:
+        sender = AsyncSMTPSender(sink.host, sink.port, "reminders@example.com", concurrency=2)
+        metrics = WorkerMetrics()
+        check_due_tasks(db, metrics=metrics, sender=sender)
+
+    assert get_task(db, good_task.id).reminder_sent is True
+    assert get_task(db, bad_task.id).reminder_sent is False
+    assert metrics.reminders_failed == 1
+
+def test_engine_performance_profile(tmp_path):
+    from sqlalchemy import text
+    from sqlalchemy.pool import QueuePool, StaticPool
+    from task_manager.database import create_db_engine
+
+    tuned = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile=True, echo=False)
+    with tuned.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    assert isinstance(tuned.pool, QueuePool)
+    assert tuned.echo is False
+    tuned.dispose()
+
+    memory = create_db_engine("sqlite:///:memory:", profile=True)
+    assert isinstance(memory.pool, StaticPool)
+    with memory.connect() as conn:
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -65536
+    memory.dispose()
+
+def test_bulk_task_operations(db):
+    user = create_user(db, "bulkopsuser", "passhash")
+    bulk_create_tasks(db, [
+        {"title": f"Sprint {i}", "user_id": user.id, "category": "Sprint" if i < 6 else "Backlog",
+         "due_date": datetime(2030, 1, 1) + timedelta(days=i)}
+        for i in range(10)
+    ])
+    ids = [task.id for task in get_tasks(db, user_id=user.id)]
+
+    assert bulk_update_tasks(db, {"priority": Priority.HIGH}, ids=ids[:2], id_ranges=[(ids[5], ids[6])]) == 4
+    assert complete_tasks(db, category="Sprint", user_id=user.id) == 6
+    assert complete_tasks(db, user_id=user.id, due_before=datetime(2030, 1, 9)) == 8
+    assert len(get_tasks(db, user_id=user.id, status=Status.COMPLETED)) == 8
+    assert bulk_delete_tasks(db, user_id=user.id, status=Status.COMPLETED) == 8
+    assert [task.title for task in get_tasks(db, user_id=user.id)] == ["Sprint 8", "Sprint 9"]
+
+    with pytest.raises(ValueError):
+        bulk_delete_tasks(db)
+    with pytest.raises(ValueError):
+        bulk_update_tasks(db, {}, ids=ids)
+
+def test_search_tasks(db):
+    user = create_user(db, "searchuser", "passhash")
+    bulk_create_tasks(db, [
+        {"title": "Renew passport", "description": "Bring photos", "user_id": user.id},
+        {"title": "Book photographer", "description": "Wedding passport photos", "user_id": user.id},
+        {"title": "Café with Zoë", "status": "completed", "user_id": user.id},
+    ])
+
+    results = search_tasks(db, "passport", user_id=user.id)
+    assert [task.title for task, _ in results] == ["Renew passport", "Book photographer"]
+    assert [task.title for task, _ in search_tasks(db, "photo", user_id=user.id)] == [
+        "Book photographer", "Renew passport"]
+    assert search_tasks(db, "photo", user_id=user.id, prefix=False) == []
+    assert [task.title for task, _ in search_tasks(db, "cafe zoe", user_id=user.id)] == ["Café with Zoë"]
+    assert search_tasks(db, "cafe", user_id=user.id, status=Status.PENDING) == []
+
+    task = results[0][0]
+    update_task(db, task.id, title="Renew driving licence")
+    assert [t.title for t, _ in search_tasks(db, "licence")] == ["Renew driving licence"]
+    delete_task(db, task.id)
+    assert search_tasks(db, "licence") == []
+
+    with pytest.raises(ValueError):
+        search_tasks(db, "AND OR", raw=True)
+
+def test_lookup_cache_serves_hits_and_invalidates_on_writes(db):
+    category = create_category(db, "Cached")
+    user = create_user(db, "cacheduser", "passhash")
+    get_category(db, category.id)
+    get_user_by_username(db, "cacheduser")
+
+    hits = lookup_cache.hits
+    assert _count_statements(lambda: get_category(db, category.id)) == 0
+    assert _count_statements(lambda: get_user_by_username(db, "cacheduser")) == 0
+    assert lookup_cache.hits == hits + 2
+    assert get_category(db, category.id) is category
+
+    update_category(db, category.id, "Renamed")
+    db.expunge(category)
+    assert get_category(db, category.id).name == "Renamed"
+    assert get_category_names(db)[category.id] == "Renamed"
+    assert "Renamed" in [c.name for c in get_categories(db)]
+
+    update_user(db, user.id, username="cacheduser2")
+    assert get_user_by_username(db, "cacheduser") is None
+    assert get_user_by_username(db, "cacheduser2").id == user.id
+
+    delete_category(db, category.id)
+    assert get_category(db, category.id) is None
+    assert category.id not in get_category_names(db)
+
+def test_task_stats_groups_in_sql(db):
+    user = create_user(db, "statsuser", "passhash")
+    category = create_category(db, "Stats")
+    now = datetime(2026, 6, 15)
+    bulk_create_tasks(db, [
+        {"title": "late", "due_date": now - timedelta(days=10), "priority": "high",
+         "category_id": category.id, "user_id": user.id, "created_at": now - timedelta(days=40)},
+        {"title": "soon", "due_date": now + timedelta(days=2), "priority": "high", "user_id": user.id,
+         "created_at": now - timedelta(days=5)},
+        {"title": "done", "due_date": now - timedelta(days=1), "status": "completed",
+         "category_id": category.id, "user_id": user.id, "created_at": now - timedelta(days=5)},
+        {"title": "open", "user_id": user.id, "created_at": now - timedelta(days=1)},
+    ])
+
+    assert task_stats(db, ["status"], user_id=user.id) == [
+        {"status": "completed", "count": 1}, {"status": "pending", "count": 3},
+    ]
+    assert task_stats(db, ["overdue"], user_id=user.id, now=now) == [
+        {"overdue": "overdue > 7 days", "count": 1}, {"overdue": "due within 7 days", "count": 1},
+        {"overdue": "no due date", "count": 1}, {"overdue": "completed", "count": 1},
+    ]
+    assert task_stats(db, ["category", "priority"], user_id=user.id, since=now - timedelta(days=7)) == [
+        {"category": "Stats", "priority": None, "count": 1},
+        {"category": None, "priority": "high", "count": 1},
+        {"category": None, "priority": None, "count": 1},
+    ]
+    assert task_stats(db, ["user"], user_id=user.id, until=now - timedelta(days=7), date_field="created") == [
+        {"user": "statsuser", "count": 1},
+    ]
+    assert task_stats(db, ["status"], since=now - timedelta(days=7), until=now) == [
+        {"status": "completed", "count": 1}, {"status": "pending", "count": 2},
+    ]
+    assert _count_statements(lambda: task_stats(db, ["status", "priority"])) == 1
+
+    with pytest.raises(ValueError):
+        task_stats(db, ["colour"])
+
+def test_task_counts_follow_writes(db):
+    user = create_user(db, "countuser", "passhash")
+    category = create_category(db, "Counted")
+    bulk_create_tasks(db, [
+        {"title": f"count {i}", "priority": "low", "user_id": user.id} for i in range(5)
+    ])
+    task = create_task(db, "moved", None, None, Priority.HIGH, category.id, user_id=user.id)
+    update_task(db, task.id, status=Status.COMPLETED, category_id=None)
+    bulk_update_tasks(db, {"priority": Priority.MEDIUM}, user_id=user.id, status=Status.PENDING)
+    complete_tasks(db, user_id=user.id, ids=[task.id - 1])
+    delete_task(db, task.id - 2)
+
+    assert check_task_counts(db) == []
+    for group_by in (["status"], ["priority", "category"], ["user", "status"]):
+        assert task_stats(db, group_by, user_id=user.id) == task_stats(
+            db, group_by, user_id=user.id, use_summary=False)
+    assert task_stats(db, ["status", "priority"], user_id=user.id) == [
+        {"status": "completed", "priority": "high", "count": 1},
+        {"status": "completed", "priority": "medium", "count": 1},
+        {"status": "pending", "priority": "medium", "count": 3},
+    ]
+    assert _count_statements(lambda: task_stats(db, ["status"], user_id=user.id)) == 1
+
+    db.query(TaskCount).filter(TaskCount.user_id == user.id).delete()
+    db.commit()
+    assert {m["expected"] - m["actual"] for m in check_task_counts(db)} == {1, 3}
+    rebuild_task_counts(db)
+    assert check_task_counts(db) == []
+
+def test_iter_task_rows_matches_pages(db):
+    user = create_user(db, "streamuser", "passhash")
+    bulk_create_tasks(db, [
+        {"title": f"stream {i}", "user_id": user.id,
+         "due_date": datetime(2026, 1, 1) + timedelta(days=i % 3) if i % 4 else None}
+        for i in range(10)
+    ])
+    for sort in ("id", "due_date"):
+        paged = [task.id for page in iter_task_pages(db, 3, sort=sort, user_id=user.id) for task in page]
+        streamed = [row.id for row in iter_task_rows(db, sort=sort, user_id=user.id, batch_size=4)]
+        assert streamed == paged
+
+        rows = list(iter_task_rows(db, sort=sort, user_id=user.id, limit=4))
+        rest = [row.id for row in iter_task_rows(db, sort=sort, user_id=user.id,
+                                                  after=encode_cursor(sort, rows[-1]))]
+        assert [row.id for row in rows] + rest == paged
+
+def test_session_tokens(db):
+    user = create_user(db, "sessionuser", "passhash")
+    token, expires_at = create_session(db, user.id, ttl=3600)
+    assert db.query(SessionToken).filter(SessionToken.user_id == user.id).one().token_hash != token
+
+    assert validate_session(db, token) == user.id
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert validate_session(db, token) == user.id
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert statements == []  # served from session_cache
+    assert validate_session(db, token, now=expires_at) is None
+    assert validate_session(db, "not-a-token") is None
+
+    assert revoke_session(db, token)
+    assert validate_session(db, token) is None
+    assert not revoke_session(db, token)
+
+    now = datetime.utcnow()
+    live, _ = create_session(db, user.id, ttl=3600)
+    for _ in range(5):
+        create_session(db, user.id, ttl=60, now=now - timedelta(hours=1))
+    assert purge_expired_sessions(db, batch_size=2) == 5
+    assert validate_session(db, live) == user.id
+    assert revoke_user_sessions(db, user.id) == 1
+    assert validate_session(db, live) is None
+
+    create_session(db, user.id)
+    delete_user(db, user.id)  # ON DELETE CASCADE
+    assert db.query(SessionToken).filter(SessionToken.user_id == user.id).count() == 0
+    assert len(session_cache) == 0
+
+def test_next_tasks_rank_by_score(db):
+    db.query(Task).delete()
+    db.commit()
+    now = datetime.utcnow()
+    overdue = create_task(db, "Overdue", None, now - timedelta(days=3), Priority.LOW)
+    urgent = create_task(db, "Urgent", None, now + timedelta(days=1), Priority.HIGH)
+    someday = create_task(db, "Someday", None, None, Priority.MEDIUM)
+    later = create_task(db, "Later", None, now + timedelta(days=60), Priority.HIGH)
+    done = create_task(db, "Done", None, now - timedelta(days=30), Priority.HIGH, status=Status.COMPLETED)
+
+    ranked = next_tasks(db, limit=3, now=now)
+    # high 14 + 1 day out -> 13; low 0 + 3 days late -> 3; medium 7, due 14 days after creation -> -7
+    assert [task.id for task, _ in ranked] == [urgent.id, overdue.id, someday.id]
+    assert [round(score) for _, score in ranked] == [13, 3, -7]
+    assert done.id not in [task.id for task, _ in next_tasks(db, limit=10)]
+
+    update_task(db, later.id, due_date=now - timedelta(days=10))
+    assert next_tasks(db, limit=1, now=now)[0][0].id == later.id
+    rebuild_task_rank(db)
+    assert [task.id for task, _ in next_tasks(db, limit=2, now=now)] == [later.id, urgent.id]
+
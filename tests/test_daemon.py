@@ -0,0 +1,133 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from task_manager.client import DEFAULT_SOCKET, DaemonClient, _socket_option, main
+from task_manager.daemon import TaskManagerDaemon
+from task_manager.database import init_db
+
+
+@pytest.fixture(scope="module")
+def daemon(tmp_path_factory):
+    init_db()
+    socket_path = str(tmp_path_factory.mktemp("daemon") / "task-manager.sock")
+    daemon = TaskManagerDaemon(socket_path, max_wait=0.05)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    while daemon.server is None:
+        pass
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+
+
+def test_daemon_runs_commands(daemon):
+    with DaemonClient(daemon.socket_path) as client:
+        exit_code, output = client.run(["task", "add", "Daemon task", "--priority", "high"])
+        assert exit_code == 0
+        task_id = int(output.rsplit(":", 1)[1])
+
+        exit_code, output = client.run(["task", "show", str(task_id)])
+        assert exit_code == 0
+        assert "Daemon task" in output
+
+        exit_code, output = client.run(["task", "add"])
+        assert exit_code == 2
+        assert "Missing argument" in output
+
+        exit_code, output = client.run(["task", "show", "999999"])
+        assert exit_code == 1
+
+
+def test_token_comes_from_the_caller_not_the_daemon(daemon, monkeypatch):
+    from task_manager.crud import create_session, create_user, get_task
+    from task_manager.database import SessionLocal
+
+    db = SessionLocal()
+    user = create_user(db, "daemon-token-user", "x")
+    token = create_session(db, user.id)[0]
+    monkeypatch.setenv("TASK_MANAGER_TOKEN", "the daemon's own, never used")
+    with DaemonClient(daemon.socket_path) as client:
+        exit_code, output = client.run(["task", "add", "Token task"], env={"TASK_MANAGER_TOKEN": token})
+        assert exit_code == 0
+        assert get_task(db, int(output.rsplit(":", 1)[1])).user_id == user.id
+
+        exit_code, output = client.run(["task", "list"], env={"TASK_MANAGER_TOKEN": "bogus"})
+        assert exit_code == 1 and "Invalid or expired session token" in output
+        assert client.run(["task", "list"])[0] == 0
+    db.close()
+
+
+def test_output_format_follows_the_client_terminal(daemon):
+    with DaemonClient(daemon.socket_path) as client:
+        client.run(["task", "add", "Format probe"])
+        exit_code, output = client.run(["task", "list"])
+        assert exit_code == 0 and "\t" in output and "┏" not in output
+        exit_code, output = client.run(["task", "list"], isatty=True)
+        assert exit_code == 0 and "┏" in output and "\t" not in output
+
+
+def test_file_commands_run_in_the_callers_directory(daemon, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit) as exc:
+        main(["--socket", daemon.socket_path, "task", "export", "tasks.csv"])
+    assert exc.value.code == 0
+    assert (tmp_path / "tasks.csv").read_text().startswith("id,")
+
+
+def test_parse_add_falls_back_only_on_bad_arguments(daemon, monkeypatch):
+    assert daemon._parse_add(["Fast", "--due-date", "2030-01-02"])["due_date"] == datetime(2030, 1, 2)
+    assert daemon._parse_add(["Bad date", "--due-date", "tomorrow"]) is None
+    assert daemon._parse_add(["--no-such-option"]) is None
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("a bug, not a usage error")
+    monkeypatch.setattr(daemon.add_command, "make_context", broken)
+    with pytest.raises(RuntimeError):
+        daemon._parse_add(["Fast"])
+
+
+def test_client_socket_option(capsys):
+    assert _socket_option(["task", "list"]) == (DEFAULT_SOCKET, ["task", "list"])
+    assert _socket_option(["--socket", "/tmp/a.sock", "task", "list"]) == ("/tmp/a.sock", ["task", "list"])
+    assert _socket_option(["--socket=/tmp/a.sock", "task", "list"]) == ("/tmp/a.sock", ["task", "list"])
+    for argv in (["--socket"], ["--socket="]):
+        with pytest.raises(SystemExit) as exc:
+            _socket_option(argv)
+        assert exc.value.code == 2
+    assert "requires an argument" in capsys.readouterr().err
+
+
+def test_daemon_group_commits_concurrent_adds(daemon):
+    ids = []
+    commits_before = daemon.committer.commits
+
+    def add(i):
+        with DaemonClient(daemon.socket_path) as client:
+            exit_code, output = client.run(["task", "add", f"Concurrent {i}"])
+            assert exit_code == 0
+            ids.append(int(output.rsplit(":", 1)[1]))
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == 20
+    assert daemon.committer.commits - commits_before < 20
+
+
+def test_remote_write_queue(daemon):
+    from task_manager.write_queue import RemoteWriteQueue
+
+    with RemoteWriteQueue(daemon.socket_path) as writes:
+        task_id = writes.submit("create_task", title="Remote", due_date=datetime(2030, 1, 2))
+        assert writes.submit("update_task", task_id=task_id, title="Remote, renamed") is True
+        with pytest.raises(RuntimeError, match="Unknown write operation"):
+            writes.submit("drop_everything")
+
+    with DaemonClient(daemon.socket_path) as client:
+        exit_code, output = client.run(["task", "show", str(task_id)])
+    assert "Remote, renamed" in output and "2030-01-02" in output
@@ -0,0 +1,56 @@
+import logging
+
+from sqlalchemy import text
+from typer.testing import CliRunner
+
+from task_manager.cli import app
+from task_manager.database import create_db_engine, init_db
+from task_manager.instrumentation import QueryStats, instrument_engine, prometheus_text, write_prometheus
+from task_manager.worker import WorkerMetrics
+
+
+def test_instrument_engine_records_and_detaches(caplog):
+    engine = create_db_engine("sqlite://", echo=False)
+    stats = QueryStats()
+    remove = instrument_engine(engine, stats, slow_ms=0)
+    with caplog.at_level(logging.WARNING, logger="task_manager.sql.slow"), engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1), (2), (3)"))
+        conn.execute(text("SELECT x FROM t")).all()
+    assert stats.calls == 3
+    assert stats.statements["INSERT INTO t VALUES (1), (2), (3)"].rows == 3
+    assert sum(stats.histograms["select"]) == 1
+    assert any("slow query" in record.message for record in caplog.records)
+
+    remove()
+    with engine.begin() as conn:
+        conn.execute(text("SELECT 1"))
+    assert stats.calls == 3
+    engine.dispose()
+
+
+def test_prometheus_export(tmp_path):
+    stats = QueryStats()
+    stats.record("SELECT 1", 0.002, -1)
+    stats.record("UPDATE tasks SET x = 1", 2.0, 4)
+    metrics = WorkerMetrics()
+    metrics.sweeps = 3
+    body = prometheus_text(metrics, stats)
+    assert "task_manager_worker_sweeps_total 3" in body
+    assert 'task_manager_sql_duration_seconds_bucket{kind="select",le="0.001"} 0' in body
+    assert 'task_manager_sql_duration_seconds_bucket{kind="select",le="0.005"} 1' in body
+    assert 'task_manager_sql_duration_seconds_bucket{kind="update",le="+Inf"} 1' in body
+    assert 'task_manager_sql_duration_seconds_count{kind="update"} 1' in body
+
+    path = tmp_path / "worker.prom"
+    write_prometheus(str(path), metrics, stats)
+    assert path.read_text() == body
+    assert [entry.name for entry in tmp_path.iterdir()] == ["worker.prom"]
+
+
+def test_profile_option():
+    init_db()
+    result = CliRunner().invoke(app, ["--profile", "task", "list", "--format", "tsv"])
+    assert result.exit_code == 0
+    assert "task list:" in result.output and "SQL statements" in result.output
+    assert "SELECT" in result.output
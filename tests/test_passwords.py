@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from task_manager.passwords import (
+    SCHEMES, calibrate, default_params, hash_password, needs_rehash, parse_hash, verify_password,
+)
+
+# Cheap costs keep the suite fast; the format is the same at any cost.
+CHEAP = {"scrypt": {"n": 1024}, "pbkdf2_sha256": {"i": 1000}}
+
+
+@pytest.mark.parametrize("scheme", SCHEMES)
+def test_hash_round_trip(scheme):
+    first = hash_password("s3cret", scheme, **CHEAP[scheme])
+    second = hash_password("s3cret", scheme, **CHEAP[scheme])
+    assert first.startswith(scheme + "$") and first != second  # salted
+    assert verify_password("s3cret", first) and verify_password("s3cret", second)
+    assert not verify_password("s3cret!", first)
+    assert parse_hash(first)[1] == dict(default_params(scheme), **CHEAP[scheme])
+
+
+def test_needs_rehash():
+    legacy = "5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8"  # sha256("password")
+    assert verify_password("password", legacy) and needs_rehash(legacy)
+    assert needs_rehash(hash_password("pw", "scrypt", n=1024))
+    assert needs_rehash(hash_password("pw", "scrypt"), scheme="pbkdf2_sha256")
+    assert not needs_rehash(hash_password("pw"))
+    assert not verify_password("pw", "not a hash") and needs_rehash("not a hash")
+
+
+def test_calibrate_stops_at_target():
+    # A fake clock under which each doubling of the cost doubles the time.
+    times = iter([0.0, 0.010, 0.0, 0.020, 0.0, 0.040, 0.0, 0.080])
+    params, elapsed = calibrate(50, "pbkdf2_sha256", clock=lambda: next(times))
+    assert params == {"i": 40_000} and elapsed == pytest.approx(40)
+
+
+@pytest.mark.parametrize("variable, value", [
+    ("PASSWORD_SCRYPT_N", "1000"), ("PASSWORD_SCRYPT_N", "1"), ("PASSWORD_SCRYPT_R", "0"), ("PASSWORD_SCRYPT_P", "-1"),
+])
+def test_invalid_scrypt_cost_fails_at_startup(variable, value):
+    result = subprocess.run([sys.executable, "-c", "import task_manager.config"],
+                            cwd=os.path.join(os.path.dirname(__file__), ".."), capture_output=True, text=True,
+                            env=dict(os.environ, **{variable: value}))
+    assert result.returncode != 0
+    assert "ValueError: PASSWORD_SCRYPT_" in result.stderr
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from typer.testing import CliRunner
+
+from task_manager import crud
+from task_manager.cli import app
+from task_manager.database import SessionLocal, init_db
+from task_manager.models import Task
+from task_manager.recurrence import describe, nth_occurrence, occurrence, occurrences
+
+
+def rule(frequency, starts_at, interval=1, until=None, count=None):
+    return SimpleNamespace(frequency=frequency, interval=interval, starts_at=starts_at, until=until, count=count)
+
+
+def test_occurrences_follow_the_rule():
+    assert nth_occurrence("weekly", 2, datetime(2030, 1, 1), 3) == datetime(2030, 2, 12)
+    monthly = rule("monthly", datetime(2030, 1, 31, 9, 0))
+    assert [due for _, due in occurrences(monthly, through=datetime(2030, 5, 1))] == [
+        datetime(2030, 1, 31, 9), datetime(2030, 2, 28, 9), datetime(2030, 3, 31, 9), datetime(2030, 4, 30, 9)]
+    assert nth_occurrence("monthly", 1, datetime(2031, 12, 31), 2) == datetime(2032, 2, 29)
+
+    limited = rule("daily", datetime(2030, 1, 1), count=3)
+    assert [n for n, _ in occurrences(limited)] == [0, 1, 2] and occurrence(limited, 3) is None
+    assert list(occurrences(rule("daily", datetime(2030, 1, 1), until=datetime(2030, 1, 2)), start=1)) == [
+        (1, datetime(2030, 1, 2))]
+    assert describe(rule("weekly", datetime(2030, 1, 1), interval=2, count=10)) == "every 2 weeks, 10 times"
+
+
+def test_occurrences_are_materialized_lazily():
+    init_db()
+    db = SessionLocal()
+    now = datetime(2030, 6, 1)
+    series = crud.create_task_series(db, "Water plants", None, now, "low", "daily", now=now)
+    weekly = crud.create_task_series(db, "Review", None, now + timedelta(days=30), "low", "weekly", count=2, now=now)
+
+    def stored(series_id):
+        return db.query(Task).filter(Task.series_id == series_id).order_by(Task.due_date).all()
+
+    # The window (7 days) is materialized; a series starting later gets its first occurrence only.
+    assert [task.due_date for task in stored(series.id)] == [now + timedelta(days=day) for day in range(8)]
+    assert len(stored(weekly.id)) == 1
+    assert crud.materialize_occurrences(db, now=now) == 0
+    assert crud.materialize_occurrences(db, now=now + timedelta(days=2)) == 2
+
+    # A year of the daily series lists 366 occurrences from 10 stored rows.
+    year = crud.series_occurrences(db, series.id, now + timedelta(days=365))
+    assert len(year) == 366 and [task for _, task in year if task] == stored(series.id)
+    assert [due for due, _ in year] == sorted(due for due, _ in year)
+
+    # Completing the only occurrence materializes the next one, and no more.
+    first = stored(weekly.id)[0]
+    crud.update_task(db, first.id, status="completed")
+    assert [task.due_date for task in stored(weekly.id)] == [now + timedelta(days=30), now + timedelta(days=37)]
+    assert crud.complete_tasks(db, ids=[stored(weekly.id)[1].id]) == 1
+    assert len(stored(weekly.id)) == 2 and crud.get_task_series(db, weekly.id).next_due is None
+
+    # Completing one of several pending occurrences creates nothing.
+    crud.update_task(db, stored(series.id)[0].id, status="completed")
+    assert len(stored(series.id)) == 10
+
+    assert crud.delete_task_series(db, series.id)
+    assert db.query(Task).filter(Task.title == "Water plants").count() == 1
+    db.close()
+
+
+def test_cli_adds_and_shows_recurring_tasks():
+    init_db()
+    runner = CliRunner()
+    result = runner.invoke(app, ["task", "add", "Pay rent", "--due-date", "2099-01-31", "--repeat", "monthly",
+                                 "--count", "12"])
+    assert result.exit_code == 0 and "every month, 12 times" in result.output
+    series_id = int(result.output.split("ID: ")[1].split()[0])
+
+    result = runner.invoke(app, ["task", "series-show", str(series_id), "--through", "2099-04-30"])
+    assert result.exit_code == 0
+    assert "2099-02-28" in result.output and "2099-04-30" in result.output and "upcoming" in result.output
+
+    result = runner.invoke(app, ["task", "add", "Oops", "--count", "3"])
+    assert result.exit_code == 1 and "need --repeat" in result.output
+
+    result = runner.invoke(app, ["task", "add", "Oops", "--repeat", "daily", "--status", "completed"])
+    assert result.exit_code == 2 and "--status" in result.output
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from task_manager.senders import (
+    AsyncSMTPSender, CallableSender, Reminder, ReminderSender, SMTPProtocolError, _SMTPConnection,
+)
+from task_manager.smtp_sink import SMTPSink
+
+
+def _reminders(count):
+    return [Reminder(i, f"user{i}@example.com", f"Task {i}") for i in range(count)]
+
+
+def test_async_sender_delivers_concurrently():
+    with SMTPSink(delay=0.001) as sink:
+        sender = AsyncSMTPSender(sink.host, sink.port, "reminders@example.com", concurrency=4)
+        delivered = sender.deliver(_reminders(20))
+    assert sorted(delivered) == list(range(20))
+    assert len(sink.messages) == 20
+    mail_from, rcpt_to, data = sink.messages[0]
+    assert mail_from == "reminders@example.com"
+    assert "Subject: Reminder: Task" in data
+
+
+def test_async_sender_retries_transient_and_skips_rejected():
+    with SMTPSink(transient_failures=3, reject={"user2@example.com"}) as sink:
+        sender = AsyncSMTPSender(sink.host, sink.port, "reminders@example.com",
+                                 concurrency=2, retries=3, backoff=0.001)
+        delivered = sender.deliver(_reminders(6))
+    assert sorted(delivered) == [0, 1, 3, 4, 5]
+    assert sorted(rcpt for _, (rcpt,), _ in sink.messages) == [
+        f"user{i}@example.com" for i in (0, 1, 3, 4, 5)
+    ]
+
+
+def test_async_sender_resets_before_retrying_a_refused_recipient():
+    # The sink answers a second MAIL FROM in one transaction with 503, as
+    # real servers do, so a retry without RSET would be rejected for good.
+    with SMTPSink(transient_rcpt_failures=2) as sink:
+        sender = AsyncSMTPSender(sink.host, sink.port, "reminders@example.com",
+                                 concurrency=1, retries=3, backoff=0.001)
+        delivered = sender.deliver(_reminders(2))
+    assert sorted(delivered) == [0, 1]
+
+
+def test_reminder_sender_is_abstract():
+    with pytest.raises(TypeError):
+        ReminderSender()
+
+
+def test_async_sender_reports_nothing_when_server_is_down():
+    with SMTPSink() as sink:
+        port = sink.port
+    sender = AsyncSMTPSender("127.0.0.1", port, "reminders@example.com", retries=1, backoff=0.001)
+    assert sender.deliver(_reminders(3)) == []
+
+
+def test_async_sender_keeps_title_out_of_headers():
+    with SMTPSink() as sink:
+        sender = AsyncSMTPSender(sink.host, sink.port, "reminders@example.com")
+        delivered = sender.deliver([Reminder(1, "user1@example.com", "Pay rent\nBcc: everyone@example.com")])
+    assert delivered == [1]
+    _, _, data = sink.messages[0]
+    headers = data.split("\n\n", 1)[0].splitlines()
+    assert "Subject: Reminder: Pay rent Bcc: everyone@example.com" in headers
+    assert not any(header.startswith("Bcc:") for header in headers)
+    assert 'Content-Type: text/plain; charset="utf-8"' in headers
+
+
+def test_malformed_reply_is_a_connection_error():
+    async def reply(data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await _SMTPConnection(reader, None, 1.0)._reply(250)
+
+    with pytest.raises(SMTPProtocolError):
+        asyncio.run(reply(b"hello\r\n"))
+    with pytest.raises(SMTPProtocolError):
+        asyncio.run(reply(b"2\r\n"))
+    assert asyncio.run(reply(b"250 OK\r\n")) == "OK"
+
+
+def test_callable_sender_skips_failures():
+    def send(email, title):
+        if title == "Task 1":
+            raise RuntimeError("boom")
+
+    assert CallableSender(send).deliver(_reminders(3)) == [0, 2]
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+
+from task_manager import crud
+from task_manager.database import SHARD_ID_SPAN, ShardRouter
+from task_manager.models import Task
+
+
+@pytest.fixture
+def router(tmp_path):
+    router = ShardRouter(f"sqlite:///{tmp_path / 'main.db'}", count=3, directory_ttl=0)
+    router.create_all()
+    yield router
+    router.dispose()
+
+
+@pytest.fixture
+def db(router):
+    db = router.session()
+    yield db
+    db.close()
+
+
+def shard_task_ids(router, shard):
+    with router.engines[shard].connect() as connection:
+        return [row[0] for row in connection.exec_driver_sql("SELECT id FROM tasks ORDER BY id")]
+
+
+def test_tasks_are_placed_and_listed_across_shards(router, db):
+    users = [crud.create_user(db, f"shard-user-{i}", "x") for i in range(6)]
+    for user in users:
+        for day in (3, 1, 2):
+            crud.create_task(db, f"{user.username} {day}", "sharded", datetime(2030, 1, day), "low",
+                             user_id=user.id)
+    crud.bulk_create_tasks(db, [{"title": "bulk", "user_id": user.id} for user in users] + [{"title": "nobody"}])
+
+    for user in users:
+        shard = router.default_shard(user.id)
+        assert router.shard_for_user(user.id) == shard
+        ids = {task.id for task in crud.get_tasks(db, user_id=user.id)}
+        assert len(ids) == 4 and ids <= set(shard_task_ids(router, shard))
+        assert all(shard * SHARD_ID_SPAN < task_id <= (shard + 1) * SHARD_ID_SPAN for task_id in ids)
+
+    every_id = sorted(task_id for shard in router.engines for task_id in shard_task_ids(router, shard))
+    assert len(every_id) == 25
+    for sort in ("id", "due_date"):
+        seen = [task for page in crud.iter_task_pages(db, page_size=4, sort=sort) for task in page]
+        assert sorted(task.id for task in seen) == every_id
+        rows = list(crud.iter_task_rows(db, sort=sort))
+        assert [row.id for row in rows] == [task.id for task in seen]
+    assert seen == sorted(seen, key=lambda task: (task.due_date is None, task.due_date or datetime.min, task.id))
+    assert [task.id for task in crud.get_tasks(db, skip=5, limit=10)] == every_id[5:15]
+    assert crud.get_task(db, every_id[-1]).id == every_id[-1]
+
+    assert [row["count"] for row in crud.task_stats(db)] == [25]
+    assert crud.task_stats(db, use_summary=False)[0]["count"] == 25
+    assert crud.check_task_counts(db) == []
+    assert len(crud.search_tasks(db, "sharded", limit=5)) == 5
+    assert crud.complete_tasks(db, status="pending", due_before=datetime(2030, 1, 2)) == 6
+
+
+def test_reshard_moves_tasks_online(router, db):
+    user = crud.create_user(db, "mover", "x")
+    source = router.shard_for_user(user.id)
+    target = (source + 1) % router.count
+    ids = [crud.create_task(db, f"move {i}", None, None, "low", user_id=user.id).id for i in range(7)]
+    sleeps = []
+
+    assert crud.reshard_users(db, {user.id: target}, batch_size=3, sleep=sleeps.append) == {user.id: 7}
+    assert sleeps == [0]
+    assert router.shard_for_user(user.id) == target and router.shards_for_user(user.id) == [target]
+    assert shard_task_ids(router, target) == ids
+    assert not set(ids) & set(shard_task_ids(router, source))
+    assert sorted(task.id for task in crud.get_tasks(db, user_id=user.id)) == ids
+    assert crud.check_task_counts(db) == []
+    assert crud.reshard_users(db, {user.id: target}, sleep=sleeps.append) == {}
+
+    # A new task still gets an id from its own shard's range.
+    assert crud.create_task(db, "after move", None, None, "low", user_id=user.id).id not in ids
+    assert crud.rebalance_targets(db) == {user.id: source}
+
+
+def test_task_changing_user_changes_shard(router, db):
+    first, second = (crud.create_user(db, name, "x") for name in ("first", "second"))
+    assert router.shard_for_user(first.id) != router.shard_for_user(second.id)
+    task = crud.create_task(db, "hand over", None, None, "low", user_id=first.id)
+
+    moved = crud.update_task(db, task.id, user_id=second.id, title="handed over")
+    assert moved.id == task.id and moved.title == "handed over"
+    assert task.id in shard_task_ids(router, router.shard_for_user(second.id))
+    assert crud.get_tasks(db, user_id=first.id) == []
+    with pytest.raises(ValueError):
+        crud.bulk_update_tasks(db, {"user_id": first.id}, ids=[task.id])
+    assert len(db.query(Task).filter(Task.id == task.id).all()) == 1
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Generous enough for a loaded CI machine; typer alone accounts for most of it.
+IMPORT_BUDGET_MS = float(os.getenv("CLI_IMPORT_BUDGET_MS", "400"))
+
+HEAVY_MODULES = ("sqlalchemy", "rich", "dotenv", "asyncio", "task_manager.database")
+
+
+def _imported_modules(*args):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            _, cumulative_us, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = int(cumulative_us)
+    return modules
+
+
+def _loaded(modules, prefix):
+    return [name for name in modules if name == prefix or name.startswith(prefix + ".")]
+
+
+def test_cli_import_is_light():
+    modules = _imported_modules("-c", "import task_manager.cli")
+    for heavy in HEAVY_MODULES:
+        assert not _loaded(modules, heavy), f"{heavy} imported at CLI startup"
+    assert modules["task_manager.cli"] / 1000 < IMPORT_BUDGET_MS
+
+
+def test_subcommand_help_skips_orm():
+    # Sub-apps are loaded with importlib, which -X importtime does not report,
+    # so inspect sys.modules after running the command instead.
+    script = (
+        "import sys\n"
+        "from task_manager.cli import app\n"
+        "try:\n"
+        "    app(['task', '--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print('MODULES', ' '.join(sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+    modules = result.stdout.split("MODULES ")[1].split()
+    assert _loaded(modules, "task_manager.commands.task_commands")
+    assert not _loaded(modules, "task_manager.commands.worker_commands")
+    assert not _loaded(modules, "sqlalchemy")
@@ -0,0 +1,108 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from task_manager import crud
+from task_manager.cache import LookupCache
+from task_manager.database import SessionLocal, init_db
+from task_manager.models import Task
+from task_manager.write_queue import RolledBack, WriteQueue, dump_arguments, load_arguments
+
+
+@pytest.fixture
+def writes():
+    init_db()
+    with WriteQueue(SessionLocal, max_wait=0.05) as writes:
+        yield writes
+
+
+def test_concurrent_writes_share_commits(writes):
+    ids = []
+
+    def produce(i):
+        for j in range(5):
+            ids.append(writes.submit("create_task", title=f"Queued {i}.{j}", priority="low"))
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == 40
+    assert writes.operations == 40 and writes.commits < 40
+    db = SessionLocal()
+    assert db.query(Task).filter(Task.id.in_(ids)).count() == 40
+    db.close()
+
+
+def test_failed_operation_rolls_back_alone(writes):
+    def add_then_fail(db, title):
+        crud.create_task(db, title, None, None, "low")
+        raise ValueError("rejected")
+
+    futures = [writes.submit_async("create_task", title="kept before"),
+               writes.submit_async(add_then_fail, title="rolled back"),
+               writes.submit_async("create_task", title="kept after")]
+    with pytest.raises(ValueError, match="rejected"):
+        futures[1].result()
+    first, last = futures[0].result(), futures[2].result()
+
+    db = SessionLocal()
+    assert {task.title for task in db.query(Task).filter(Task.id.in_([first, last]))} == {"kept before", "kept after"}
+    assert db.query(Task).filter(Task.title == "rolled back").count() == 0
+    db.close()
+
+    assert writes.submit("update_task", task_id=first, status="completed") is True
+    assert writes.submit("mark_reminders_sent", task_ids=[first, last]) == 2
+    assert writes.submit("delete_task", task_id=last) is True
+    assert writes.submit("delete_task", task_id=last) is False
+    with pytest.raises(ValueError):
+        writes.submit("drop_everything")
+
+
+def test_rollback_in_an_operation_only_fails_that_operation(writes):
+    def add_then_roll_back(db, title, fail):
+        crud.create_task(db, title, None, None, "low")
+        db.rollback()
+        if fail:
+            raise ValueError("rolled back and raised")
+
+    futures = [writes.submit_async("create_task", title="kept with rollbacks"),
+               writes.submit_async(add_then_roll_back, title="rolled back, raised", fail=True),
+               writes.submit_async(add_then_roll_back, title="rolled back, returned", fail=False)]
+    kept = futures[0].result()
+    with pytest.raises(ValueError):
+        futures[1].result()
+    with pytest.raises(RolledBack):
+        futures[2].result()
+
+    db = SessionLocal()
+    assert db.get(Task, kept).title == "kept with rollbacks"
+    assert db.query(Task).filter(Task.title.like("rolled back%")).count() == 0
+    db.close()
+
+
+def test_invalidations_wait_for_the_commit(writes):
+    cache = LookupCache()
+    cache.get(("category", 1), lambda: "old name")
+    seen = {}
+
+    def rename(db):
+        cache.invalidate("category")
+        reader = threading.Thread(target=lambda: seen.update(reader=cache.get(("category", 1), lambda: "read")))
+        reader.start()
+        reader.join()
+        seen["writer"] = cache.get(("category", 1), lambda: "new name")
+
+    writes.submit(rename)
+    # Other threads keep the committed value until the batch commits; the
+    # writer already sees its own change.
+    assert seen == {"reader": "old name", "writer": "new name"}
+    assert cache.get(("category", 1), lambda: "new name") == "new name"
+
+
+def test_arguments_round_trip_datetimes():
+    kwargs = {"title": "t", "due_date": datetime(2030, 5, 17, 9, 30), "ids": [1, 2]}
+    assert load_arguments(dump_arguments(kwargs)) == kwargs